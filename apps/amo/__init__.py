@@ -15,7 +15,7 @@ from mkt.constants.search import *
 # This is used in multiple other files to access logging, do not remove.
 from .log import (_LOG, LOG, LOG_BY_ID, LOG_ADMINS, LOG_EDITORS,
                   LOG_HIDE_DEVELOPER, LOG_KEEP, LOG_REVIEW_QUEUE,
-                  LOG_REVIEW_EMAIL_USER, log)
+                  LOG_REVIEW_EMAIL_USER, log, log_many)
 
 logger_log = commonware.log.getLogger('z.amo')
 
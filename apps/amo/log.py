@@ -1,3 +1,4 @@
+from collections import OrderedDict
 from inspect import isclass
 
 from django.conf import settings
@@ -698,12 +699,11 @@ LOG_HIDE_DEVELOPER = [l.id for l in LOGS
                                or l.id in LOG_ADMINS)]
 
 
-def log(action, *args, **kw):
+def _create_log(action, args, kw):
     """
-    e.g. amo.log(amo.LOG.CREATE_ADDON, []),
-         amo.log(amo.LOG.ADD_FILE_TO_VERSION, file, version)
+    Saves the ActivityLog for `action` and returns it along with the unsaved
+    rows indexing it by app, version, user and group.
     """
-    from amo import get_user, logger_log
     from mkt.developers.models import (ActivityLog, ActivityLogAttachment,
                                        AppLog, CommentLog, GroupLog, UserLog,
                                        VersionLog)
@@ -712,26 +712,21 @@ def log(action, *args, **kw):
     from mkt.users.models import UserProfile
     from mkt.versions.models import Version
 
-    user = kw.get('user', get_user())
-
-    if not user:
-        logger_log.warning('Activity log called with no user: %s' % action.id)
-        return
-
+    user = kw['user']
     al = ActivityLog(user=user, action=action.id)
     al.arguments = args
     if 'details' in kw:
         al.details = kw['details']
     al.save()
 
-    if 'details' in kw and 'comments' in al.details:
-        CommentLog(comments=al.details['comments'], activity_log=al).save()
-
-    # TODO(davedash): post-remora this may not be necessary.
+    # Django sets the created date on insert, change it afterwards.
     if 'created' in kw:
-        al.created = kw['created']
-        # Double save necessary since django resets the created date on save.
-        al.save()
+        al.update(created=kw['created'], _signal=False)
+
+    rows = []
+    if 'details' in kw and 'comments' in al.details:
+        rows.append(CommentLog(comments=al.details['comments'],
+                               activity_log=al))
 
     if 'attachments' in kw:
         formset = kw['attachments']
@@ -742,33 +737,79 @@ def log(action, *args, **kw):
                 attachment = data['attachment']
                 storage.save('%s/%s' % (settings.REVIEWER_ATTACHMENTS_PATH,
                                         attachment.name), attachment)
-                ActivityLogAttachment(activity_log=al,
-                                      description=data['description'],
-                                      mimetype=attachment.content_type,
-                                      filepath=attachment.name).save()
+                rows.append(ActivityLogAttachment(
+                    activity_log=al, description=data['description'],
+                    mimetype=attachment.content_type,
+                    filepath=attachment.name))
 
     for arg in args:
         if isinstance(arg, tuple):
             if arg[0] == Webapp:
-                AppLog(addon_id=arg[1], activity_log=al).save()
+                rows.append(AppLog(addon_id=arg[1], activity_log=al))
             elif arg[0] == Version:
-                VersionLog(version_id=arg[1], activity_log=al).save()
+                rows.append(VersionLog(version_id=arg[1], activity_log=al))
             elif arg[0] == UserProfile:
-                UserLog(user_id=arg[1], activity_log=al).save()
+                rows.append(UserLog(user_id=arg[1], activity_log=al))
             elif arg[0] == Group:
-                GroupLog(group_id=arg[1], activity_log=al).save()
+                rows.append(GroupLog(group_id=arg[1], activity_log=al))
 
         # Webapp first since Webapp subclasses Addon.
         if isinstance(arg, Webapp):
-            AppLog(addon=arg, activity_log=al).save()
+            rows.append(AppLog(addon=arg, activity_log=al))
         elif isinstance(arg, Version):
-            VersionLog(version=arg, activity_log=al).save()
+            rows.append(VersionLog(version=arg, activity_log=al))
         elif isinstance(arg, UserProfile):
             # Index by any user who is mentioned as an argument.
-            UserLog(activity_log=al, user=arg).save()
+            rows.append(UserLog(activity_log=al, user=arg))
         elif isinstance(arg, Group):
-            GroupLog(group=arg, activity_log=al).save()
+            rows.append(GroupLog(group=arg, activity_log=al))
 
     # Index by every user
-    UserLog(activity_log=al, user=user).save()
-    return al
+    rows.append(UserLog(activity_log=al, user=user))
+    return al, rows
+
+
+def _bulk_create(rows):
+    """Inserts the rows with one query per model."""
+    by_model = OrderedDict()
+    for row in rows:
+        by_model.setdefault(row.__class__, []).append(row)
+    for model, objs in by_model.items():
+        model.objects.bulk_create(objs)
+
+
+def log(action, *args, **kw):
+    """
+    e.g. amo.log(amo.LOG.CREATE_ADDON, []),
+         amo.log(amo.LOG.ADD_FILE_TO_VERSION, file, version)
+    """
+    return log_many([(action, args)], **kw)[0]
+
+
+def log_many(entries, **kw):
+    """
+    Logs many actions at once, saving the rows indexing them with one query
+    per table. `entries` is a list of (action, args) tuples, `kw` applies to
+    all of them as for log(), e.g.
+
+        amo.log_many([(amo.LOG.CHANGE_STATUS, (status, app))
+                      for app in apps], user=task_user)
+
+    Returns the list of ActivityLogs.
+    """
+    from amo import get_user, logger_log
+
+    kw.setdefault('user', get_user())
+    if not kw['user']:
+        for action, args in entries:
+            logger_log.warning('Activity log called with no user: %s'
+                               % action.id)
+        return [None] * len(entries)
+
+    logs, rows = [], []
+    for action, args in entries:
+        al, al_rows = _create_log(action, args, kw)
+        logs.append(al)
+        rows.extend(al_rows)
+    _bulk_create(rows)
+    return logs
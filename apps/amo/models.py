@@ -81,6 +81,19 @@ class TransformQuerySet(queryset_transform.TransformQuerySet):
         return (self.no_transforms().extra(select={'_only_trans': 1})
                 .transform(transformer.get_trans))
 
+    def all_translations(self):
+        """
+        Load the translations of every locale in one query instead of joining
+        the current one, for callers that need them all (e.g. indexing).
+        """
+        from mkt.translations import transformer
+        transforms, qs = self.pop_transforms()
+        for fn in transforms:
+            if getattr(fn, 'f', fn) is transformer.get_trans:
+                fn = transformer.get_all_trans
+            qs = qs.transform(getattr(fn, 'f', fn))
+        return qs
+
     def transform(self, fn):
         from . import decorators
         f = decorators.skip_cache(fn)
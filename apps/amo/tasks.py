@@ -59,7 +59,7 @@ def set_modified_on_object(obj, **kw):
 def delete_logs(items, **kw):
     log.info('[%s@%s] Deleting logs' % (len(items), delete_logs.rate_limit))
     ActivityLog.objects.filter(pk__in=items).exclude(
-        action__in=amo.LOG_KEEP).delete()
+        action__in=amo.LOG_KEEP).no_transforms().delete()
 
 
 @task
@@ -5,6 +5,7 @@ from nose.tools import eq_
 
 import amo
 import amo.tests
+from mkt.developers.models import ActivityLog, UserLog
 from mkt.webapps.models import Addon
 from mkt.users.models import UserProfile
 
@@ -34,3 +35,21 @@ class LogTest(amo.tests.TestCase):
         al = amo.log(amo.LOG.CUSTOM_TEXT, 'hi', created=datetime(2009, 1, 1))
 
         eq_(al.created, datetime(2009, 1, 1))
+
+    def test_no_user(self):
+        amo.set_user(None)
+        eq_(amo.log(amo.LOG.CUSTOM_TEXT, 'hi'), None)
+
+    def test_log_many(self):
+        user = UserProfile.objects.create(username='bar')
+        a = Addon.objects.create(name='kumar is awesome',
+                                 type=amo.ADDON_EXTENSION)
+        logs = amo.log_many([(amo.LOG.CUSTOM_TEXT, ('hi',)),
+                             (amo.LOG.ADD_USER_WITH_ROLE, (user, 1, a))],
+                            created=datetime(2009, 1, 1))
+        eq_([al.action for al in logs],
+            [amo.LOG.CUSTOM_TEXT.id, amo.LOG.ADD_USER_WITH_ROLE.id])
+        eq_(ActivityLog.objects.filter(created=datetime(2009, 1, 1)).count(),
+            2)
+        eq_(list(ActivityLog.objects.for_user(user)), [logs[1]])
+        eq_(UserLog.objects.filter(user=amo.get_user()).count(), 2)
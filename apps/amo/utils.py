@@ -819,14 +819,21 @@ def attach_trans_dict(model, objs):
     """Put all translations into a translations dict."""
     # Get the ids of all the translations we need to fetch.
     fields = model._meta.translated_fields
+    # Objects loaded with transformer.get_all_trans already have them.
+    all_translations = {}
+    for obj in objs:
+        all_translations.update(getattr(obj, '_trans_map', {}))
     ids = [getattr(obj, f.attname) for f in fields
-           for obj in objs if getattr(obj, f.attname, None) is not None]
+           for obj in objs if getattr(obj, f.attname, None) is not None
+           and not hasattr(obj, '_trans_map')]
 
     # Get translations in a dict, ids will be the keys. It's important to
     # consume the result of sorted_groupby, which is an iterator.
-    qs = Translation.objects.filter(id__in=ids, localized_string__isnull=False)
-    all_translations = dict((k, list(v)) for k, v in
-                            sorted_groupby(qs, lambda trans: trans.id))
+    if ids:
+        qs = Translation.objects.filter(id__in=ids,
+                                        localized_string__isnull=False)
+        all_translations.update((k, list(v)) for k, v in
+                                sorted_groupby(qs, lambda trans: trans.id))
 
     def get_locale_and_string(translation, new_class):
         """Convert the translation to new_class (making PurifiedTranslations
@@ -2,6 +2,10 @@
 Marketplace ElasticSearch Indexer.
 
 Currently creates the indexes and re-indexes apps and feed elements.
+
+The objects of each index are split into chunks which are indexed in
+parallel by a celery chord, the alias is only updated once every chunk
+is done.
 """
 import logging
 import os
@@ -10,14 +14,16 @@ import time
 from optparse import make_option
 
 import elasticsearch
-from celery import task
+from celery import chord, task
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.management.base import BaseCommand, CommandError
 
 import mkt.feed.indexers as f_indexers
 from amo.utils import chunked, timestamp_index
 from lib.es.models import Reindexing
+from mkt.users.indexers import UserProfileIndexer
 from mkt.webapps.indexers import WebappIndexer
 
 
@@ -33,7 +39,8 @@ logger = logging.getLogger('z.elasticsearch')
 # structure of INDEXES.
 ES_INDEXES = settings.ES_INDEXES
 INDEXES = (
-    # Index, Indexer, chunk size.
+    # Index, Indexer, chunk size. The chunk size can be overridden with
+    # settings.ES_REINDEX_CHUNK_SIZES.
     (ES_INDEXES['webapp'], WebappIndexer, 100),
     # Currently using 500 since these are manually created by a curator and
     # there will probably never be this many.
@@ -43,6 +50,8 @@ INDEXES = (
     (ES_INDEXES['mkt_feed_shelf'], f_indexers.FeedShelfIndexer, 500),
     # Currently using 1000 since FeedItem documents are pretty small.
     (ES_INDEXES['mkt_feed_item'], f_indexers.FeedItemIndexer, 1000),
+    # Users are many and their documents are tiny.
+    (ES_INDEXES['users'], UserProfileIndexer, 1000),
 )
 
 INDEX_DICT = {
@@ -50,14 +59,18 @@ INDEX_DICT = {
     'apps': [INDEXES[0]],
     'feed': [INDEXES[1], INDEXES[2], INDEXES[3], INDEXES[4], INDEXES[5]],
     'feeditems': [INDEXES[5]],
+    'users': [INDEXES[6]],
 }
 
 ES = elasticsearch.Elasticsearch(hosts=settings.ES_HOSTS)
 
 
-job = 'lib.es.management.commands.reindex_mkt.run_indexing'
+job = 'lib.es.management.commands.reindex_mkt.index_chunk'
 time_limits = settings.CELERY_TIME_LIMITS[job]
 
+# How long the indexing progress of an index is kept around.
+PROGRESS_TIMEOUT = 60 * 60 * 24
+
 
 @task
 def delete_index(old_index):
@@ -96,24 +109,109 @@ def create_index(new_index, alias, indexer, settings):
                       wait_for_relocating_shards=0)
 
 
-@task(time_limit=time_limits['hard'], soft_time_limit=time_limits['soft'])
-def run_indexing(index, indexer, chunk_size):
-    """Index the objects.
+def get_chunk_size(indexer, default):
+    """Returns the chunk size for the indexer, allowing for overrides."""
+    return settings.ES_REINDEX_CHUNK_SIZES.get(
+        indexer.get_mapping_type_name(), default)
+
+
+def progress_key(index, name):
+    return 'reindex:%s:%s' % (index, name)
+
+
+def incr_progress(index, name, delta):
+    key = progress_key(index, name)
+    cache.add(key, 0, PROGRESS_TIMEOUT)
+    return cache.incr(key, delta)
+
+
+def get_progress(index, total):
+    """
+    Returns a dict of the number of objects done and failed, the docs per
+    second and the estimated seconds left for the index.
+    """
+    done = cache.get(progress_key(index, 'done')) or 0
+    failed = cache.get(progress_key(index, 'failed')) or 0
+    start = cache.get(progress_key(index, 'start')) or time.time()
+    elapsed = max(time.time() - start, 0.001)
+    rate = done / elapsed
+    eta = (total - done) / rate if rate else None
+    return {'done': done, 'failed': failed, 'total': total,
+            'elapsed': elapsed, 'rate': rate, 'eta': eta}
+
+
+@task(ignore_result=False, time_limit=time_limits['hard'],
+      soft_time_limit=time_limits['soft'])
+def index_chunk(index, indexer, ids, total):
+    """Index one chunk of objects, part of the chord of an index.
 
     - index: name of the index
+    - ids: the ids of the objects in this chunk
+    - total: the number of objects in the whole index, for the progress
 
     Note: Our ES doc sizes are about 5k in size. Chunking by 100 sends ~500kb
     of data to ES at a time.
 
-    TODO: Use celery chords here to parallelize these indexing chunks. This
-          requires celery 3 (bug 825938).
+    """
+    cache.add(progress_key(index, 'start'), time.time(), PROGRESS_TIMEOUT)
+    indexed, failed = indexer.run_indexing(ids, ES, index=index)
+    incr_progress(index, 'done', indexed + failed)
+    if failed:
+        incr_progress(index, 'failed', failed)
+
+    progress = get_progress(index, total)
+    sys.stdout.write(
+        'Indexed {done}/{total} into {index} ({failed} failed), '
+        '{rate:.1f} docs/s, ETA {eta}s\n'.format(
+            index=index, done=progress['done'], total=total,
+            failed=progress['failed'], rate=progress['rate'],
+            eta=int(progress['eta'] or 0)))
+    return indexed, failed
+
+
+@task
+def finish_indexing(results, index, indexer, total, max_id):
+    """Runs once all the chunks of an index are done.
+
+    Indexes anything created since the chunks were made and reports on the
+    indexing of the index.
+
+    - results: the (indexed, failed) results of each chunk
+    - max_id: the highest id when the chunks were made
 
     """
-    sys.stdout.write('Indexing apps into index: %s\n' % index)
+    new_ids = list(indexer.get_indexable().filter(id__gt=max_id)
+                   .values_list('id', flat=True))
+    if new_ids:
+        results = list(results) + [
+            indexer.run_indexing(new_ids, ES, index=index)]
+
+    indexed = sum(r[0] for r in results)
+    failed = sum(r[1] for r in results)
+    progress = get_progress(index, total + len(new_ids))
+    sys.stdout.write(
+        'Indexing {index} done: {indexed} indexed, {failed} failed in '
+        '{elapsed:.0f}s, {rate:.1f} docs/s\n'.format(
+            index=index, indexed=indexed, failed=failed,
+            elapsed=progress['elapsed'], rate=indexed / progress['elapsed']))
+    cache.delete_many([progress_key(index, name)
+                       for name in ('start', 'done', 'failed')])
+
 
-    qs = indexer.get_indexable().values_list('id', flat=True)
-    for ids in chunked(list(qs), chunk_size):
-        indexer.run_indexing(ids, ES, index=index)
+def indexing_chord(index, indexer, chunk_size):
+    """
+    Returns a chord which indexes all the objects of the indexer in chunks
+    of `chunk_size`, in parallel.
+    """
+    ids = list(indexer.get_indexable().order_by('id')
+               .values_list('id', flat=True))
+    max_id = ids[-1] if ids else 0
+    if not ids:
+        # Immutable, the chain would pass it the result of the task before.
+        return finish_indexing.si([], index, indexer, 0, 0)
+    return chord([index_chunk.si(index, indexer, chunk, len(ids))
+                  for chunk in chunked(ids, chunk_size)],
+                 finish_indexing.s(index, indexer, len(ids), max_id))
 
 
 @task
@@ -162,6 +260,10 @@ def update_alias(new_index, old_index, alias, settings):
         )
     ES.indices.update_aliases(body=dict(actions=actions))
 
+    # The feed is cached from searches, which now go to the new index.
+    from mkt.feed.models import invalidate_feed_cache
+    invalidate_feed_cache()
+
 
 @task
 def output_summary():
@@ -254,8 +356,9 @@ class Command(BaseCommand):
                 'store.compress.tv': True, 'store.compress.stored': True,
                 'refresh_interval': '-1'})
 
-            # Index all the things!
-            chain |= run_indexing.si(new_index, INDEXER, CHUNK_SIZE)
+            # Index all the things, in parallel chunks!
+            chain |= indexing_chord(new_index, INDEXER,
+                                    get_chunk_size(INDEXER, CHUNK_SIZE))
 
             # After indexing we optimize the index, adjust settings, and point
             # alias to the new index.
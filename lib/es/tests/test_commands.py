@@ -0,0 +1,72 @@
+from django.core.cache import cache
+
+import mock
+from nose.tools import eq_
+
+import amo.tests
+from lib.es.management.commands import reindex_mkt
+from mkt.webapps.indexers import WebappIndexer
+
+
+class TestReindexChunks(amo.tests.TestCase):
+
+    def setUp(self):
+        self.indexer = mock.Mock()
+        self.indexer.get_mapping_type_name.return_value = 'webapp'
+        self.indexer.run_indexing.return_value = (2, 1)
+        self.addCleanup(cache.clear)
+
+    def test_chunk_size(self):
+        eq_(reindex_mkt.get_chunk_size(self.indexer, 100), 100)
+        with self.settings(ES_REINDEX_CHUNK_SIZES={'webapp': 10}):
+            eq_(reindex_mkt.get_chunk_size(self.indexer, 100), 10)
+
+    def test_index_chunk(self):
+        eq_(reindex_mkt.index_chunk('apps', self.indexer, [1, 2, 3], 6),
+            (2, 1))
+        self.indexer.run_indexing.assert_called_with(
+            [1, 2, 3], reindex_mkt.ES, index='apps')
+        reindex_mkt.index_chunk('apps', self.indexer, [4, 5, 6], 6)
+        progress = reindex_mkt.get_progress('apps', 6)
+        eq_(progress['done'], 6)
+        eq_(progress['failed'], 2)
+        eq_(progress['eta'], 0)
+
+    def test_finish_indexing(self):
+        qs = self.indexer.get_indexable.return_value.filter.return_value
+        qs.values_list.return_value = [7]
+        reindex_mkt.incr_progress('apps', 'done', 6)
+        reindex_mkt.finish_indexing([(2, 1), (3, 0)], 'apps', self.indexer,
+                                    6, 6)
+        # The app created since the chunks were made was indexed.
+        self.indexer.get_indexable.return_value.filter.assert_called_with(
+            id__gt=6)
+        self.indexer.run_indexing.assert_called_with(
+            [7], reindex_mkt.ES, index='apps')
+        eq_(cache.get(reindex_mkt.progress_key('apps', 'done')), None)
+
+    def test_chord(self):
+        app1, app2, app3 = [amo.tests.app_factory() for i in range(3)]
+        res = reindex_mkt.indexing_chord('apps', WebappIndexer, 2)
+        eq_([t.args[2] for t in res.tasks],
+            [[app1.pk, app2.pk], [app3.pk]])
+        eq_(res.body.args[1:], (WebappIndexer, 3, app3.pk))
+
+    def test_chord_empty_in_chain(self):
+        qs = self.indexer.get_indexable.return_value
+        qs.order_by.return_value.values_list.return_value = []
+        qs.filter.return_value.values_list.return_value = []
+        # Like create_index, the task before the chord returns None.
+        res = (reindex_mkt.unflag_database.si() |
+               reindex_mkt.indexing_chord('apps', self.indexer, 2) |
+               reindex_mkt.unflag_database.si()).apply()
+        res.get()
+        assert res.parent.successful()
+        assert not self.indexer.run_indexing.called
+
+    @mock.patch('mkt.feed.models.invalidate_feed_cache')
+    @mock.patch.object(reindex_mkt, 'ES')
+    def test_update_alias_invalidates_feed(self, es, invalidate_feed_cache):
+        reindex_mkt.update_alias('apps-new', 'apps-old', 'apps', {})
+        assert es.indices.update_aliases.called
+        assert invalidate_feed_cache.called
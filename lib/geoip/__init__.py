@@ -1,75 +1,255 @@
+import bisect
 import logging
+import socket
+from array import array
 
 import requests
 from django_statsd.clients import statsd
 
 from mkt import regions
+from services.cache import LRUCache
 
 log = logging.getLogger('z.geoip')
 
 
+# (network, prefix length) of the IPv4 and IPv6 ranges that aren't public.
+PRIVATE_NETWORKS = {
+    socket.AF_INET: [
+        ('127.0.0.0', 8),  # localhost
+        ('10.0.0.0', 8),
+        ('192.168.0.0', 16),
+        ('172.16.0.0', 12),
+    ],
+    socket.AF_INET6: [
+        ('::1', 128),  # localhost
+        ('fc00::', 7),  # unique local
+        ('fe80::', 10),  # link local
+    ],
+}
+
+BITS = {socket.AF_INET: 32, socket.AF_INET6: 128}
+
+
+def ip_to_int(address):
+    """
+    Returns the address family and the integer value of an IPv4 or IPv6
+    address. IPv4 mapped IPv6 addresses are returned as IPv4 addresses.
+    Raises ValueError if the address isn't valid.
+    """
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            packed = socket.inet_pton(family, address)
+            break
+        except (socket.error, TypeError, UnicodeError):
+            continue
+    else:
+        raise ValueError('Invalid IP address: %r' % address)
+
+    value = 0
+    for byte in bytearray(packed):
+        value = value << 8 | byte
+    if family == socket.AF_INET6 and value >> 32 == 0xffff:
+        return socket.AF_INET, value & 0xffffffff
+    return family, value
+
+
+def parse_network(network):
+    """
+    Returns the address family and the first and last integer addresses of
+    a network in CIDR notation, eg. "1.0.0.0/24" or "2001:200::/32".
+    """
+    address, _, prefix = network.strip().partition('/')
+    family, value = ip_to_int(address)
+    bits = BITS[family]
+    prefix = int(prefix) if prefix else bits
+    if not 0 <= prefix <= bits:
+        raise ValueError('Invalid prefix length: %r' % network)
+    host_mask = (1 << (bits - prefix)) - 1
+    start = value & ~host_mask
+    return family, start, start | host_mask
+
+
+def _private_ranges():
+    ranges = {}
+    for family, networks in PRIVATE_NETWORKS.items():
+        ranges[family] = [parse_network('%s/%s' % n)[1:] for n in networks]
+    return ranges
+
+PRIVATE_RANGES = _private_ranges()
+
+
 def is_public(ip):
-    parts = map(int, ip.split('.'))
-    # localhost
-    if ip == '127.0.0.1':
-        return False
-    # 10.x.x.x
-    elif parts[0] == 10:
-        return False
-    # 192.168.x.x
-    elif parts[0] == 192 and parts[1] == 168:
-        return False
-    # 172.16-32.x.x
-    elif parts[0] == 172 and 16 <= parts[1] <= 31:
+    try:
+        family, value = ip_to_int(ip)
+    except ValueError:
         return False
-    return True
+    return not any(start <= value <= end
+                   for start, end in PRIVATE_RANGES[family])
+
+
+class GeoIPDatabase(object):
+    """
+    An in memory IP address to country database.
+
+    The database is loaded from a text file with one "<network>,<country
+    code>" line per IP range, eg. "1.0.0.0/24,AU" or "2001:200::/32,JP".
+    Blank lines and lines starting with "#" are ignored. The ranges must not
+    overlap.
+
+    The ranges of each address family are kept in sorted arrays and looked
+    up with a binary search.
+    """
+
+    def __init__(self, lines):
+        ranges = {socket.AF_INET: [], socket.AF_INET6: []}
+        codes = {}
+        for num, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                network, country_code = line.split(',')[:2]
+                family, start, end = parse_network(network)
+            except ValueError:
+                log.warning('Invalid GeoIP database line %s: %r' %
+                            (num, line))
+                continue
+            code = codes.setdefault(country_code.strip().lower(), len(codes))
+            ranges[family].append((start, end, code))
+
+        self.codes = sorted(codes, key=codes.get)
+        self.tables = {}
+        for family, rows in ranges.items():
+            rows.sort()
+            starts, ends, codes_ = zip(*rows) or ((), (), ())
+            if family == socket.AF_INET:
+                starts, ends = array('I', starts), array('I', ends)
+            else:
+                # IPv6 addresses don't fit in an array.
+                starts, ends = list(starts), list(ends)
+            self.tables[family] = (starts, ends, array('H', codes_))
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(f)
+
+    def __len__(self):
+        return sum(len(starts) for starts, _, _ in self.tables.values())
+
+    def lookup(self, address):
+        """Returns the lowercase country code of an address, or None."""
+        try:
+            family, value = ip_to_int(address)
+        except ValueError:
+            return None
+        starts, ends, codes = self.tables[family]
+        i = bisect.bisect_right(starts, value) - 1
+        if i >= 0 and value <= ends[i]:
+            return self.codes[codes[i]]
+        return None
+
+
+# Databases are big, load each of them only once per process.
+_databases = {}
+
+
+def get_database(path):
+    """Returns the database at `path`, or None if it can't be loaded."""
+    if path not in _databases:
+        try:
+            with statsd.timer('z.geoip.load'):
+                _databases[path] = GeoIPDatabase.load(path)
+            log.info('Loaded {0} GeoIP ranges from {1}'
+                     .format(len(_databases[path]), path))
+        except (IOError, OSError) as e:
+            log.error('Could not load GeoIP database {0}: {1}'
+                      .format(path, e))
+            _databases[path] = None
+    return _databases[path]
 
 
 class GeoIP:
-    """Call to geodude server to resolve an IP to Geo Info block."""
+    """
+    Resolve an IP to a country code.
+
+    IPs are looked up in the local GEOIP_DATABASE if there is one. The
+    geodude server at GEOIP_URL is only called for IPs that aren't in it,
+    or if there is no local database. Recent results are cached in memory.
+    """
 
     def __init__(self, settings):
         self.timeout = float(getattr(settings, 'GEOIP_DEFAULT_TIMEOUT', .2))
         self.url = getattr(settings, 'GEOIP_URL', '')
         self.default_val = getattr(settings, 'GEOIP_DEFAULT_VAL',
                                    regions.RESTOFWORLD.slug).lower()
+        self.database_path = getattr(settings, 'GEOIP_DATABASE', '')
+        self.cache = LRUCache(getattr(settings, 'GEOIP_CACHE_SIZE', 10000),
+                              getattr(settings, 'GEOIP_CACHE_TIMEOUT', 3600))
+
+    @property
+    def database(self):
+        if not self.database_path:
+            return None
+        return get_database(self.database_path)
 
     def lookup(self, address):
-        """Resolve an IP address to a block of geo information.
+        """Resolve an IP address to a country code.
 
-        If a given address is unresolvable or the geoip server is not defined,
-        return the default as defined by the settings, or "restofworld".
+        If a given address is unresolvable or neither the local database nor
+        the geoip server are defined, return the default as defined by the
+        settings, or "restofworld".
 
         """
-        public_ip = is_public(address)
-        if self.url and public_ip:
-            with statsd.timer('z.geoip'):
-                res = None
-                try:
-                    res = requests.post('{0}/country.json'.format(self.url),
-                                        timeout=self.timeout,
-                                        data={'ip': address})
-                except requests.Timeout:
-                    statsd.incr('z.geoip.timeout')
-                    log.error(('Geodude timed out looking up: {0}'
-                               .format(address)))
-                except requests.RequestException as e:
-                    statsd.incr('z.geoip.error')
-                    log.error('Geodude connection error: {0}'.format(str(e)))
-                if res and res.status_code == 200:
-                    statsd.incr('z.geoip.success')
-                    country_code = res.json().get('country_code',
-                        self.default_val).lower()
-                    log.info(('Geodude lookup for {0} returned {1}'
-                              .format(address, country_code)))
-                    return country_code
-                    log.info('Geodude lookup returned non-200 response: {0}'
-                             .format(res.status_code))
-        else:
-            if public_ip:
-                log.info('Geodude lookup skipped for public IP: {0}'
-                         .format(address))
-            else:
-                log.info('Geodude lookup skipped for private IP: {0}'
-                         .format(address))
-        return self.default_val
+        if not is_public(address):
+            log.info('Geodude lookup skipped for private IP: {0}'
+                     .format(address))
+            return self.default_val
+
+        country_code = self.cache.get(address)
+        if country_code is not None:
+            statsd.incr('z.geoip.cache.hit')
+            return country_code
+
+        country_code = self.lookup_local(address)
+        if country_code is None and self.url:
+            country_code = self.lookup_remote(address)
+        if country_code is None:
+            return self.default_val
+        self.cache.set(address, country_code)
+        return country_code
+
+    def lookup_local(self, address):
+        database = self.database
+        if database is None:
+            return None
+        country_code = database.lookup(address)
+        statsd.incr('z.geoip.local.%s' % ('hit' if country_code else 'miss'))
+        return country_code
+
+    def lookup_remote(self, address):
+        """Call to geodude server to resolve an IP to Geo Info block."""
+        with statsd.timer('z.geoip'):
+            res = None
+            try:
+                res = requests.post('{0}/country.json'.format(self.url),
+                                    timeout=self.timeout,
+                                    data={'ip': address})
+            except requests.Timeout:
+                statsd.incr('z.geoip.timeout')
+                log.error(('Geodude timed out looking up: {0}'
+                           .format(address)))
+            except requests.RequestException as e:
+                statsd.incr('z.geoip.error')
+                log.error('Geodude connection error: {0}'.format(str(e)))
+            if res and res.status_code == 200:
+                statsd.incr('z.geoip.success')
+                country_code = res.json().get('country_code',
+                    self.default_val).lower()
+                log.info(('Geodude lookup for {0} returned {1}'
+                          .format(address, country_code)))
+                return country_code
+            elif res is not None:
+                log.info('Geodude lookup returned non-200 response: {0}'
+                         .format(res.status_code))
+        return None
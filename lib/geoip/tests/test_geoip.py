@@ -1,17 +1,31 @@
+import os
+import tempfile
 from random import randint
 
 import mock
 import requests
-from nose.tools import eq_
+from nose.tools import eq_, ok_
 
 import amo.tests
 
-from lib.geoip import GeoIP
+from lib.geoip import GeoIP, GeoIPDatabase, get_database, is_public
 
 
-def generate_settings(url='', default='restofworld', timeout=0.2):
+DATABASE = [
+    '# Test database.',
+    '1.0.0.0/24,AU',
+    '5.0.0.0/8,fr',
+    '',
+    '2001:200::/32,JP',
+    'not a network,US',
+]
+
+
+def generate_settings(url='', default='restofworld', timeout=0.2,
+                      database='', cache_size=100):
     return mock.Mock(GEOIP_URL=url, GEOIP_DEFAULT_VAL=default,
-                     GEOIP_DEFAULT_TIMEOUT=timeout)
+                     GEOIP_DEFAULT_TIMEOUT=timeout, GEOIP_DATABASE=database,
+                     GEOIP_CACHE_SIZE=cache_size, GEOIP_CACHE_TIMEOUT=60)
 
 
 class GeoIPTest(amo.tests.TestCase):
@@ -86,3 +100,109 @@ class GeoIPTest(amo.tests.TestCase):
             result = geoip.lookup(ip)
             assert not mock_post.called
             eq_(result, 'restofworld')
+
+    @mock.patch('requests.post')
+    def test_private_ipv6(self, mock_post):
+        geoip = GeoIP(generate_settings(url='localhost'))
+        for ip in ('::1', 'fe80::1', 'fd00::1', '::ffff:192.168.0.1',
+                   'not an ip'):
+            eq_(geoip.lookup(ip), 'restofworld')
+        assert not mock_post.called
+
+    @mock.patch('requests.post')
+    def test_cache(self, mock_post):
+        geoip = GeoIP(generate_settings(url='localhost'))
+        mock_post.return_value = mock.Mock(status_code=200, json=lambda: {
+            'country_code': 'US'})
+        eq_(geoip.lookup('1.1.1.1'), 'us')
+        eq_(geoip.lookup('1.1.1.1'), 'us')
+        eq_(mock_post.call_count, 1)
+
+    @mock.patch('requests.post')
+    def test_failures_not_cached(self, mock_post):
+        geoip = GeoIP(generate_settings(url='localhost'))
+        mock_post.side_effect = requests.Timeout
+        geoip.lookup('1.1.1.1')
+        geoip.lookup('1.1.1.1')
+        eq_(mock_post.call_count, 2)
+
+
+class GeoIPDatabaseTest(amo.tests.TestCase):
+
+    def setUp(self):
+        self.database = GeoIPDatabase(DATABASE)
+
+    def test_len(self):
+        eq_(len(self.database), 3)
+
+    def test_lookup(self):
+        eq_(self.database.lookup('1.0.0.0'), 'au')
+        eq_(self.database.lookup('1.0.0.255'), 'au')
+        eq_(self.database.lookup('5.128.3.4'), 'fr')
+        eq_(self.database.lookup('::ffff:5.1.1.1'), 'fr')
+        eq_(self.database.lookup('2001:200:1::1'), 'jp')
+
+    def test_lookup_missing(self):
+        for ip in ('0.0.0.1', '1.0.1.0', '4.255.255.255', '2001:201::1',
+                   '::', 'not an ip'):
+            eq_(self.database.lookup(ip), None)
+
+    def test_empty(self):
+        eq_(GeoIPDatabase([]).lookup('1.0.0.1'), None)
+
+
+class GeoIPLocalTest(amo.tests.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as f:
+            f.write('\n'.join(DATABASE))
+        self.addCleanup(os.remove, self.path)
+
+    @mock.patch('requests.post')
+    def test_lookup(self, mock_post):
+        geoip = GeoIP(generate_settings(url='localhost', database=self.path))
+        eq_(geoip.lookup('1.0.0.1'), 'au')
+        eq_(geoip.lookup('2001:200::1'), 'jp')
+        assert not mock_post.called
+
+    @mock.patch('requests.post')
+    def test_fallback(self, mock_post):
+        geoip = GeoIP(generate_settings(url='localhost', database=self.path))
+        mock_post.return_value = mock.Mock(status_code=200, json=lambda: {
+            'country_code': 'US'})
+        eq_(geoip.lookup('8.8.8.8'), 'us')
+        ok_(mock_post.called)
+
+    @mock.patch('requests.post')
+    def test_no_fallback(self, mock_post):
+        geoip = GeoIP(generate_settings(database=self.path))
+        eq_(geoip.lookup('8.8.8.8'), 'restofworld')
+        assert not mock_post.called
+
+    def test_loaded_once(self):
+        eq_(get_database(self.path), get_database(self.path))
+
+    def test_missing_database(self):
+        geoip = GeoIP(generate_settings(database=self.path + '.missing'))
+        eq_(geoip.lookup('1.0.0.1'), 'restofworld')
+
+
+class IsPublicTest(amo.tests.TestCase):
+
+    def test_ipv4(self):
+        ok_(is_public('1.1.1.1'))
+        ok_(is_public('172.32.0.1'))
+        ok_(not is_public('127.0.0.1'))
+        ok_(not is_public('172.16.0.1'))
+
+    def test_ipv6(self):
+        ok_(is_public('2001:200::1'))
+        ok_(not is_public('::1'))
+        ok_(not is_public('fc00::1'))
+        ok_(not is_public('fe80::1'))
+        ok_(not is_public('::ffff:10.0.0.1'))
+
+    def test_invalid(self):
+        ok_(not is_public('not an ip'))
+        ok_(not is_public(None))
@@ -0,0 +1,20 @@
+CREATE TABLE `review_queue_entry` (
+      `id` int(11) UNSIGNED NOT NULL AUTO_INCREMENT,
+      `created` datetime NOT NULL,
+      `modified` datetime NOT NULL,
+      `addon_id` int(11) UNSIGNED NOT NULL,
+      `queue` varchar(20) NOT NULL,
+      `priority_review` tinyint(1) NOT NULL DEFAULT 0,
+      `nomination` datetime DEFAULT NULL,
+      `name_sort` varchar(255) NOT NULL DEFAULT '',
+      `abuse_count` int(11) UNSIGNED NOT NULL DEFAULT 0,
+      PRIMARY KEY (`id`),
+      UNIQUE KEY `addon_id` (`addon_id`, `queue`),
+      KEY `review_queue_entry_queue_priority_nomination` (`queue`, `priority_review`, `nomination`),
+      CONSTRAINT `addon_id_refs_id_7a1c5b3e` FOREIGN KEY (`addon_id`) REFERENCES `addons` (`id`)
+) ENGINE=InnoDB CHARACTER SET utf8 COLLATE utf8_general_ci;
+
+INSERT INTO waffle_switch (name, active, note, created, modified)
+    VALUES ('reviewer-queue-table', 0,
+            'Read the reviewer queues from the review_queue_entry table. Run manage.py rebuild_review_queue before turning it on.',
+            NOW(), NOW());
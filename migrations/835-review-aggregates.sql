@@ -0,0 +1,12 @@
+CREATE TABLE `review_aggregates` (
+      `id` int(11) UNSIGNED NOT NULL AUTO_INCREMENT,
+      `created` datetime NOT NULL,
+      `modified` datetime NOT NULL,
+      `addon_id` int(11) UNSIGNED NOT NULL,
+      `total_reviews` int(11) NOT NULL DEFAULT 0,
+      `rated_reviews` int(11) NOT NULL DEFAULT 0,
+      `rating_sum` int(11) NOT NULL DEFAULT 0,
+      PRIMARY KEY (`id`),
+      UNIQUE KEY `addon_id` (`addon_id`),
+      CONSTRAINT `addon_id_refs_id_3d5c8f1a` FOREIGN KEY (`addon_id`) REFERENCES `addons` (`id`)
+) ENGINE=InnoDB CHARACTER SET utf8 COLLATE utf8_general_ci;
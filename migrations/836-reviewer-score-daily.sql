@@ -0,0 +1,27 @@
+CREATE TABLE `reviewer_score_daily` (
+      `id` int(11) UNSIGNED NOT NULL AUTO_INCREMENT,
+      `created` datetime NOT NULL,
+      `modified` datetime NOT NULL,
+      `user_id` int(11) UNSIGNED NOT NULL,
+      `day` date NOT NULL,
+      `note_key` smallint(2) NOT NULL DEFAULT 0,
+      `addon_type` int(11) UNSIGNED NOT NULL DEFAULT 0,
+      `score` int(11) NOT NULL DEFAULT 0,
+      PRIMARY KEY (`id`),
+      UNIQUE KEY `reviewer_score_daily_unique`
+          (`user_id`, `day`, `note_key`, `addon_type`),
+      KEY `reviewer_score_daily_user_day` (`user_id`, `day`),
+      KEY `reviewer_score_daily_day_note_key` (`day`, `note_key`),
+      CONSTRAINT `user_id_refs_id_5f2b7e91` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`)
+) ENGINE=InnoDB CHARACTER SET utf8 COLLATE utf8_general_ci;
+
+INSERT INTO `reviewer_score_daily`
+    (`created`, `modified`, `user_id`, `day`, `note_key`, `addon_type`, `score`)
+    SELECT NOW(), NOW(), `reviewer_scores`.`user_id`,
+           DATE(`reviewer_scores`.`created`), `reviewer_scores`.`note_key`,
+           COALESCE(`addons`.`addontype_id`, 0),
+           SUM(`reviewer_scores`.`score`)
+    FROM `reviewer_scores`
+    LEFT JOIN `addons` ON (`reviewer_scores`.`addon_id`=`addons`.`id`)
+    GROUP BY `reviewer_scores`.`user_id`, DATE(`reviewer_scores`.`created`),
+             `reviewer_scores`.`note_key`, `addons`.`addontype_id`;
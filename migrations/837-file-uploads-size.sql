@@ -0,0 +1 @@
+ALTER TABLE `file_uploads` ADD COLUMN `size` int(11) UNSIGNED NULL;
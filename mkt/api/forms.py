@@ -69,6 +69,18 @@ class NewPackagedForm(NewPackagedAppForm):
         return super(NewPackagedForm, self).clean_upload()
 
 
+class ChunkedUploadForm(happyforms.Form):
+    name = forms.CharField(max_length=255)
+    size = forms.IntegerField(min_value=1)
+
+    def clean_size(self):
+        size = self.cleaned_data['size']
+        errors = NewPackagedAppForm().size_errors(size)
+        if errors:
+            raise forms.ValidationError(errors[0]['message'])
+        return size
+
+
 class FileJSONForm(happyforms.Form):
     file = JSONField(required=True)
 
@@ -19,7 +19,8 @@ from mkt.reviewers.urls import api_patterns as reviewer_api_patterns
 from mkt.search.views import (FeaturedSearchView, RocketbarView, SearchView,
                             SuggestionsView)
 from mkt.stats.urls import stats_api_patterns, txn_api_patterns
-from mkt.submit.views import PreviewViewSet, StatusViewSet, ValidationViewSet
+from mkt.submit.views import (ChunkedUploadViewSet, PreviewViewSet,
+                              StatusViewSet, ValidationViewSet)
 from mkt.webapps.views import AppViewSet, PrivacyPolicyViewSet
 
 rocketfuel = SimpleRouter()
@@ -33,6 +34,7 @@ subcollections.register('image', CollectionImageViewSet,
 apps = SimpleRouter()
 apps.register(r'preview', PreviewViewSet, base_name='app-preview')
 apps.register(r'validation', ValidationViewSet, base_name='app-validation')
+apps.register(r'upload', ChunkedUploadViewSet, base_name='app-upload')
 apps.register(r'category', CategoryViewSet, base_name='app-category')
 apps.register(r'status', StatusViewSet, base_name='app-status')
 apps.register(r'app', AppViewSet, base_name='app')
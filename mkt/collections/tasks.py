@@ -14,6 +14,7 @@ from mkt.collections.models import Collection
 from mkt.collections.serializers import CollectionSerializer
 from mkt.constants.regions import RESTOFWORLD
 from mkt.webapps.models import Webapp
+from mkt.webapps.tasks import write_export_part
 
 task_log = logging.getLogger('collections.tasks')
 
@@ -76,6 +77,17 @@ def dump_collections(pks):
             for collection in Collection.public.filter(pk__in=pks).iterator()]
 
 
-def dump_all_collections_tasks():
-    all_pks = Collection.public.values_list('pk', flat=True).order_by('pk')
-    return [dump_collections.si(pks) for pks in chunked(all_pks, 100)]
+@task(ignore_result=False)
+def export_collections(name, pks):
+    collections = Collection.public.filter(pk__in=pks).iterator()
+    entries = ((os.path.join('collections', object_path(collection)),
+                collection_data(collection)) for collection in collections)
+    return write_export_part(name, 'collections-%s' % pks[0], entries)
+
+
+def export_all_collections_tasks(name, since=None):
+    all_pks = Collection.public.all()
+    if since:
+        all_pks = all_pks.filter(modified__gte=since)
+    all_pks = all_pks.values_list('pk', flat=True).order_by('pk')
+    return [export_collections.si(name, pks) for pks in chunked(all_pks, 100)]
@@ -4,6 +4,7 @@ import json
 import zipfile
 
 from django.core.files.storage import default_storage as storage
+from django.db.models.signals import post_save
 
 import mock
 from nose.tools import eq_
@@ -12,6 +13,7 @@ import amo
 import amo.tests
 
 from mkt.constants import MANIFEST_CONTENT_TYPE
+from mkt.reviewers.utils import ReviewBase
 from mkt.webapps.models import Webapp
 from mkt.site.fixtures import fixture
 
@@ -162,3 +164,76 @@ class TestPackagedManifest(amo.tests.TestCase):
         _storage.size.return_value = 1234
         self.client.get(self.url)
         assert _sign.sign.called
+
+    @mock.patch('mkt.detail.views.statsd')
+    @mock.patch('mkt.webapps.models.Webapp.get_manifest_json')
+    @mock.patch('mkt.webapps.models.storage')
+    @mock.patch('mkt.webapps.models.packaged')
+    def test_cached(self, _sign, _storage, _manifest, statsd):
+        _sign.sign.return_value = '/path/to/signed.zip'
+        _storage.size.return_value = 1234
+        _manifest.return_value = {'name': 'Something'}
+        res = self.client.get(self.url)
+        statsd.incr.assert_called_with('detail.manifest.miss')
+        content, etag = res.content, res['ETag']
+
+        with mock.patch('mkt.detail.views.get_object_or_404') as get:
+            res = self.client.get(self.url)
+        assert not get.called
+        statsd.incr.assert_called_with('detail.manifest.hit')
+        eq_(res.content, content)
+        eq_(res['ETag'], etag)
+        eq_(res['ETag'], '"%s"' % self.get_digest_from_manifest(content))
+
+        with mock.patch('mkt.detail.views.get_object_or_404') as get:
+            res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        assert not get.called
+        eq_(res.status_code, 304)
+        eq_(_sign.sign.call_count, 1)
+
+    @mock.patch('mkt.webapps.models.Webapp.get_manifest_json')
+    @mock.patch('mkt.webapps.models.storage')
+    @mock.patch('mkt.webapps.models.packaged')
+    def test_cached_not_available(self, _sign, _storage, _manifest):
+        _sign.sign.return_value = '/path/to/signed.zip'
+        _storage.size.return_value = 1234
+        _manifest.return_value = {'name': 'Something'}
+        eq_(self.client.get(self.url).status_code, 200)
+        self.app.update(status=amo.STATUS_PENDING)
+        with mock.patch('mkt.detail.views.get_object_or_404') as get:
+            res = self.client.get(self.url)
+        assert not get.called
+        eq_(res.status_code, 404)
+        self.app.update(status=amo.STATUS_PUBLIC)
+        eq_(self.client.get(self.url).status_code, 200)
+
+    @mock.patch('mkt.webapps.models.Webapp.get_manifest_json')
+    @mock.patch('mkt.webapps.models.storage')
+    @mock.patch('mkt.webapps.models.packaged')
+    def test_cached_rejected_by_reviewer(self, _sign, _storage, _manifest):
+        _sign.sign.return_value = '/path/to/signed.zip'
+        _storage.size.return_value = 1234
+        _manifest.return_value = {'name': 'Something'}
+        eq_(self.client.get(self.url).status_code, 200)
+        review = ReviewBase(mock.Mock(), self.app, self.app.current_version,
+                            'pending')
+        review.set_addon(status=amo.STATUS_REJECTED)
+        # What the reviewer tools do once the review is done.
+        post_save.send(sender=Webapp, instance=self.app, created=False)
+        with mock.patch('mkt.detail.views.get_object_or_404') as get:
+            res = self.client.get(self.url)
+        assert not get.called
+        eq_(res.status_code, 404)
+
+    @mock.patch('mkt.webapps.models.Webapp.get_manifest_json')
+    @mock.patch('mkt.webapps.models.storage')
+    @mock.patch('mkt.webapps.models.packaged')
+    def test_cached_package_changed(self, _sign, _storage, _manifest):
+        _sign.sign.return_value = '/path/to/signed.zip'
+        _storage.size.return_value = 1234
+        _manifest.return_value = {'name': 'Something'}
+        etag = self.client.get(self.url)['ETag']
+        self.latest_file.update(hash='sha256:foo')
+        res = self.client.get(self.url)
+        self.assertNotEqual(res['ETag'], etag)
+        eq_(res['ETag'], '"%s"' % self.get_digest_from_manifest(res.content))
@@ -1,16 +1,16 @@
-import hashlib
-
 from django import http
+from django.core.cache import cache
 from django.shortcuts import get_object_or_404
 from django.views.decorators.http import etag
 
 import commonware.log
+from django_statsd.clients import statsd
 
-import amo
 from amo.decorators import allow_cross_site_request
 from mkt.constants import MANIFEST_CONTENT_TYPE
 from mkt.webapps.decorators import app_view_factory
-from mkt.webapps.models import Webapp
+from mkt.webapps.models import (mini_manifest_content_key, mini_manifest_key,
+                                Webapp)
 
 
 log = commonware.log.getLogger('z.detail')
@@ -25,30 +25,33 @@ def manifest(request, uuid):
 
     If not a packaged app, returns a 404.
 
-    """
-    addon = get_object_or_404(Webapp, guid=uuid, is_packaged=True)
-    is_avail = addon.status in [amo.STATUS_PUBLIC, amo.STATUS_BLOCKED]
-    package_etag = hashlib.sha256()
-
-    if not addon.is_packaged or addon.disabled_by_user or not is_avail:
-        raise http.Http404
+    The mini-manifest and its ETag are cached when the app changes, so this
+    only looks the app up when they are not in the cache.
 
-    else:
+    """
+    manifest_content = None
+    cached = cache.get(mini_manifest_key(uuid))
+    if cached:
+        manifest_etag, is_avail = cached
+        if not is_avail:
+            raise http.Http404
+        manifest_content = cache.get(mini_manifest_content_key(uuid,
+                                                               manifest_etag))
+
+    if manifest_content is None:
+        statsd.incr('detail.manifest.miss')
+        addon = get_object_or_404(Webapp, guid=uuid, is_packaged=True)
+        if not addon.is_mini_manifest_available():
+            raise http.Http404
         manifest_content = addon.get_cached_manifest()
-        package_etag.update(manifest_content)
-
-        if addon.is_packaged:
-            # Update the hash with the content of the package itself.
-            package_file = addon.get_latest_file()
-            if package_file:
-                package_etag.update(package_file.hash)
-
-    manifest_etag = package_etag.hexdigest()
+        manifest_etag = addon.get_manifest_etag(manifest_content)
+    else:
+        statsd.incr('detail.manifest.hit')
 
-    @etag(lambda r, a: manifest_etag)
-    def _inner_view(request, addon):
+    @etag(lambda r: manifest_etag)
+    def _inner_view(request):
         response = http.HttpResponse(manifest_content,
                                      content_type=MANIFEST_CONTENT_TYPE)
         return response
 
-    return _inner_view(request, addon)
+    return _inner_view(request)
@@ -448,20 +448,38 @@ class NewPackagedAppForm(happyforms.Form):
 
     def clean_upload(self):
         upload = self.cleaned_data['upload']
-        errors = []
 
-        if upload.size > self.max_size:
-            errors.append({
+        errors = self.size_errors(upload.size)
+        if errors:
+            # Immediately raise an error, do not process the rest of the view,
+            # which would read the file.
+            raise self.persist_errors(errors, upload)
+
+        errors = self.package_errors(upload)
+        if errors:
+            raise self.persist_errors(errors, upload)
+
+        # Everything passed validation.
+        self.file_upload = FileUpload.from_post(
+            upload, upload.name, upload.size)
+        self.file_upload.user = self.user
+        self.file_upload.save()
+
+    def size_errors(self, size):
+        """Returns the errors for a package of `size` bytes."""
+        if size > self.max_size:
+            return [{
                 'type': 'error',
                 'message': _('Packaged app too large for submission. Packages '
                              'must be smaller than %s.' % filesizeformat(
                                  self.max_size)),
                 'tier': 1,
-            })
-            # Immediately raise an error, do not process the rest of the view,
-            # which would read the file.
-            raise self.persist_errors(errors, upload)
+            }]
+        return []
 
+    def package_errors(self, upload):
+        """Returns the errors found reading the manifest of the package."""
+        errors = []
         manifest = None
         try:
             # Be careful to keep this as in-memory zip reading.
@@ -493,15 +511,7 @@ class NewPackagedAppForm(happyforms.Form):
                     'message': ''.join(e.messages),
                     'tier': 1,
                 })
-
-        if errors:
-            raise self.persist_errors(errors, upload)
-
-        # Everything passed validation.
-        self.file_upload = FileUpload.from_post(
-            upload, upload.name, upload.size)
-        self.file_upload.user = self.user
-        self.file_upload.save()
+        return errors
 
     def persist_errors(self, errors, upload):
         """
@@ -278,6 +278,10 @@ class GroupLog(amo.models.ModelBase):
 
 class ActivityLogManager(amo.models.ManagerBase):
 
+    def get_query_set(self):
+        qs = super(ActivityLogManager, self).get_query_set()
+        return qs.transform(ActivityLog.transformer)
+
     def for_apps(self, apps):
         vals = (AppLog.objects.filter(addon__in=apps)
                 .values_list('activity_log', flat=True))
@@ -383,9 +387,34 @@ class ActivityLog(amo.models.ModelBase):
         # SafeFormatter escapes everything so this is safe.
         return jinja2.Markup(self.formatter.format(*args, **kw))
 
-    @property
-    def arguments(self):
+    @staticmethod
+    def transformer(logs):
+        """
+        Fetch the arguments of all the logs with one query per model instead
+        of one per argument.
+        """
+        parsed, pks = {}, {}
+        for al in logs:
+            parsed[al.id] = al._parse_arguments()
+            for model_name, pk in parsed[al.id] or []:
+                if model_name not in ('str', 'int', 'null'):
+                    pks.setdefault(model_name, set()).add(pk)
+
+        objs = {}
+        for model_name, model_pks in pks.items():
+            model = models.loading.get_model(*model_name.split('.'))
+            # Cope with soft deleted models.
+            if hasattr(model, 'with_deleted'):
+                qs = model.with_deleted.filter(pk__in=model_pks)
+            else:
+                qs = model.objects.filter(pk__in=model_pks)
+            objs.update(((model_name, unicode(obj.pk)), obj) for obj in qs)
 
+        for al in logs:
+            al._arguments_cache = al._hydrate(parsed[al.id], objs)
+
+    def _parse_arguments(self):
+        """Returns the (model name, pk) tuples stored in _arguments."""
         try:
             # d is a structure:
             # ``d = [{'addons.addon':12}, {'addons.addon':1}, ... ]``
@@ -393,23 +422,25 @@ class ActivityLog(amo.models.ModelBase):
         except:
             log.debug('unserializing data from addon_log failed: %s' % self.id)
             return None
+        # item has only one element.
+        return [item.items()[0] for item in d]
 
-        objs = []
-        for item in d:
-            # item has only one element.
-            model_name, pk = item.items()[0]
+    def _hydrate(self, parsed, objs):
+        if parsed is None:
+            return None
+        args = []
+        for model_name, pk in parsed:
             if model_name in ('str', 'int', 'null'):
-                objs.append(pk)
-            else:
-                (app_label, model_name) = model_name.split('.')
-                model = models.loading.get_model(app_label, model_name)
-                # Cope with soft deleted models.
-                if hasattr(model, 'with_deleted'):
-                    objs.extend(model.with_deleted.filter(pk=pk))
-                else:
-                    objs.extend(model.objects.filter(pk=pk))
+                args.append(pk)
+            elif (model_name, unicode(pk)) in objs:
+                args.append(objs[(model_name, unicode(pk))])
+        return args
 
-        return objs
+    @property
+    def arguments(self):
+        if not hasattr(self, '_arguments_cache'):
+            self.transformer([self])
+        return self._arguments_cache
 
     @arguments.setter
     def arguments(self, args=[]):
@@ -438,6 +469,8 @@ class ActivityLog(amo.models.ModelBase):
                 serialize_me.append(dict(((unicode(arg._meta), arg.pk),)))
 
         self._arguments = json.dumps(serialize_me)
+        if hasattr(self, '_arguments_cache'):
+            del self._arguments_cache
 
     @property
     def details(self):
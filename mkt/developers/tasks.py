@@ -263,11 +263,20 @@ def get_preview_sizes(ids, **kw):
                           % (addon.pk, err))
 
 
-def _fetch_content(url):
+def _fetch_content(url, headers=None):
+    """
+    Fetches `url`, sending `headers` on top of the default ones. A 304 Not
+    Modified response to conditional `headers` is returned like a success.
+    """
     with statsd.timer('developers.tasks.fetch_content'):
         try:
             res = requests.get(url, timeout=30, stream=True,
-                               headers=REQUESTS_HEADERS)
+                               headers=dict(REQUESTS_HEADERS,
+                                            **(headers or {})))
+
+            if res.status_code == 304 and headers:
+                statsd.incr('developers.tasks.fetch_content.not_modified')
+                return res
 
             if not 200 <= res.status_code < 300:
                 statsd.incr('developers.tasks.fetch_content.error')
@@ -403,7 +412,14 @@ def failed_validation(*messages, **kwargs):
                        'prelim': True})
 
 
-def _fetch_manifest(url, upload=None):
+def _fetch_manifest(url, upload=None, headers=None, validators=None):
+    """
+    Returns the content of the manifest at `url`.
+
+    `headers` are conditional request headers, if the manifest was not
+    modified since, returns None. The ETag and Last-Modified of the response
+    are put in the `validators` dict, for the next conditional request.
+    """
     def fail(message, upload=None):
         if upload is None:
             # If `upload` is None, that means we're using one of @washort's old
@@ -412,13 +428,19 @@ def _fetch_manifest(url, upload=None):
         upload.update(validation=failed_validation(message, upload=upload))
 
     try:
-        response = _fetch_content(url)
+        response = _fetch_content(url, headers=headers)
     except Exception, e:
         log.error('Failed to fetch manifest from %r: %s' % (url, e))
         fail(_('No manifest was found at that URL. Check the address and try '
                'again.'), upload=upload)
         return
 
+    if validators is not None:
+        validators.update(etag=response.headers.get('etag'),
+                          last_modified=response.headers.get('last-modified'))
+    if headers and response.status_code == 304:
+        return None
+
     ct = response.headers.get('content-type', '')
     if not ct.startswith('application/x-web-app-manifest+json'):
         fail(_('Manifests must be served with the HTTP header '
@@ -89,6 +89,44 @@ class TestActivityLogCount(amo.tests.TestCase):
         eq_(len(ActivityLog.objects.for_developer()), 1)
 
 
+class TestActivityLogArguments(amo.tests.TestCase):
+    fixtures = fixture('webapp_337141', 'user_2519')
+
+    def setUp(self):
+        self.app = Webapp.objects.get()
+        self.user = UserProfile.objects.get(pk=2519)
+        amo.set_user(self.user)
+
+    def test_arguments(self):
+        amo.log(amo.LOG.CHANGE_STATUS, self.app, amo.STATUS_PUBLIC)
+        eq_(ActivityLog.objects.no_cache().get().arguments,
+            [self.app, amo.STATUS_PUBLIC])
+
+    def test_arguments_fetched_once(self):
+        version = self.app.current_version
+        for i in range(3):
+            amo.log(amo.LOG.EDIT_VERSION, self.app, version)
+        logs = list(ActivityLog.objects.no_cache())
+        with self.assertNumQueries(0):
+            for al in logs:
+                eq_(al.arguments, [self.app, version])
+
+    def test_arguments_missing(self):
+        amo.log(amo.LOG.EDIT_VERSION, self.app, (Webapp, 12345))
+        eq_(ActivityLog.objects.no_cache().get().arguments, [self.app])
+
+    def test_arguments_garbage(self):
+        al = amo.log(amo.LOG.CUSTOM_TEXT, 'hi')
+        al.update(_arguments='garbage')
+        eq_(ActivityLog.objects.no_cache().get().arguments, None)
+
+    def test_arguments_setter(self):
+        al = amo.log(amo.LOG.CUSTOM_TEXT, 'hi')
+        eq_(al.arguments, ['hi'])
+        al.arguments = ['ho']
+        eq_(al.arguments, ['ho'])
+
+
 class TestPaymentAccount(Patcher, amo.tests.TestCase):
     fixtures = fixture('webapp_337141', 'user_999')
 
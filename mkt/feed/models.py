@@ -21,6 +21,7 @@ from django.dispatch import receiver
 import amo.models
 from amo.decorators import use_master
 from amo.models import SlugField
+from amo.utils import cache_ns_key
 
 import mkt.carriers
 import mkt.regions
@@ -28,7 +29,9 @@ from mkt.collections.fields import ColorField
 from mkt.constants.categories import CATEGORY_CHOICES
 from mkt.feed import indexers
 from mkt.ratings.validators import validate_rating
+from mkt.search.signals import indexed
 from mkt.translations.fields import PurifiedField, save_signal
+from mkt.webapps.indexers import WebappIndexer
 from mkt.webapps.models import Addon, clean_slug, Preview, Webapp
 from mkt.webapps.tasks import index_webapps
 
@@ -442,6 +445,71 @@ def delete_search_index(sender, instance, **kw):
     instance.get_indexer().unindex(instance.id)
 
 
+# The feed API caches whole pages under this namespace.
+FEED_CACHE_NAMESPACE = 'mkt:feed'
+
+
+def invalidate_feed_cache():
+    cache_ns_key(FEED_CACHE_NAMESPACE, increment=True)
+
+
+# Invalidate the feed when it changes, and again once the change is indexed.
+@receiver(models.signals.post_save, sender=FeedApp,
+          dispatch_uid='feedapp.feed.cache')
+@receiver(models.signals.post_save, sender=FeedBrand,
+          dispatch_uid='feedbrand.feed.cache')
+@receiver(models.signals.post_save, sender=FeedCollection,
+          dispatch_uid='feedcollection.feed.cache')
+@receiver(models.signals.post_save, sender=FeedShelf,
+          dispatch_uid='feedshelf.feed.cache')
+@receiver(models.signals.post_save, sender=FeedItem,
+          dispatch_uid='feeditem.feed.cache')
+@receiver(models.signals.post_save, sender=FeedBrandMembership,
+          dispatch_uid='feedbrandmembership.feed.cache')
+@receiver(models.signals.post_save, sender=FeedCollectionMembership,
+          dispatch_uid='feedcollectionmembership.feed.cache')
+@receiver(models.signals.post_save, sender=FeedShelfMembership,
+          dispatch_uid='feedshelfmembership.feed.cache')
+@receiver(models.signals.post_delete, sender=FeedApp,
+          dispatch_uid='feedapp.feed.uncache')
+@receiver(models.signals.post_delete, sender=FeedBrand,
+          dispatch_uid='feedbrand.feed.uncache')
+@receiver(models.signals.post_delete, sender=FeedCollection,
+          dispatch_uid='feedcollection.feed.uncache')
+@receiver(models.signals.post_delete, sender=FeedShelf,
+          dispatch_uid='feedshelf.feed.uncache')
+@receiver(models.signals.post_delete, sender=FeedItem,
+          dispatch_uid='feeditem.feed.uncache')
+@receiver(models.signals.post_delete, sender=FeedBrandMembership,
+          dispatch_uid='feedbrandmembership.feed.uncache')
+@receiver(models.signals.post_delete, sender=FeedCollectionMembership,
+          dispatch_uid='feedcollectionmembership.feed.uncache')
+@receiver(models.signals.post_delete, sender=FeedShelfMembership,
+          dispatch_uid='feedshelfmembership.feed.uncache')
+@receiver(indexed, sender=indexers.FeedAppIndexer,
+          dispatch_uid='feedapp.feed.indexed')
+@receiver(indexed, sender=indexers.FeedBrandIndexer,
+          dispatch_uid='feedbrand.feed.indexed')
+@receiver(indexed, sender=indexers.FeedCollectionIndexer,
+          dispatch_uid='feedcollection.feed.indexed')
+@receiver(indexed, sender=indexers.FeedShelfIndexer,
+          dispatch_uid='feedshelf.feed.indexed')
+@receiver(indexed, sender=indexers.FeedItemIndexer,
+          dispatch_uid='feeditem.feed.indexed')
+def update_feed_cache(sender, **kw):
+    if not kw.get('raw'):
+        invalidate_feed_cache()
+
+
+@receiver(indexed, sender=WebappIndexer, dispatch_uid='webapp.feed.indexed')
+def update_feed_cache_apps(sender, ids, **kw):
+    """The feed embeds the apps, so invalidate it if any is in the feed."""
+    models_ = [FeedApp, FeedBrandMembership, FeedCollectionMembership,
+               FeedShelfMembership]
+    if any(m.objects.filter(app__in=ids).exists() for m in models_):
+        invalidate_feed_cache()
+
+
 # Save translations when saving instance with translated fields.
 models.signals.pre_save.connect(
     save_signal, sender=FeedApp,
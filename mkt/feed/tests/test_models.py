@@ -11,9 +11,13 @@ from nose.tools import eq_, ok_
 import amo.tests
 
 import mkt.feed.constants as feed
-from mkt.feed.models import (FeedApp, FeedBrand, FeedCollection, FeedItem,
-                             FeedShelf)
+from amo.utils import cache_ns_key
+from mkt.feed.indexers import FeedItemIndexer
+from mkt.feed.models import (FEED_CACHE_NAMESPACE, FeedApp, FeedBrand,
+                             FeedCollection, FeedItem, FeedShelf)
+from mkt.search.signals import indexed
 from mkt.site.fixtures import fixture
+from mkt.webapps.indexers import WebappIndexer
 from mkt.webapps.models import Webapp
 
 
@@ -265,6 +269,39 @@ class TestESReceivers(FeedTestMixin, amo.tests.TestCase):
         eq_(delete_mock.call_count, count)
 
 
+class TestFeedCacheReceivers(FeedTestMixin, amo.tests.TestCase):
+
+    def key(self):
+        return cache_ns_key(FEED_CACHE_NAMESPACE)
+
+    def test_save(self):
+        key = self.key()
+        self.feed_item_factory()
+        ok_(self.key() != key)
+
+    def test_delete(self):
+        feed_item = self.feed_item_factory()
+        key = self.key()
+        feed_item.delete()
+        ok_(self.key() != key)
+
+    def test_indexed(self):
+        key = self.key()
+        indexed.send(sender=FeedItemIndexer, ids=[1])
+        ok_(self.key() != key)
+
+    def test_app_indexed(self):
+        self.feed_app_factory()
+        key = self.key()
+        indexed.send(sender=WebappIndexer, ids=[337141])
+        ok_(self.key() != key)
+
+    def test_app_not_in_feed_indexed(self):
+        key = self.key()
+        indexed.send(sender=WebappIndexer, ids=[337141])
+        eq_(self.key(), key)
+
+
 class TestFeedShelf(FeedTestMixin, amo.tests.TestCase):
 
     def test_is_published(self):
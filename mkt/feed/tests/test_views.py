@@ -1360,6 +1360,33 @@ class TestFeedView(BaseTestFeedESView, BaseTestFeedItemViewSet):
         for i, feed_item in enumerate(feed_items):
             eq_(data['objects'][i]['id'], feed_item.id)
 
+    def test_cached(self):
+        self.feed_factory()
+        self._refresh()
+        res, data = self._get()
+        with mock.patch.object(FeedView, '_get') as _get:
+            cached_res, cached_data = self._get()
+        ok_(not _get.called)
+        eq_(cached_res.status_code, 200)
+        eq_(cached_data, data)
+
+    def test_cached_by_query(self):
+        self.feed_factory()
+        self._refresh()
+        self._get()
+        res, data = self._get(carrier='tmn')
+        eq_(len(data['objects']), 3)
+
+    def test_cache_invalidated(self):
+        self.feed_item_factory()
+        self._refresh()
+        res, data = self._get()
+        eq_(len(data['objects']), 1)
+        self.feed_item_factory()
+        self._refresh()
+        res, data = self._get()
+        eq_(len(data['objects']), 2)
+
 
 class TestFeedViewQueries(BaseTestFeedItemViewSet, amo.tests.TestCase):
     fixtures = BaseTestFeedItemViewSet.fixtures + FeedTestMixin.fixtures
@@ -1,6 +1,12 @@
+import hashlib
+import urllib
+
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.storage import default_storage as storage
 from django.db.models import Q
+from django.utils import translation
+from django.utils.encoding import smart_str
 
 from django_statsd.clients import statsd
 from elasticsearch_dsl import filter as es_filter
@@ -12,6 +18,8 @@ from rest_framework.exceptions import ParseError
 from rest_framework.filters import BaseFilterBackend, OrderingFilter
 from rest_framework.views import APIView
 
+from amo.utils import cache_ns_key
+
 import mkt
 import mkt.feed.constants as feed
 from mkt.api.authentication import (RestAnonymousAuthentication,
@@ -28,7 +36,8 @@ from mkt.webapps.models import Webapp
 
 from .authorization import FeedAuthorization
 from .fields import ImageURLField
-from .models import FeedApp, FeedBrand, FeedCollection, FeedItem, FeedShelf
+from .models import (FEED_CACHE_NAMESPACE, FeedApp, FeedBrand,
+                     FeedCollection, FeedItem, FeedShelf)
 from .serializers import (FeedAppESSerializer, FeedAppSerializer,
                           FeedBrandESSerializer, FeedBrandSerializer,
                           FeedCollectionESSerializer, FeedCollectionSerializer,
@@ -458,6 +467,9 @@ class FeedView(MarketplaceView, BaseFeedESView, generics.GenericAPIView):
     - a weighted function score query to get feed items
     - a filter to deserialize feed elements
     - a mget to deserialize apps
+
+    The serialized pages are cached by region, language and query string
+    until the feed or one of its apps is reindexed.
     """
     authentication_classes = []
     cors_allowed_methods = ('get',)
@@ -581,9 +593,29 @@ class FeedView(MarketplaceView, BaseFeedESView, generics.GenericAPIView):
         return response.Response({'meta': meta, 'objects': feed_items},
                                  status=status.HTTP_200_OK)
 
+    def get_cache_key(self, request):
+        # The query string has the carrier and the pagination, the region
+        # can also come from the IP address.
+        query = urllib.urlencode(sorted(request.GET.lists()), doseq=True)
+        key = hashlib.md5(smart_str(u':'.join([
+            request.path, unicode(request.REGION.id),
+            translation.get_language() or u'', query]))).hexdigest()
+        return 'feed:%s:%s' % (cache_ns_key(FEED_CACHE_NAMESPACE), key)
+
     def get(self, request, *args, **kwargs):
+        key = self.get_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            statsd.incr('mkt.feed.view.cache.hit')
+            data, status_code = cached
+            return response.Response(data, status=status_code)
+
+        statsd.incr('mkt.feed.view.cache.miss')
         with statsd.timer('mkt.feed.view'):
-            return self._get(request, *args, **kwargs)
+            res = self._get(request, *args, **kwargs)
+        cache.set(key, (res.data, res.status_code),
+                  settings.CACHE_FEED_TIMEOUT)
+        return res
 
 
 class FeedElementGetView(BaseFeedESView):
@@ -3,7 +3,12 @@ import json
 import mimetypes
 import os
 import stat
+import threading
+import time
+import zipfile
+from collections import defaultdict, OrderedDict
 
+from django import http
 from django.conf import settings
 from django.core.files.storage import default_storage as storage
 from django.core.urlresolvers import reverse
@@ -20,8 +25,8 @@ from appvalidator.testcases.packagelayout import (blacklisted_extensions,
                                                   blacklisted_magic_numbers)
 
 import amo
-from amo.utils import rm_local_tmp_dir
-from mkt.files.utils import extract_xpi, get_md5
+from amo.utils import HttpResponseSendFile, rm_local_tmp_dir
+from mkt.files.utils import extract_xpi, get_md5, SafeUnzip
 
 
 # Allow files with a shebang through.
@@ -162,17 +167,26 @@ class FileViewer(object):
             self.selected['msg'] = msg
             return ''
 
+        cont = self._read_contents()
+        codec = 'utf-16' if cont.startswith(codecs.BOM_UTF16) else 'utf-8'
+        try:
+            return cont.decode(codec)
+        except UnicodeDecodeError:
+            cont = cont.decode(codec, 'ignore')
+            #L10n: {0} is the filename.
+            self.selected['msg'] = (
+                _('Problems decoding {0}.').format(codec))
+            return cont
+
+    def _read_contents(self):
+        """Returns the raw contents of the selected file."""
         with storage.open(self.selected['full'], 'r') as opened:
-            cont = opened.read()
-            codec = 'utf-16' if cont.startswith(codecs.BOM_UTF16) else 'utf-8'
-            try:
-                return cont.decode(codec)
-            except UnicodeDecodeError:
-                cont = cont.decode(codec, 'ignore')
-                #L10n: {0} is the filename.
-                self.selected['msg'] = (
-                    _('Problems decoding {0}.').format(codec))
-                return cont
+            return opened.read()
+
+    def serve(self, request, obj):
+        """Returns a response serving the file `obj` from get_files()."""
+        return HttpResponseSendFile(request, obj['full'],
+                                    content_type=obj['mimetype'])
 
     def _process_manifest(self, data):
         """
@@ -332,11 +346,215 @@ class FileViewer(object):
         return res
 
 
+class MemberCache(object):
+    """
+    Keeps the most recently read package members in memory, up to
+    settings.FILE_VIEWER_MEMBER_CACHE_SIZE bytes in total.
+    """
+
+    def __init__(self):
+        self.data = OrderedDict()
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.data.pop(key, None)
+            if value is not None:
+                # Re-insert to mark as most recently used.
+                self.data[key] = value
+            return value
+
+    def set(self, key, value):
+        size = settings.FILE_VIEWER_MEMBER_CACHE_SIZE
+        if len(value) > size:
+            return
+        with self.lock:
+            old = self.data.pop(key, None)
+            if old is not None:
+                self.used -= len(old)
+            self.data[key] = value
+            self.used += len(value)
+            while self.used > size:
+                self.used -= len(self.data.popitem(last=False)[1])
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.used = 0
+
+
+member_cache = MemberCache()
+
+
+class ZipFileViewer(FileViewer):
+    """
+    A FileViewer reading the package in place. `extract` only writes an index
+    of the zip central directory to `dest`, files are read from the package
+    when they are selected and compared by CRC32. Packages inside the package
+    are shown as files, they are not expanded.
+    """
+
+    def __init__(self, file_obj):
+        super(ZipFileViewer, self).__init__(file_obj)
+        self.index_path = os.path.join(self.dest, 'index.json')
+
+    def extract(self):
+        """
+        Writes the index of the package, a list of
+        [position, name, crc, size, modified, magic] lists where `magic` tells
+        if the file starts with blacklisted magic numbers.
+        Raises error on nasty files.
+        """
+        try:
+            zip = SafeUnzip(self.src)
+            zip.is_valid(fatal=True)
+            index = []
+            for position, info in enumerate(zip.info):
+                name = smart_unicode(info.filename, errors='replace')
+                magic = False
+                if not name.endswith('/'):
+                    with zip.zip.open(info) as member:
+                        bytes = tuple(map(ord, member.read(4)))
+                    magic = any(bytes[:len(x)] == x
+                                for x in blacklisted_magic_numbers)
+                index.append([position, name, info.CRC, info.file_size,
+                              time.mktime(info.date_time + (0, 0, -1)),
+                              magic])
+        except Exception, err:
+            task_log.error('Error (%s) indexing %s' % (err, self.src))
+            raise
+
+        if not os.path.exists(self.dest):
+            os.makedirs(self.dest)
+        tmp = '%s.tmp' % self.index_path
+        with open(tmp, 'w') as f:
+            json.dump(index, f)
+        os.rename(tmp, self.index_path)
+
+    def is_extracted(self):
+        """If the package has been indexed or not."""
+        return (os.path.exists(self.index_path) and not
+                Message(self._extraction_cache_key()).get())
+
+    def _is_binary(self, mimetype, path, magic=False):
+        # The magic numbers were checked when indexing.
+        ext = os.path.splitext(path)[1][1:]
+        if magic or ext in blacklisted_extensions:
+            return True
+        if mimetype and mimetype.split('/')[0] == 'image':
+            return 'image'
+        return False
+
+    def _read_contents(self):
+        key = (self.file.id, self.selected['member'], self.selected['md5'])
+        cont = member_cache.get(key)
+        if cont is None:
+            with zipfile.ZipFile(self.src) as zip:
+                cont = zip.read(zip.infolist()[self.selected['member']])
+            member_cache.set(key, cont)
+        return cont
+
+    def _stream_member(self, position):
+        """Yields the member in chunks, closing the package when done."""
+        zip = zipfile.ZipFile(self.src)
+        try:
+            member = zip.open(zip.infolist()[position])
+            try:
+                for chunk in iter(lambda: member.read(64 * 1024), ''):
+                    yield chunk
+            finally:
+                member.close()
+        finally:
+            zip.close()
+
+    def serve(self, request, obj):
+        response = http.StreamingHttpResponse(
+            self._stream_member(obj['member']), content_type=obj['mimetype'])
+        response['Content-Length'] = obj['size']
+        return response
+
+    # Not the prefix of FileViewer, the files listed by it don't have members.
+    @memoize(prefix='file-viewer-zip', time=60 * 60)
+    def _get_files(self):
+        with open(self.index_path) as f:
+            index = json.load(f)
+
+        # Zip files don't have to list the directories, find them from the
+        # names of the files.
+        entries, children = {}, defaultdict(lambda: (set(), set()))
+        for position, name, crc, size, modified, magic in index:
+            directory = name.endswith('/')
+            name = name.rstrip('/')
+            entries[name] = (position, directory, crc, size, modified, magic)
+            parts = name.split('/')
+            for depth in range(len(parts)):
+                parent, child = '/'.join(parts[:depth]), parts[depth]
+                is_dir = directory or depth < len(parts) - 1
+                children[parent][0 if is_dir else 1].add(child)
+
+        # Same order as FileViewer: directories first, then files.
+        all_files = []
+
+        def iterate(path):
+            path_dirs, path_files = children.get(path, ((), ()))
+            for dirname in sorted(path_dirs):
+                full = '/'.join(filter(None, [path, dirname]))
+                all_files.append((full, True))
+                iterate(full)
+
+            for filename in sorted(path_files):
+                all_files.append(('/'.join(filter(None, [path, filename])),
+                                  False))
+
+        iterate('')
+
+        res = SortedDict()
+        for short, directory in all_files:
+            position, _dir, crc, size, modified, magic = entries.get(
+                short, (None, True, 0, 0, 0, False))
+            filename = os.path.basename(short)
+            mime, encoding = mimetypes.guess_type(filename)
+            if not mime and filename == 'manifest.webapp':
+                mime = 'application/x-web-app-manifest+json'
+
+            res[short] = {
+                'binary': not directory and self._is_binary(mime, short,
+                                                            magic),
+                'depth': short.count('/'),
+                'directory': directory,
+                'filename': filename,
+                'full': short,
+                'md5': '%08x' % crc if not directory else '',
+                'member': position,
+                'mimetype': mime or 'application/octet-stream',
+                'syntax': self.get_syntax(filename),
+                'modified': modified,
+                'short': short,
+                'size': size,
+                'truncated': self.truncate(filename),
+                'url': reverse('mkt.files.list',
+                               args=[self.file.id, 'file', short]),
+                'url_serve': reverse('mkt.files.redirect',
+                                     args=[self.file.id, short]),
+                'version': self.file.version.version,
+            }
+
+        return res
+
+
+def get_viewer(file_obj):
+    """Returns the file viewer to use for `file_obj`."""
+    if settings.FILE_VIEWER_ZIP:
+        return ZipFileViewer(file_obj)
+    return FileViewer(file_obj)
+
+
 class DiffHelper(object):
 
     def __init__(self, left, right):
-        self.left = FileViewer(left)
-        self.right = FileViewer(right)
+        self.left = get_viewer(left)
+        self.right = get_viewer(right)
         self.addon = self.left.addon
         self.key = None
 
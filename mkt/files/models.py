@@ -271,6 +271,8 @@ class FileUpload(amo.models.ModelBase):
     valid = models.BooleanField(default=False)
     validation = models.TextField(null=True)
     task_error = models.TextField(null=True)
+    # The size of the package declared when starting a chunked upload.
+    size = models.PositiveIntegerField(null=True)
 
     objects = amo.models.UncachedManagerBase()
 
@@ -289,12 +291,17 @@ class FileUpload(amo.models.ModelBase):
                 log.error('Invalid validation json: %r' % self)
         super(FileUpload, self).save()
 
-    def add_file(self, chunks, filename, size):
-        filename = smart_str(filename)
+    @staticmethod
+    def get_temp_path(filename):
         loc = os.path.join(settings.ADDONS_PATH, 'temp', uuid.uuid4().hex)
         base, ext = os.path.splitext(amo.utils.smart_path(filename))
         if ext in EXTENSIONS:
             loc += ext
+        return loc
+
+    def add_file(self, chunks, filename, size):
+        filename = smart_str(filename)
+        loc = self.get_temp_path(filename)
         log.info('UPLOAD: %r (%s bytes) to %r' % (filename, size, loc))
         hash = hashlib.sha256()
         with storage.open(loc, 'wb') as fd:
@@ -312,6 +319,46 @@ class FileUpload(amo.models.ModelBase):
         fu.add_file(chunks, filename, size)
         return fu
 
+    @classmethod
+    def start_chunked(cls, filename, size, user=None):
+        """
+        Creates an upload of `size` bytes whose file is sent in chunks with
+        add_chunk(), so that an interrupted upload can be resumed.
+        """
+        filename = smart_str(filename)
+        fu = cls.objects.create(path=cls.get_temp_path(filename),
+                                name=filename, size=size, user=user)
+        log.info('UPLOAD: %r started in chunks to %r' % (filename, fu.path))
+        return fu
+
+    @property
+    def received(self):
+        """The number of bytes received of a chunked upload."""
+        if self.path and storage.exists(self.path):
+            return storage.size(self.path)
+        return 0
+
+    def add_chunk(self, chunks, start):
+        """
+        Appends `chunks`, starting at byte `start` of the file. Returns
+        False without writing anything if `start` isn't where the file ends.
+        """
+        if self.hash or start != self.received:
+            return False
+        with storage.open(self.path, 'ab') as fd:
+            for chunk in chunks:
+                fd.write(chunk)
+        return True
+
+    def finish_chunked(self):
+        """Hashes the file once all the chunks have been received."""
+        hash = hashlib.sha256()
+        with storage.open(self.path, 'rb') as fd:
+            for chunk in iter(lambda: fd.read(64 * 1024), ''):
+                hash.update(chunk)
+        self.hash = 'sha256:%s' % hash.hexdigest()
+        self.save()
+
     @property
     def processed(self):
         return bool(self.valid or self.validation)
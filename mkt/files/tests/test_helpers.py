@@ -11,7 +11,8 @@ from mock import Mock, patch
 from nose.tools import eq_
 
 import amo.tests
-from mkt.files.helpers import FileViewer, DiffHelper
+from mkt.files.helpers import (DiffHelper, FileViewer, member_cache,
+                               MemberCache, ZipFileViewer)
 from mkt.files.utils import SafeUnzip
 
 
@@ -179,6 +180,141 @@ class TestFileHelper(amo.tests.TestCase):
         eq_({}, self.viewer.get_files())
 
 
+class TestZipFileViewer(amo.tests.TestCase):
+
+    def setUp(self):
+        self.viewer = ZipFileViewer(make_file(1,
+                                              get_file('dictionary-test.xpi')))
+        cache.clear()
+        member_cache.clear()
+
+    def tearDown(self):
+        self.viewer.cleanup()
+
+    def test_files_extracted(self):
+        eq_(self.viewer.is_extracted(), False)
+        self.viewer.extract()
+        eq_(self.viewer.is_extracted(), True)
+        # Only the index was written.
+        eq_(os.listdir(self.viewer.dest), ['index.json'])
+
+    def test_get_files_not_extracted(self):
+        assert not self.viewer.get_files()
+
+    def test_get_files_same_as_extracted(self):
+        viewer = FileViewer(self.viewer.file)
+        viewer.extract()
+        self.addCleanup(viewer.cleanup)
+        extracted = viewer.get_files()
+        cache.clear()
+        self.viewer.extract()
+        files = self.viewer.get_files()
+        eq_(files.keys(), extracted.keys())
+        for key, value in files.items():
+            for attr in ('binary', 'depth', 'directory', 'mimetype'):
+                eq_(value[attr], extracted[key][attr])
+            if not value['directory']:
+                eq_(value['size'], extracted[key]['size'])
+
+    def test_get_files_crc(self):
+        self.viewer.extract()
+        files = self.viewer.get_files()
+        crc = zipfile.ZipFile(self.viewer.src).getinfo('install.js').CRC
+        eq_(files['install.js']['md5'], '%08x' % crc)
+        eq_(files['dictionaries']['md5'], '')
+
+    def test_implicit_directory(self):
+        dest = os.path.join(settings.TMP_PATH, 'test_implicit.zip')
+        with zipfile.ZipFile(dest, 'w') as zip:
+            zip.writestr('a/b/c.txt', 'c')
+        self.addCleanup(os.remove, dest)
+        self.viewer.src = dest
+        self.viewer.extract()
+        files = self.viewer.get_files()
+        eq_(files.keys(), ['a', 'a/b', 'a/b/c.txt'])
+        eq_(files['a/b']['directory'], True)
+
+    def test_read_file(self):
+        self.viewer.extract()
+        self.viewer.select('install.js')
+        content = zipfile.ZipFile(self.viewer.src).read('install.js')
+        eq_(self.viewer.read_file(), content.decode('utf-8'))
+        # The second read comes from the member cache.
+        with patch('mkt.files.helpers.zipfile.ZipFile') as ZipFile:
+            eq_(self.viewer.read_file(), content.decode('utf-8'))
+        assert not ZipFile.called
+
+    @patch.object(settings, 'FILE_VIEWER_SIZE_LIMIT', 5)
+    def test_file_size(self):
+        self.viewer.extract()
+        self.viewer.select('install.js')
+        eq_(self.viewer.read_file(), '')
+        assert self.viewer.selected['msg'].startswith('File size is')
+
+    def test_serve(self):
+        self.viewer.extract()
+        obj = self.viewer.get_files()['install.js']
+        res = self.viewer.serve(Mock(), obj)
+        eq_(''.join(res.streaming_content),
+            zipfile.ZipFile(self.viewer.src).read('install.js'))
+        eq_(res['Content-Length'], str(obj['size']))
+
+    @patch.object(settings, 'FILE_VIEWER_ZIP', True)
+    def test_serve_closes(self):
+        self.viewer.extract()
+        obj = self.viewer.get_files()['install.js']
+        zips, ZipFile = [], zipfile.ZipFile
+
+        def open_zip(*args):
+            zips.append(ZipFile(*args))
+            return zips[-1]
+
+        with patch('mkt.files.helpers.zipfile.ZipFile', side_effect=open_zip):
+            res = self.viewer.serve(Mock(), obj)
+            assert next(iter(res.streaming_content))
+        res.close()
+        eq_(len(zips), 1)
+        eq_(zips[0].fp, None)
+
+    @patch.object(settings, 'FILE_VIEWER_ZIP', True)
+    def test_get_files_not_from_extracting_viewer(self):
+        viewer = FileViewer(self.viewer.file)
+        viewer.extract()
+        self.addCleanup(viewer.cleanup)
+        assert 'member' not in viewer.get_files()['install.js']
+        self.viewer.extract()
+        self.viewer.select('install.js')
+        content = zipfile.ZipFile(self.viewer.src).read('install.js')
+        eq_(self.viewer.read_file(), content.decode('utf-8'))
+
+    @patch.object(settings, 'FILE_VIEWER_ZIP', True)
+    def test_diff(self):
+        helper = DiffHelper(self.viewer.file,
+                            make_file(2, get_file('dictionary-test.xpi')))
+        self.addCleanup(helper.cleanup)
+        helper.extract()
+        assert isinstance(helper.left, ZipFileViewer)
+        files = helper.get_files()
+        eq_([k for k, f in files.items() if f['diff']], [])
+
+
+class TestMemberCache(amo.tests.TestCase):
+
+    @patch.object(settings, 'FILE_VIEWER_MEMBER_CACHE_SIZE', 5)
+    def test_size(self):
+        cache = MemberCache()
+        cache.set('a', 'aa')
+        cache.set('b', 'bb')
+        eq_(cache.get('a'), 'aa')
+        cache.set('c', 'cc')
+        # b was the least recently used.
+        eq_(cache.get('b'), None)
+        eq_(cache.get('a'), 'aa')
+        eq_(cache.used, 4)
+        cache.set('d', 'dddddd')
+        eq_(cache.get('d'), None)
+
+
 class TestDiffHelper(amo.tests.TestCase):
 
     def setUp(self):
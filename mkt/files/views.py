@@ -13,7 +13,7 @@ from cache_nuggets.lib import Message, Token
 from tower import ugettext as _
 
 from amo.decorators import json_view
-from amo.utils import HttpResponseSendFile, urlparams
+from amo.utils import urlparams
 from mkt.access import acl
 from mkt.files import forms
 from mkt.files.decorators import (compare_webapp_file_view, etag, last_modified,
@@ -189,5 +189,4 @@ def serve(request, viewer, key):
         log.error(u'Couldn\'t find %s in %s (%d entries) for file %s' %
                   (key, files.keys()[:10], len(files.keys()), viewer.file.id))
         raise http.Http404()
-    return HttpResponseSendFile(request, obj['full'],
-                                content_type=obj['mimetype'])
+    return viewer.serve(request, obj)
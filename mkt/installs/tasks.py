@@ -0,0 +1,69 @@
+import json
+import time
+
+from django.conf import settings
+
+import commonware.log
+import redisutils
+from celeryutils import task
+from django_statsd.clients import statsd
+
+from mkt.installs.utils import record_installs
+
+
+log = commonware.log.getLogger('z.task')
+
+# The install queue.
+#
+# The installs API only checks the install is allowed and pushes the event
+# describing it to a redis list. The first event pushed to an empty list
+# schedules `process_install_queue`, which records everything in the list
+# after INSTALLS_QUEUE_DELAY seconds, INSTALLS_QUEUE_BATCH_SIZE at a time.
+
+QUEUE_KEY = 'installs:queue'
+SCHEDULED_KEY = 'installs:queue:scheduled'
+
+
+def queue_installs(events):
+    """Adds install events to the queue, scheduling a run if none is."""
+    delay = settings.INSTALLS_QUEUE_DELAY
+    try:
+        redis = redisutils.connections['master']
+        redis.rpush(QUEUE_KEY, *[json.dumps(event) for event in events])
+        # The key expires in case the run is lost, to not stop recording
+        # for good.
+        scheduled = redis.set(SCHEDULED_KEY, 1, nx=True, ex=delay + 60)
+    except Exception, e:
+        log.error(u'Install queue unavailable, recording %s installs now: '
+                  u'%s' % (len(events), e))
+        record_installs(events)
+        return
+    if scheduled:
+        process_install_queue.apply_async(countdown=delay)
+
+
+@task(acks_late=True)
+def process_install_queue(**kw):
+    """Records all the installs in the queue, in batches."""
+    redis = redisutils.connections['master']
+    # Events pushed from now on schedule another run.
+    redis.delete(SCHEDULED_KEY)
+    size = settings.INSTALLS_QUEUE_BATCH_SIZE
+    while True:
+        pipe = redis.pipeline()
+        pipe.lrange(QUEUE_KEY, 0, size - 1)
+        pipe.ltrim(QUEUE_KEY, size, -1)
+        raw = pipe.execute()[0]
+        if not raw:
+            break
+        events = [json.loads(event) for event in raw]
+        statsd.gauge('installs.queue.batch_size', len(events))
+        statsd.timing('installs.queue.lag',
+                      int((time.time() - events[0]['queued']) * 1000))
+        try:
+            record_installs(events)
+        except Exception:
+            # Put them back for the next run.
+            redis.lpush(QUEUE_KEY, *reversed(raw))
+            raise
+        log.info('Recorded %s installs.' % len(events))
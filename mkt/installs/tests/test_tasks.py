@@ -0,0 +1,115 @@
+import json
+import time
+
+import mock
+from nose.tools import eq_
+
+import amo
+import amo.tests
+from mkt.constants.apps import INSTALL_TYPE_USER
+from mkt.developers.models import ActivityLog
+from mkt.installs import tasks
+from mkt.installs.utils import record_installs
+from mkt.monolith.models import MonolithRecord
+from mkt.site.fixtures import fixture
+from mkt.users.models import UserProfile
+from mkt.webapps.models import Installed, Webapp
+
+
+def event(app, user=None, **kw):
+    data = {'app': app.pk, 'user': user.pk if user else None,
+            'type': INSTALL_TYPE_USER, 'region': 'restofworld',
+            'user-agent': 'Firefox', 'locale': 'en-US', 'src': '',
+            'user_hash': 'abc', 'recorded': '2014-10-01 12:00:00.000000',
+            'queued': time.time()}
+    data.update(kw)
+    return data
+
+
+class TestRecordInstalls(amo.tests.TestCase):
+    fixtures = fixture('user_999', 'user_2519', 'webapp_337141')
+
+    def setUp(self):
+        self.app = Webapp.objects.get(pk=337141)
+        self.users = list(UserProfile.objects.filter(pk__in=[999, 2519]))
+
+    def test_record(self):
+        Installed.objects.create(addon=self.app, user=self.users[0],
+                                 install_type=INSTALL_TYPE_USER)
+        events = [event(self.app, user) for user in self.users]
+        events.append(event(self.app))
+        eq_(record_installs(events), [False, True, True])
+        eq_(Installed.objects.filter(addon=self.app).count(), 2)
+        install = Installed.objects.get(user=self.users[1])
+        eq_(install.premium_type, self.app.premium_type)
+        assert install.uuid
+        eq_(ActivityLog.objects.filter(
+            action=amo.LOG.INSTALL_ADDON.id).count(), 2)
+        eq_(MonolithRecord.objects.filter(key='install').count(), 3)
+
+    def test_twice_in_a_batch(self):
+        events = [event(self.app, self.users[0])] * 2
+        eq_(record_installs(events), [True, False])
+        eq_(Installed.objects.count(), 1)
+
+    @mock.patch.object(MonolithRecord.objects, 'bulk_create')
+    def test_rolled_back(self, bulk_create):
+        bulk_create.side_effect = ValueError
+        with self.assertRaises(ValueError):
+            record_installs([event(self.app, self.users[0])])
+        eq_(Installed.objects.count(), 0)
+        eq_(ActivityLog.objects.filter(
+            action=amo.LOG.INSTALL_ADDON.id).count(), 0)
+
+    def test_unknown_app(self):
+        eq_(record_installs([event(self.app, app=0)]), [])
+        eq_(MonolithRecord.objects.count(), 0)
+
+
+class TestInstallQueue(amo.tests.TestCase):
+    fixtures = fixture('user_999', 'webapp_337141')
+
+    def setUp(self):
+        self.app = Webapp.objects.get(pk=337141)
+        self.user = UserProfile.objects.get(pk=999)
+        patcher = mock.patch('mkt.installs.tasks.redisutils')
+        self.redis = patcher.start().connections['master']
+        self.addCleanup(patcher.stop)
+
+    @mock.patch('mkt.installs.tasks.process_install_queue')
+    def test_queue(self, process):
+        self.redis.set.return_value = True
+        tasks.queue_installs([event(self.app, self.user)])
+        eq_(self.redis.rpush.call_args[0][0], tasks.QUEUE_KEY)
+        assert process.apply_async.called
+
+    @mock.patch('mkt.installs.tasks.process_install_queue')
+    def test_queue_already_scheduled(self, process):
+        self.redis.set.return_value = None
+        tasks.queue_installs([event(self.app, self.user)])
+        assert not process.apply_async.called
+
+    def test_queue_unavailable(self):
+        self.redis.rpush.side_effect = Exception('down')
+        tasks.queue_installs([event(self.app, self.user)])
+        eq_(Installed.objects.filter(user=self.user).count(), 1)
+
+    @mock.patch('mkt.installs.tasks.statsd')
+    def test_process(self, statsd):
+        pipe = self.redis.pipeline.return_value
+        pipe.execute.side_effect = [
+            [[json.dumps(event(self.app, self.user))], True], [[], True]]
+        tasks.process_install_queue()
+        eq_(Installed.objects.filter(user=self.user).count(), 1)
+        statsd.gauge.assert_called_with('installs.queue.batch_size', 1)
+        assert statsd.timing.called
+
+    @mock.patch('mkt.installs.tasks.record_installs')
+    def test_process_failed(self, record_installs):
+        record_installs.side_effect = ValueError
+        raw = json.dumps(event(self.app, self.user))
+        pipe = self.redis.pipeline.return_value
+        pipe.execute.return_value = [[raw], True]
+        with self.assertRaises(ValueError):
+            tasks.process_install_queue()
+        self.redis.lpush.assert_called_with(tasks.QUEUE_KEY, raw)
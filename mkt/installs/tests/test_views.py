@@ -2,12 +2,14 @@ import json
 
 from django.core.urlresolvers import reverse
 
-from mock import ANY, patch
+from mock import patch
 from nose.tools import eq_
 
 import amo
 from mkt.api.tests.test_oauth import RestOAuth
 from mkt.constants.apps import INSTALL_TYPE_DEVELOPER, INSTALL_TYPE_USER
+from mkt.developers.models import ActivityLog
+from mkt.monolith.models import MonolithRecord
 from mkt.site.fixtures import fixture
 from mkt.webapps.models import Addon, AddonUser, Installed
 
@@ -53,24 +55,37 @@ class TestAPI(RestOAuth):
         eq_(self.post().status_code, 201)
         eq_(self.profile.reload().installed_set.all()[0].addon, self.addon)
 
-    @patch('mkt.installs.utils.record_action')
-    def test_logged(self, record_action):
+    def check_monolith(self, anonymous):
+        record = MonolithRecord.objects.get(key='install')
+        value = json.loads(record.value)
+        eq_(value['app-domain'], u'http://micropipes.com')
+        eq_(value['app-id'], 337141)
+        eq_(value['region'], 'restofworld')
+        eq_(value['anonymous'], anonymous)
+
+    def test_logged(self):
         self.data = json.dumps({'app': self.addon.pk})
         eq_(self.post().status_code, 201)
-        record_action.assert_called_with('install', ANY,
-            {'app-domain': u'http://micropipes.com', 'app-id': 337141L,
-             'region': 'restofworld', 'anonymous': False})
+        self.check_monolith(anonymous=False)
+        eq_(ActivityLog.objects.filter(
+            action=amo.LOG.INSTALL_ADDON.id, user=self.profile).count(), 1)
 
-    @patch('mkt.installs.utils.record_action')
-    def test_logged_anon(self, record_action):
+    def test_logged_anon(self):
         self.data = json.dumps({'app': self.addon.pk})
         eq_(self.post(anon=True).status_code, 201)
-        record_action.assert_called_with('install', ANY,
-            {'app-domain': u'http://micropipes.com', 'app-id': 337141L,
-             'region': 'restofworld', 'anonymous': True})
-
-    @patch('mkt.installs.utils.record_action')
-    def test_app_install_twice(self, record_action):
+        self.check_monolith(anonymous=True)
+
+    @patch('mkt.installs.views.queue_installs')
+    def test_queued(self, queue_installs):
+        with self.settings(INSTALLS_QUEUE=True):
+            eq_(self.post().status_code, 202)
+        event, = queue_installs.call_args[0][0]
+        eq_(event['app'], self.addon.pk)
+        eq_(event['user'], self.profile.pk)
+        eq_(event['type'], INSTALL_TYPE_USER)
+        eq_(self.profile.installed_set.count(), 0)
+
+    def test_app_install_twice(self):
         Installed.objects.create(user=self.profile, addon=self.addon,
                                  install_type=INSTALL_TYPE_USER)
         eq_(self.post().status_code, 202)
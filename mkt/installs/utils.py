@@ -1,7 +1,21 @@
+import datetime
+import json
+import time
+import uuid
+
+from django.db import IntegrityError, transaction
+
+import commonware.log
+
 import amo
 from lib.metrics import record_action
 from mkt.access.acl import check_ownership
 from mkt.constants.apps import INSTALL_TYPE_DEVELOPER, INSTALL_TYPE_USER
+from mkt.monolith.models import (get_user_hash, MonolithRecord,
+                                 SPILL_DATE_FORMAT)
+
+
+log = commonware.log.getLogger('z.installs')
 
 
 def install_type(request, app):
@@ -20,3 +34,104 @@ def record(request, app):
         'region': request.REGION.slug,
         'anonymous': request.user.is_anonymous(),
     })
+
+
+def install_event(request, app, type_):
+    """
+    Returns what record_installs() needs to know about an install, as a
+    dict that can be serialized to JSON and recorded later.
+    """
+    user = request.user if request.user.is_authenticated() else None
+    return {
+        'app': app.pk,
+        'user': user.pk if user else None,
+        'type': type_,
+        'region': request.REGION.slug,
+        'user-agent': request.META.get('HTTP_USER_AGENT'),
+        'locale': request.LANG,
+        'src': request.GET.get('src', ''),
+        'user_hash': get_user_hash(request),
+        'recorded': datetime.datetime.utcnow().strftime(SPILL_DATE_FORMAT),
+        'queued': time.time(),
+    }
+
+
+def record_installs(events):
+    """
+    Records the installs of install_event() all at once: the Installed rows
+    of the users, their INSTALL_ADDON activity logs and the monolith records.
+
+    Returns whether each install is new, installs by anonymous users always
+    are. Events of apps that don't exist anymore are dropped. Nothing is
+    recorded if any of it fails.
+    """
+    from mkt.users.models import UserProfile
+    from mkt.webapps.models import Installed, Webapp
+
+    apps = Webapp.with_deleted.in_bulk(set(e['app'] for e in events))
+    users = UserProfile.objects.in_bulk(
+        set(e['user'] for e in events if e['user']))
+    events = [e for e in events if e['app'] in apps]
+
+    existing = set(Installed.objects.filter(
+        addon__in=apps, user__in=users)
+        .values_list('addon', 'user', 'install_type'))
+    created, installs, logs = [], [], {}
+    for event in events:
+        key = event['app'], event['user'], event['type']
+        if event['user'] not in users:
+            created.append(True)
+            continue
+        created.append(key not in existing)
+        if key not in existing:
+            existing.add(key)
+            installs.append(Installed(
+                addon_id=event['app'], user_id=event['user'],
+                install_type=event['type'], uuid=str(uuid.uuid4()),
+                premium_type=apps[event['app']].premium_type))
+        logs.setdefault(event['user'], []).append(
+            (amo.LOG.INSTALL_ADDON, (apps[event['app']],)))
+    # All or nothing, so that the batch can be recorded again if it fails.
+    with transaction.atomic():
+        _create_installs(installs)
+
+        for user_id, entries in logs.items():
+            amo.log_many(entries, user=users[user_id])
+
+        MonolithRecord.objects.bulk_create(
+            [_monolith_record(apps[e['app']], e) for e in events])
+    return created
+
+
+def _create_installs(installs):
+    from mkt.webapps.models import Installed
+
+    try:
+        with transaction.atomic():
+            Installed.objects.bulk_create(installs)
+    except IntegrityError:
+        # Another process recorded some of them in the meantime.
+        for install in installs:
+            Installed.objects.get_or_create(
+                addon_id=install.addon_id, user_id=install.user_id,
+                install_type=install.install_type,
+                defaults={'uuid': install.uuid,
+                          'premium_type': install.premium_type})
+
+
+def _monolith_record(app, event):
+    """The monolith record of record(), without the request."""
+    value = {
+        'app-domain': app.domain_from_url(app.origin, allow_none=True),
+        'app-id': app.pk,
+        'region': event['region'],
+        'anonymous': event['user'] is None,
+        'user-agent': event['user-agent'],
+        'locale': event['locale'],
+        'src': event['src'],
+    }
+    return MonolithRecord(
+        key='install', user_hash=event['user_hash'],
+        recorded=datetime.datetime.strptime(event['recorded'],
+                                            SPILL_DATE_FORMAT),
+        value=json.dumps(value))
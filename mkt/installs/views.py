@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.core.exceptions import PermissionDenied
 
 import commonware.log
@@ -12,8 +13,8 @@ from mkt.api.authentication import (RestOAuthAuthentication,
 from mkt.api.base import cors_api_view
 from mkt.constants.apps import INSTALL_TYPE_USER
 from mkt.installs.forms import InstallForm
-from mkt.installs.utils import install_type, record
-from mkt.webapps.models import Installed
+from mkt.installs.tasks import queue_installs
+from mkt.installs.utils import install_event, install_type, record_installs
 
 log = commonware.log.getLogger('z.api')
 
@@ -35,15 +36,13 @@ def install(request):
             log.info('App not public: {0}'.format(app.pk))
             raise PermissionDenied
 
-        if not request.user.is_authenticated():
-            record(request, app)
-        else:
-            installed, created = Installed.objects.get_or_create(
-                addon=app, user=request.user, install_type=type_)
-            record(request, app)
-            if not created:
-                return Response(status=202)
+        event = install_event(request, app, type_)
+        if settings.INSTALLS_QUEUE:
+            # Recorded in a moment by process_install_queue.
+            queue_installs([event])
+            return Response(status=202)
 
-        return Response(status=201)
+        created, = record_installs([event])
+        return Response(status=201 if created else 202)
 
     return Response(status=400)
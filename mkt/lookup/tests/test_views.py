@@ -36,6 +36,7 @@ from mkt.lookup.views import (_transaction_summary, app_summary,
 from mkt.prices.models import AddonPaymentData, Refund
 from mkt.purchase.models import Contribution
 from mkt.site.fixtures import fixture
+from mkt.users.indexers import UserProfileIndexer
 from mkt.users.models import UserProfile
 from mkt.webapps.models import Addon, AddonUser, Webapp
 
@@ -307,13 +308,16 @@ class SearchTestMixin(object):
         self.assertLoginRedirects(res, self.url)
 
 
-class TestAcctSearch(TestCase, SearchTestMixin):
+class TestAcctSearch(ESTestCase, SearchTestMixin):
     fixtures = fixture('user_10482', 'user_support_staff', 'user_operator')
 
     def setUp(self):
         super(TestAcctSearch, self).setUp()
         self.url = reverse('lookup.user_search')
         self.user = UserProfile.objects.get(username='clouserw')
+        # Fixtures aren't indexed when they are loaded.
+        UserProfileIndexer.index_ids([self.user.id], no_delay=True)
+        self.refresh('users')
         self.login(UserProfile.objects.get(username='support_staff'))
 
     def verify_result(self, data):
@@ -326,16 +330,19 @@ class TestAcctSearch(TestCase, SearchTestMixin):
 
     def test_by_username(self):
         self.user.update(username='newusername')
+        self.refresh('users')
         data = self.search(q='newus')
         self.verify_result(data)
 
     def test_by_username_with_dashes(self):
         self.user.update(username='kr-raj')
+        self.refresh('users')
         data = self.search(q='kr-raj')
         self.verify_result(data)
 
     def test_by_display_name(self):
         self.user.update(display_name='Kumar McMillan')
+        self.refresh('users')
         data = self.search(q='mcmill')
         self.verify_result(data)
 
@@ -345,9 +352,23 @@ class TestAcctSearch(TestCase, SearchTestMixin):
 
     def test_by_email(self):
         self.user.update(email='fonzi@happydays.com')
+        self.refresh('users')
         data = self.search(q='fonzi')
         self.verify_result(data)
 
+    def test_by_email_domain(self):
+        self.user.update(email='fonzi@happydays.com')
+        self.refresh('users')
+        data = self.search(q='happyd')
+        self.verify_result(data)
+
+    def test_by_exact_email(self):
+        self.user.update(email='fonzi@happydays.com')
+        with mock.patch('mkt.lookup.views.UserProfileIndexer') as indexer:
+            data = self.search(q='Fonzi@happydays.com')
+        self.verify_result(data)
+        ok_(not indexer.search.called)
+
     @mock.patch('mkt.constants.lookup.SEARCH_LIMIT', 2)
     @mock.patch('mkt.constants.lookup.MAX_RESULTS', 3)
     def test_all_results(self):
@@ -355,6 +376,7 @@ class TestAcctSearch(TestCase, SearchTestMixin):
             name = 'chr' + str(x)
             UserProfile.objects.create(username=name, name=name,
                                        email=name + '@gmail.com')
+        self.refresh('users')
 
         # Test not at search limit.
         data = self.search(q='clouserw')
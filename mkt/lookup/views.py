@@ -38,6 +38,7 @@ from mkt.lookup.tasks import (email_buyer_refund_approved,
 from mkt.prices.models import AddonPaymentData, Refund
 from mkt.purchase.models import Contribution
 from mkt.site import messages
+from mkt.users.indexers import UserProfileIndexer
 from mkt.users.models import UserProfile
 from mkt.webapps.indexers import WebappIndexer
 from mkt.webapps.models import Webapp
@@ -373,13 +374,14 @@ def user_search(request):
         # id is added implictly by the ES filter. Add it explicitly:
         qs = UserProfile.objects.filter(pk=q).values(*fields)
     else:
-        qs = UserProfile.objects.all()
-        filters = Q()
-        for field in search_fields:
-            filters = filters | Q(**{'%s__icontains' % field: q})
-        qs = qs.filter(filters)
-        qs = qs.values(*fields)
-        qs = _slice_results(request, qs)
+        # Try to load by email, the most common search:
+        qs = UserProfile.objects.filter(email=q).values(*fields)
+        if not qs:
+            qs = [dict((field, getattr(user, field, None))
+                       for field in fields)
+                  for user in _slice_results(
+                      request, UserProfileIndexer.search()
+                      .query(_user_query(q))).execute()]
     for user in qs:
         user['url'] = reverse('lookup.user_summary', args=[user['id']])
         user['name'] = user['username']
@@ -387,6 +389,17 @@ def user_search(request):
     return {'results': results}
 
 
+def _user_query(q):
+    # The exact value first, then the prefixes of the value, then the
+    # prefixes of its words, see UserProfileIndexer.get_mapping().
+    boosts = {'': 10, '.ngram': 4, '.words': 2}
+    should = [ES_Q('match', **{field + suffix: {'query': q, 'boost': boost,
+                                                'operator': 'and'}})
+              for field in ('username', 'email', 'display_name')
+              for suffix, boost in boosts.items()]
+    return query.Bool(should=should)
+
+
 @login_required
 @permission_required('Transaction', 'View')
 def transaction_search(request):
@@ -0,0 +1,35 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from amo.utils import chunked
+from mkt.monolith.models import MonolithRecord
+
+
+class Command(BaseCommand):
+    args = '[path]'
+    help = ('Load the monolith records that could not be saved from the '
+            'spill file, MONOLITH_SPILL_PATH by default.')
+
+    def handle(self, *args, **kw):
+        path = args[0] if args else settings.MONOLITH_SPILL_PATH
+        if not path:
+            raise CommandError('No spill file given.')
+        if not os.path.exists(path):
+            self.stdout.write('Nothing to load from %s.\n' % path)
+            return
+
+        # Move the file away first so records spilled meanwhile are kept.
+        loading = '%s.loading' % path
+        if os.path.exists(loading):
+            raise CommandError('%s exists, a previous load failed.' % loading)
+        os.rename(path, loading)
+        with open(loading) as f:
+            records = [MonolithRecord.from_spill(line) for line in f
+                       if line.strip()]
+        for chunk in chunked(records, 1000):
+            MonolithRecord.objects.bulk_create(chunk)
+        os.remove(loading)
+        self.stdout.write('Loaded %s monolith records from %s.\n' %
+                          (len(records), path))
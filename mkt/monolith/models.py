@@ -1,8 +1,22 @@
+import atexit
 import datetime
 import hashlib
 import json
+import threading
+import time
 
-from django.db import models
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError, models
+
+import commonware.log
+from celery.signals import task_postrun, worker_shutdown
+
+
+log = commonware.log.getLogger('z.monolith')
+
+# The format of the dates in the spill file.
+SPILL_DATE_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
 
 
 class MonolithRecord(models.Model):
@@ -20,6 +34,91 @@ class MonolithRecord(models.Model):
     class Meta:
         db_table = 'monolith_record'
 
+    def to_spill(self):
+        """Returns the record as a line of the spill file."""
+        return json.dumps({
+            'key': self.key,
+            'recorded': self.recorded.strftime(SPILL_DATE_FORMAT),
+            'user_hash': self.user_hash,
+            'value': self.value}) + '\n'
+
+    @classmethod
+    def from_spill(cls, line):
+        data = json.loads(line)
+        data['recorded'] = datetime.datetime.strptime(data['recorded'],
+                                                      SPILL_DATE_FORMAT)
+        return cls(**data)
+
+
+class RecordBuffer(object):
+    """
+    Collects records in memory and saves them all at once.
+
+    Records are added during the request and saved after it is finished,
+    once there are MONOLITH_BUFFER_SIZE of them or the oldest one is
+    MONOLITH_BUFFER_TIMEOUT seconds old, and when the process exits. If the
+    database is unavailable the records are appended to MONOLITH_SPILL_PATH,
+    to be loaded later with the load_monolith_spill command.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.first_added = None
+        self.lock = threading.Lock()
+
+    def add(self, record):
+        with self.lock:
+            if not self.records:
+                self.first_added = time.time()
+            self.records.append(record)
+
+    def is_full(self):
+        return bool(self.records) and (
+            len(self.records) >= settings.MONOLITH_BUFFER_SIZE or
+            time.time() - self.first_added >= settings.MONOLITH_BUFFER_TIMEOUT)
+
+    def maybe_flush(self, **kwargs):
+        if self.is_full():
+            self.flush()
+
+    def flush(self, **kwargs):
+        with self.lock:
+            records, self.records = self.records, []
+        if not records:
+            return
+        try:
+            MonolithRecord.objects.bulk_create(records)
+        except DatabaseError, e:
+            log.error('Could not save %s monolith records: %s' %
+                      (len(records), e))
+            self.spill(records)
+
+    def spill(self, records):
+        path = settings.MONOLITH_SPILL_PATH
+        if not path:
+            log.error('Lost %s monolith records, no spill file.' %
+                      len(records))
+            return
+        try:
+            with open(path, 'a') as f:
+                f.write(''.join(record.to_spill() for record in records))
+        except (IOError, OSError), e:
+            log.error('Lost %s monolith records, could not write to %s: %s' %
+                      (len(records), path, e))
+
+
+record_buffer = RecordBuffer()
+
+# Save the records once the request or task is finished, not during it.
+request_finished.connect(record_buffer.maybe_flush,
+                         dispatch_uid='request_finished_monolith')
+task_postrun.connect(record_buffer.maybe_flush,
+                     dispatch_uid='tasks_finished_monolith')
+# And save all of them when the process stops.
+worker_shutdown.connect(record_buffer.flush,
+                        dispatch_uid='worker_shutdown_monolith')
+atexit.register(record_buffer.flush)
+
 
 def get_user_hash(request):
     """Get a hash identifying an user.
@@ -36,6 +135,9 @@ def get_user_hash(request):
 def record_stat(key, request, **data):
     """Create a new record in the database with the given values.
 
+    Unless MONOLITH_BUFFER_SIZE is 0, the record is only saved later by
+    `record_buffer`, and the returned record isn't saved.
+
     :param key:
         The type of stats you're sending, e.g. "app.install".
 
@@ -57,5 +159,8 @@ def record_stat(key, request, **data):
 
     record = MonolithRecord(key=key, user_hash=get_user_hash(request),
                             recorded=recorded, value=json.dumps(data))
-    record.save()
+    if settings.MONOLITH_BUFFER_SIZE:
+        record_buffer.add(record)
+    else:
+        record.save()
     return record
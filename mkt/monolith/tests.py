@@ -1,20 +1,27 @@
 import datetime
 import json
+import os
+import tempfile
 import uuid
 from collections import namedtuple
 
 import mock
 from nose.tools import eq_, ok_
 
+from django.core.management import call_command
 from django.core.urlresolvers import reverse
+from django.db import DatabaseError
 from django.test import client
 
 from amo.tests import TestCase
 from mkt.api.tests.test_oauth import RestOAuth
+from mkt.ratings.models import Review
 from mkt.site.fixtures import fixture
+from mkt.users.models import UserProfile
+from mkt.webapps.models import Webapp
 
-from .models import MonolithRecord, record_stat
-from .views import daterange
+from .models import MonolithRecord, record_buffer, record_stat
+from .views import _get_query_result, daterange
 
 
 class RequestFactory(client.RequestFactory):
@@ -66,6 +73,69 @@ class TestModels(TestCase):
             record_stat('app.install', self.request)
 
 
+class TestRecordBuffer(TestCase):
+
+    def setUp(self):
+        super(TestRecordBuffer, self).setUp()
+        self.request = RequestFactory()
+        fd, self.spill = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(self.spill)
+        self.addCleanup(record_buffer.flush)
+        self.addCleanup(lambda: os.path.exists(self.spill) and
+                        os.remove(self.spill))
+
+    def record(self, value=1):
+        with self.settings(MONOLITH_BUFFER_SIZE=2):
+            return record_stat('app.install', self.request, value=value)
+
+    def test_buffered(self):
+        record = self.record()
+        eq_(record.pk, None)
+        eq_(MonolithRecord.objects.count(), 0)
+        record_buffer.flush()
+        eq_(MonolithRecord.objects.get().value, json.dumps({'value': 1}))
+
+    def test_flushed_when_full(self):
+        with self.settings(MONOLITH_BUFFER_SIZE=2,
+                           MONOLITH_BUFFER_TIMEOUT=60):
+            self.record()
+            record_buffer.maybe_flush()
+            eq_(MonolithRecord.objects.count(), 0)
+            self.record()
+            record_buffer.maybe_flush()
+            eq_(MonolithRecord.objects.count(), 2)
+
+    def test_flushed_when_old(self):
+        with self.settings(MONOLITH_BUFFER_SIZE=2,
+                           MONOLITH_BUFFER_TIMEOUT=0):
+            self.record()
+            record_buffer.maybe_flush()
+            eq_(MonolithRecord.objects.count(), 1)
+
+    @mock.patch.object(MonolithRecord.objects, 'bulk_create')
+    def test_spill(self, bulk_create):
+        bulk_create.side_effect = DatabaseError
+        self.record(1)
+        self.record(2)
+        with self.settings(MONOLITH_SPILL_PATH=self.spill):
+            record_buffer.flush()
+        with open(self.spill) as f:
+            eq_(len(f.readlines()), 2)
+
+    def test_load_spill(self):
+        recorded = datetime.datetime(2014, 5, 1, 12, 30)
+        with open(self.spill, 'w') as f:
+            f.write(MonolithRecord(key='app.install', recorded=recorded,
+                                   user_hash='abc',
+                                   value='{"value": 1}').to_spill())
+        call_command('load_monolith_spill', self.spill)
+        record = MonolithRecord.objects.get()
+        eq_(record.recorded, recorded)
+        eq_(record.user_hash, 'abc')
+        ok_(not os.path.exists(self.spill))
+
+
 class TestMonolithResource(RestOAuth):
     fixtures = fixture('user_2519')
 
@@ -215,6 +285,64 @@ class TestMonolithResource(RestOAuth):
         eq_(data['meta']['limit'], 2)
 
 
+class TestQueryResult(TestCase):
+    fixtures = fixture('webapp_337141', 'user_999')
+
+    def setUp(self):
+        self.app = Webapp.objects.get(pk=337141)
+        self.user = UserProfile.objects.get(pk=999)
+        self.start = datetime.date(2014, 3, 10)
+
+    def review(self, day, rating):
+        review = Review.objects.create(addon=self.app, user=self.user,
+                                       rating=rating, body='review')
+        Review.objects.filter(pk=review.pk).update(
+            created=datetime.datetime.combine(
+                self.start + datetime.timedelta(days=day),
+                datetime.time(12)))
+
+    def values(self, key, days):
+        end = self.start + datetime.timedelta(days=days)
+        return [(d['recorded'], d['value']['count'])
+                for d in _get_query_result(key, self.start, end)]
+
+    def test_slice(self):
+        self.review(-1, 5)
+        self.review(0, 4)
+        self.review(0, 3)
+        self.review(2, 3)
+        eq_(self.values('apps_ratings', 4),
+            [(self.start, 2), (self.start + datetime.timedelta(days=2), 1)])
+
+    def test_total(self):
+        self.review(-1, 5)
+        self.review(1, 2)
+        day = datetime.timedelta(days=1)
+        eq_(self.values('apps_average_rating', 3),
+            [(self.start, 5.0), (self.start + day, 3.5),
+             (self.start + day * 2, 3.5)])
+
+    def test_total_null(self):
+        # Developer replies have no rating, they don't count.
+        self.review(-1, None)
+        self.review(0, None)
+        self.review(1, 4)
+        eq_(self.values('apps_average_rating', 3),
+            [(self.start + datetime.timedelta(days=1), 4.0),
+             (self.start + datetime.timedelta(days=2), 4.0)])
+
+    def test_cached(self):
+        self.review(0, 4)
+        eq_(self.values('apps_ratings', 2), [(self.start, 1)])
+        self.review(0, 4)
+        self.review(2, 4)
+        # The first two days come from the cache.
+        eq_(self.values('apps_ratings', 3),
+            [(self.start, 1), (self.start + datetime.timedelta(days=2), 1)])
+        with self.assertNumQueries(0):
+            self.values('apps_ratings', 3)
+
+
 class TestDateRange(TestCase):
 
     def setUp(self):
@@ -1,7 +1,8 @@
 import datetime
 import logging
 
-from django.db.models import Avg, Count
+from django.core.cache import cache
+from django.db.models import Count, Sum
 from rest_framework import status
 from rest_framework.exceptions import ParseError
 from rest_framework.generics import ListAPIView
@@ -23,49 +24,95 @@ log = logging.getLogger('z.monolith')
 
 # TODO: Move the stats that can be calculated on the fly from
 # apps/stats/tasks.py here.
+#
+# 'slice' stats count what was created each day, 'total' stats average
+# `field` over everything created until each day.
 STATS = {
     'apps_ratings': {
         'qs': Review.objects
-            .filter(editorreview=0, addon__type=amo.ADDON_WEBAPP)
-            .values('addon')
-            .annotate(count=Count('addon')),
+            .filter(editorreview=0, addon__type=amo.ADDON_WEBAPP),
         'type': 'slice',
-        'field_map': {
-            'count': 'count',
-            'app-id': 'addon'},
     },
     'apps_average_rating': {
         'qs': Review.objects
-            .filter(editorreview=0, addon__type=amo.ADDON_WEBAPP)
-            .values('addon')
-            .annotate(avg=Avg('rating')),
+            .filter(editorreview=0, addon__type=amo.ADDON_WEBAPP),
         'type': 'total',
-        'field_map': {
-            'count': 'avg',
-            'app-id': 'addon'},
+        'field': 'rating',
     },
     'apps_abuse_reports': {
         'qs': AbuseReport.objects
-            .filter(addon__type=amo.ADDON_WEBAPP)
-            .values('addon')
-            .annotate(count=Count('addon')),
+            .filter(addon__type=amo.ADDON_WEBAPP),
         'type': 'slice',
-        'field_map': {
-            'count': 'count',
-            'app-id': 'addon'},
     }
 }
 
+# Results of past days don't change, keep them for a week.
+STATS_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
 
 def daterange(start, end):
     for n in range((end - start).days):
         yield start + datetime.timedelta(n)
 
 
+def _by_day(qs):
+    """Groups the queryset by app and by the day objects were created."""
+    table = qs.model._meta.db_table
+    # Clear the ordering or Django groups by it too.
+    return (qs.extra(select={'day': 'DATE(%s.created)' % table})
+              .order_by().values('addon', 'day'))
+
+
+def _get_slice_results(stat, start, end):
+    """Returns {day: {app_id: count}} of the objects created each day."""
+    results = {}
+    qs = _by_day(stat['qs'].filter(created__gte=start, created__lt=end))
+    for row in qs.annotate(count=Count('id')):
+        results.setdefault(row['day'], {})[row['addon']] = row['count']
+    return results
+
+
+def _get_total_results(stat, start, end):
+    """
+    Returns {day: {app_id: average}} of the field of all the objects created
+    until each day, keeping running sums from the totals before `start`.
+    """
+    field = stat['field']
+    sums, counts = {}, {}
+    # Count the field rather than the rows: Sum() ignores the NULL values of
+    # the field (e.g. the rating of developer replies), and so must the
+    # average.
+    prior = (stat['qs'].filter(created__lt=start).order_by().values('addon')
+             .annotate(total=Sum(field), count=Count(field)))
+    for row in prior:
+        sums[row['addon']] = row['total'] or 0
+        counts[row['addon']] = row['count']
+
+    by_day = {}
+    qs = _by_day(stat['qs'].filter(created__gte=start, created__lt=end))
+    for row in qs.annotate(total=Sum(field), count=Count(field)):
+        by_day.setdefault(row['day'], []).append(row)
+
+    results = {}
+    for day in daterange(start, end):
+        for row in by_day.get(day, []):
+            sums[row['addon']] = (sums.get(row['addon'], 0) +
+                                  (row['total'] or 0))
+            counts[row['addon']] = counts.get(row['addon'], 0) + row['count']
+        results[day] = dict((app_id, float(sums[app_id]) / counts[app_id])
+                            for app_id in counts if counts[app_id])
+    return results
+
+
+def _cache_key(key, day):
+    return 'monolith:stats:%s:%s' % (key, day.isoformat())
+
+
 def _get_query_result(key, start, end):
     # To do on-the-fly queries we have to produce results as if they
-    # were calculated daily, which means we need to iterate over each
-    # day in the range and perform an aggregation on this date.
+    # were calculated daily. Each stat is computed for the whole range in
+    # one go, grouped by day, and the results of each day are cached so
+    # only the days that weren't asked for before are computed.
 
     data = []
     today = datetime.date.today()
@@ -77,27 +124,32 @@ def _get_query_result(key, start, end):
     if not end:
         end = today
 
-    for day in daterange(start, end):
+    days = list(daterange(start, end))
+    cached = cache.get_many([_cache_key(key, day) for day in days])
+    results = dict((day, cached[_cache_key(key, day)]) for day in days
+                   if _cache_key(key, day) in cached)
+
+    missing = [day for day in days if day not in results]
+    if missing:
+        first, last = missing[0], missing[-1] + datetime.timedelta(days=1)
         if stat['type'] == 'total':
-            # If it's a totalling queryset, we want to filter by the
-            # end date until the beginning of time to get the total
-            # objects up until this point in time.
-            date_filtered = stat['qs'].filter(
-                created__lt=(day + datetime.timedelta(days=1)))
+            computed = _get_total_results(stat, first, last)
         else:
-            # Otherwise, we want to filter by both start/end to get
-            # counts on a specific day.
-            date_filtered = stat['qs'].filter(
-                created__gte=day,
-                created__lt=(day + datetime.timedelta(days=1)))
-
+            computed = _get_slice_results(stat, first, last)
+        for day in daterange(first, last):
+            results[day] = computed.get(day, {})
+        # Today isn't over yet, don't cache it.
+        cache.set_many(dict((_cache_key(key, day), results[day])
+                            for day in daterange(first, last) if day < today),
+                       STATS_CACHE_TIMEOUT)
+
+    for day in days:
         data.extend([{
             'key': key,
             'recorded': day,
             'user_hash': None,
-            'value': {'count': d.get(stat['field_map']['count']),
-                      'app-id': d.get(stat['field_map']['app-id'])}}
-            for d in date_filtered])
+            'value': {'count': count, 'app-id': app_id}}
+            for app_id, count in sorted(results[day].items())])
 
     return data
 
@@ -1,3 +1,4 @@
+import time
 import uuid
 
 from django.conf import settings
@@ -26,9 +27,14 @@ from mkt.constants.regions import RESTOFWORLD, REGIONS_CHOICES_ID_DICT as RID
 from mkt.purchase.models import Contribution
 from mkt.regions.utils import remove_accents
 from mkt.users.models import UserProfile
+from services.cache import (app_purchase_key, inapp_purchase_key,
+                            ReceiptCache)
 
 log = commonware.log.getLogger('z.market')
 
+# The receipt verifier's cache of purchases.
+receipt_cache = ReceiptCache(settings)
+
 
 def default_providers():
     """
@@ -59,6 +65,113 @@ def price_key(data):
             .format(**data))
 
 
+class PriceMatrix(object):
+    """
+    All the PriceCurrencies, indexed by tier, provider, region and carrier.
+
+    It is built once per process by get_price_matrix(), and built again when
+    the PriceCurrencies change, which update_price_currency() signals to all
+    the processes by changing the version in the cache. The localized prices
+    and the regions sorted by name are kept per language.
+    """
+
+    def __init__(self, currencies, version=None):
+        self.version = version
+        self.currencies = {}
+        self.tiers = {}
+        for currency in currencies:
+            data = model_to_dict(currency)
+            self.currencies[price_key(data)] = currency
+            self.tiers.setdefault(currency.tier_id, []).append(data)
+        self._locales = {}
+        self._regions = {}
+
+    def get(self, tier, carrier=None, region=None, provider=None):
+        """Returns the PriceCurrency or None."""
+        return self.currencies.get(price_key({
+            'tier': tier, 'carrier': carrier, 'provider': provider,
+            'region': region}))
+
+    def get_locale(self, tier, carrier=None, region=None, provider=None):
+        """Returns the localized price or None."""
+        key = (translation.get_language(), tier, carrier, region, provider)
+        if key not in self._locales:
+            currency = self.get(tier, carrier, region, provider)
+            self._locales[key] = (currency and
+                                  price_locale(currency.price,
+                                               currency.currency))
+        return self._locales[key]
+
+    def prices(self, tier, providers):
+        """The dicts of the PriceCurrencies of the tier and providers."""
+        return [dict(data) for data in self.tiers.get(tier, [])
+                if data['provider'] in providers]
+
+    def regions_by_name(self, tier, providers):
+        """
+        The regions the tier is paid in, sorted by name, rest of the world
+        last.
+        """
+        key = (translation.get_language(), tier, tuple(providers))
+        if key not in self._regions:
+            regions = set()
+            append_rest_of_world = False
+            for price in self.prices(tier, providers):
+                region = RID[price['region']]
+                if price['paid'] is True and region != RESTOFWORLD:
+                    regions.add(region)
+                if price['paid'] is True and region == RESTOFWORLD:
+                    append_rest_of_world = True
+
+            if regions:
+                # Sort by name based on normalized unicode name.
+                regions = sorted(
+                    regions, key=lambda r: remove_accents(unicode(r.name)))
+                if append_rest_of_world:
+                    regions.append(RESTOFWORLD)
+            self._regions[key] = tuple(regions)
+        return list(self._regions[key])
+
+
+PRICE_MATRIX_VERSION_KEY = 'prices:matrix-version'
+# How long the PriceMatrix version is kept in the cache, a lost version only
+# means building it again.
+PRICE_MATRIX_VERSION_TIMEOUT = 60 * 60 * 24 * 30
+_price_matrix = {'matrix': None, 'checked': 0}
+
+
+def get_price_matrix():
+    """
+    Returns the PriceMatrix, building it if the PriceCurrencies changed.
+    The version in the cache is checked every PRICE_MATRIX_CHECK_INTERVAL
+    seconds.
+    """
+    matrix = _price_matrix['matrix']
+    now = time.time()
+    if (matrix is None or
+            now - _price_matrix['checked'] >=
+            settings.PRICE_MATRIX_CHECK_INTERVAL):
+        version = cache.get(PRICE_MATRIX_VERSION_KEY)
+        if version is None:
+            # Lost, or never set: make sure every process builds it again.
+            cache.add(PRICE_MATRIX_VERSION_KEY, uuid.uuid4().hex,
+                      timeout=PRICE_MATRIX_VERSION_TIMEOUT)
+            version = cache.get(PRICE_MATRIX_VERSION_KEY)
+        if matrix is None or matrix.version != version:
+            matrix = PriceMatrix(PriceCurrency.objects.no_cache()
+                                 .order_by('id'), version)
+            _price_matrix['matrix'] = matrix
+        _price_matrix['checked'] = now
+    return matrix
+
+
+def clear_price_matrix():
+    """Makes every process build the PriceMatrix again."""
+    _price_matrix['matrix'] = None
+    cache.set(PRICE_MATRIX_VERSION_KEY, uuid.uuid4().hex,
+              timeout=PRICE_MATRIX_VERSION_TIMEOUT)
+
+
 class PriceManager(ManagerBase):
 
     def get_query_set(self):
@@ -95,10 +208,9 @@ class Price(amo.models.ModelBase):
 
     @staticmethod
     def transformer(prices):
-        # There are a constrained number of price currencies, let's just
-        # get them all.
-        Price._currencies = dict((price_key(model_to_dict(p)), p)
-                                 for p in PriceCurrency.objects.all())
+        # There are a constrained number of price currencies, they are all in
+        # the price matrix.
+        get_price_matrix()
 
     def get_price_currency(self, carrier=None, region=None, provider=None):
         """
@@ -113,20 +225,8 @@ class Price(amo.models.ModelBase):
         # This is probably ok for now, because Bango is the default fall back
         # however we might need to think about this for the long term.
         provider = provider or PROVIDER_BANGO
-        if not hasattr(self, '_currencies'):
-            Price.transformer([])
-
-        lookup = price_key({
-            'tier': self.id, 'carrier': carrier,
-            'provider': provider, 'region': region
-        })
-
-        try:
-            price_currency = Price._currencies[lookup]
-        except KeyError:
-            return None
-
-        return price_currency
+        return get_price_matrix().get(self.id, carrier=carrier,
+                                      region=region, provider=provider)
 
     def get_price_data(self, carrier=None, region=None, provider=None):
         """
@@ -150,10 +250,9 @@ class Price(amo.models.ModelBase):
 
     def get_price_locale(self, carrier=None, region=None, provider=None):
         """Return the price as a nicely localised string for the locale."""
-        price, currency = self.get_price_data(carrier=carrier, region=region,
-                                              provider=provider)
-        if price is not None and currency is not None:
-            return price_locale(price, currency)
+        return get_price_matrix().get_locale(
+            self.id, carrier=carrier, region=region or RESTOFWORLD.id,
+            provider=provider or PROVIDER_BANGO)
 
     def prices(self, provider=None):
         """
@@ -163,8 +262,7 @@ class Price(amo.models.ModelBase):
             If not provided it will use settings.PAYMENT_PROVIDERS,
         """
         providers = [provider] if provider else default_providers()
-        return [model_to_dict(o) for o in
-                self.pricecurrency_set.filter(provider__in=providers)]
+        return get_price_matrix().prices(self.id, providers)
 
     def regions_by_name(self, provider=None):
         """A list of price regions sorted by name.
@@ -173,27 +271,8 @@ class Price(amo.models.ModelBase):
             If not provided it will use settings.PAYMENT_PROVIDERS,
 
         """
-
-        prices = self.prices(provider=provider)
-
-        regions = set()
-        append_rest_of_world = False
-
-        for price in prices:
-            region = RID[price['region']]
-            if price['paid'] is True and region != RESTOFWORLD:
-                regions.add(region)
-            if price['paid'] is True and region == RESTOFWORLD:
-                append_rest_of_world = True
-
-        if regions:
-            # Sort by name based on normalized unicode name.
-            regions = sorted(regions,
-                             key=lambda r: remove_accents(unicode(r.name)))
-            if append_rest_of_world:
-                regions.append(RESTOFWORLD)
-
-        return regions if regions else []
+        providers = [provider] if provider else default_providers()
+        return get_price_matrix().regions_by_name(self.id, providers)
 
     def region_ids_by_name(self, provider=None):
         """A list of price region ids sorted by name.
@@ -266,12 +345,15 @@ class PriceCurrency(amo.models.ModelBase):
           dispatch_uid='delete_price_currency')
 def update_price_currency(sender, instance, **kw):
     """
-    Ensure that when PriceCurrencies are updated, all the apps that use them
-    are re-indexed into ES so that the region information will be correct.
+    Ensure that when PriceCurrencies are updated, the price matrix is built
+    again and all the apps that use them are re-indexed into ES so that the
+    region information will be correct.
     """
     if kw.get('raw'):
         return
 
+    clear_price_matrix()
+
     try:
         ids = list(instance.tier.addonpremium_set
                            .values_list('addon_id', flat=True))
@@ -312,6 +394,33 @@ def add_uuid(sender, **kw):
             record.save()
 
 
+@receiver(models.signals.post_save, sender=AddonPurchase,
+          dispatch_uid='save_addon_purchase_receipts')
+@receiver(models.signals.post_delete, sender=AddonPurchase,
+          dispatch_uid='delete_addon_purchase_receipts')
+def invalidate_purchase_receipts(sender, instance, **kw):
+    """
+    Ensure the receipt verifier doesn't keep on saying a refunded or
+    charged back purchase is ok.
+    """
+    if not kw.get('raw') and instance.uuid:
+        receipt_cache.delete_purchases(
+            [app_purchase_key(instance.addon_id, instance.uuid)])
+
+
+@receiver(models.signals.post_save, sender=Contribution,
+          dispatch_uid='save_contribution_receipts')
+@receiver(models.signals.post_delete, sender=Contribution,
+          dispatch_uid='delete_contribution_receipts')
+def invalidate_contribution_receipts(sender, instance, **kw):
+    """
+    In-app receipts are verified against the contribution, so the same goes
+    for refunded or charged back contributions.
+    """
+    if not kw.get('raw') and instance.inapp_product_id:
+        receipt_cache.delete_purchases([inapp_purchase_key(instance.pk)])
+
+
 @write
 @receiver(models.signals.post_save, sender=Contribution,
           dispatch_uid='create_addon_purchase')
@@ -1,6 +1,7 @@
 import datetime
 from decimal import Decimal
 
+from django.core.cache import cache
 from django.utils import translation
 
 import mock
@@ -12,11 +13,15 @@ from mkt.constants import apps
 from mkt.constants.payments import PROVIDER_BANGO, PROVIDER_BOKU
 from mkt.constants.regions import (ALL_REGION_IDS, BR, HU, RESTOFWORLD, SPAIN,
                                    UK, US)
-from mkt.prices.models import AddonPremium, Price, PriceCurrency, Refund
+from mkt.inapp.models import InAppProduct
+from mkt.prices.models import (AddonPremium, clear_price_matrix, Price,
+                               PRICE_MATRIX_VERSION_KEY, PriceCurrency,
+                               Refund)
 from mkt.purchase.models import Contribution
 from mkt.site.fixtures import fixture
 from mkt.users.models import UserProfile
 from mkt.webapps.models import AddonUser, Webapp
+from services.cache import app_purchase_key, inapp_purchase_key
 
 
 class TestPremium(amo.tests.TestCase):
@@ -39,8 +44,6 @@ class TestPrice(amo.tests.TestCase):
 
     def setUp(self):
         self.tier_one = Price.objects.get(pk=1)
-        if hasattr(Price, '_currencies'):
-            del Price._currencies  # needed to pick up fixtures.
 
     def test_active(self):
         eq_(Price.objects.count(), 2)
@@ -87,10 +90,29 @@ class TestPrice(amo.tests.TestCase):
     def test_transformer(self):
         price = Price.objects.get(pk=1)
         price.get_price_locale()
-        # Warm up Price._currencies.
+        # Warm up the price matrix.
         with self.assertNumQueries(0):
             eq_(price.get_price_locale(), u'$0.99')
 
+    def test_matrix_version(self):
+        price = Price.objects.get(pk=1)
+        eq_(price.get_price(), Decimal('0.99'))
+        # Another process changed the price.
+        PriceCurrency.objects.filter(pk=1).update(price='0.89')
+        eq_(price.get_price(), Decimal('0.99'))
+        clear_price_matrix()
+        eq_(price.get_price(), Decimal('0.89'))
+
+    def test_matrix_check_interval(self):
+        price = Price.objects.get(pk=1)
+        eq_(price.get_price(), Decimal('0.99'))
+        PriceCurrency.objects.filter(pk=1).update(price='0.89')
+        cache.set(PRICE_MATRIX_VERSION_KEY, 'other')
+        with self.settings(PRICE_MATRIX_CHECK_INTERVAL=60):
+            with self.assertNumQueries(0):
+                eq_(price.get_price(), Decimal('0.99'))
+        eq_(price.get_price(), Decimal('0.89'))
+
     def test_get_tier_price(self):
         eq_(Price.objects.get(pk=2).get_price_locale(region=BR.id), 'R$1.01')
 
@@ -188,6 +210,13 @@ class TestPriceCurrencyChanges(amo.tests.TestCase):
         self.currency.delete()
         eq_(index_webapps.delay.call_args[0][0], [self.addon.pk])
 
+    def test_save_price_matrix(self):
+        price = self.addon.premium.price
+        region = self.currency.region
+        eq_(price.get_price(region=region), Decimal('1.00'))
+        self.currency.update(price='2.00')
+        eq_(price.get_price(region=region), Decimal('2.00'))
+
 
 class ContributionMixin(object):
 
@@ -298,6 +327,28 @@ class TestContribution(ContributionMixin, amo.tests.TestCase):
         self.create(amo.CONTRIB_REFUND)
         eq_(list(self.user.purchase_ids()), [])
 
+    @mock.patch('mkt.prices.models.receipt_cache')
+    def test_refund_receipt_cache(self, receipt_cache):
+        self.create(amo.CONTRIB_PURCHASE)
+        receipt_cache.reset_mock()
+        self.create(amo.CONTRIB_REFUND)
+        purchase = self.addon.addonpurchase_set.get(user=self.user)
+        receipt_cache.delete_purchases.assert_called_with(
+            [app_purchase_key(self.addon.pk, purchase.uuid)])
+
+    @mock.patch('mkt.prices.models.receipt_cache')
+    def test_refund_inapp_receipt_cache(self, receipt_cache):
+        product = InAppProduct.objects.create(
+            webapp=self.addon, name='Kiwii',
+            price=Price.objects.create(price='1.00'))
+        contribution = Contribution.objects.create(
+            type=amo.CONTRIB_PURCHASE, addon=self.addon, user=self.user,
+            inapp_product=product)
+        receipt_cache.reset_mock()
+        contribution.update(type=amo.CONTRIB_REFUND)
+        receipt_cache.delete_purchases.assert_called_with(
+            [inapp_purchase_key(contribution.pk)])
+
 
 class TestRefundContribution(ContributionMixin, amo.tests.TestCase):
     fixtures = fixture('webapp_337141', 'user_999', 'user_admin')
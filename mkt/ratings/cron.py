@@ -6,8 +6,10 @@ import commonware.log
 import cronjobs
 
 import amo
-from amo.utils import send_mail_jinja
+from amo.utils import chunked, send_mail_jinja
 from mkt.ratings.models import Review
+from mkt.ratings.tasks import reconcile_review_aggregates
+from mkt.webapps.models import Webapp
 
 
 cron_log = commonware.log.getLogger('mkt.ratings.cron')
@@ -44,3 +46,14 @@ def email_daily_ratings():
         send_mail_jinja(subject, 'ratings/emails/daily_digest.html',
                         context, recipient_list=author_emails,
                         perm_setting='app_new_review', async=True)
+
+
+@cronjobs.register
+def reconcile_review_aggregates_cron():
+    """
+    Repairs the review aggregates and ratings of the apps that drifted from
+    their reviews.
+    """
+    ids = Webapp.objects.values_list('id', flat=True).order_by('id')
+    for chunk in chunked(ids, 100):
+        reconcile_review_aggregates.delay(chunk)
@@ -65,11 +65,44 @@ class Review(amo.models.ModelBase):
         qs = Review.objects.filter(reply_to__in=reviews)
         return dict((r.reply_to_id, r) for r in qs)
 
+    def aggregate_values(self):
+        """
+        What the review adds to the aggregates of its app: the number of
+        reviews, of rated reviews and the sum of the ratings. Only the latest
+        review of each user counts, replies don't.
+        """
+        if self.pk is None or self.reply_to_id or not self.is_latest:
+            return (0, 0, 0)
+        if self.rating is None:
+            return (1, 0, 0)
+        return (1, 1, self.rating)
+
+    def aggregate_delta(self, deleted=False):
+        """
+        How the aggregates of the app changed since the review was loaded or
+        last saved.
+        """
+        before = getattr(self, '_aggregate_values', None)
+        after = (0, 0, 0) if deleted else self.aggregate_values()
+        if before is None:
+            # Unpickled from the cache without the values, assume they are
+            # unchanged, reconcile_review_aggregates will repair any drift.
+            before = after
+        self._aggregate_values = after
+        return tuple(a - b for a, b in zip(after, before))
+
+    @staticmethod
+    def post_init(sender, instance, **kwargs):
+        instance._aggregate_values = instance.aggregate_values()
+
     @staticmethod
     def post_save(sender, instance, created, **kwargs):
         if kwargs.get('raw'):
             return
-        instance.refresh(update_denorm=created)
+        delta = instance.aggregate_delta()
+        # Edits that don't change the aggregates don't need a reindex.
+        if created or any(delta):
+            instance.refresh(update_denorm=created, delta=delta)
         if created:
             # Avoid slave lag with the delay.
             check_spam.apply_async(args=[instance.id], countdown=600)
@@ -78,19 +111,22 @@ class Review(amo.models.ModelBase):
     def post_delete(sender, instance, **kwargs):
         if kwargs.get('raw'):
             return
-        instance.refresh(update_denorm=True)
+        instance.refresh(update_denorm=True,
+                         delta=instance.aggregate_delta(deleted=True))
 
-    def refresh(self, update_denorm=False):
+    def refresh(self, update_denorm=False, delta=(0, 0, 0)):
         from . import tasks
 
         if update_denorm:
             pair = self.addon_id, self.user_id
             # Do this immediately so is_latest is correct. Use default
             # to avoid slave lag.
-            tasks.update_denorm(pair, using='default')
+            denorm_delta = tasks.update_denorm(pair, using='default')
+            delta = tuple(map(sum, zip(delta, denorm_delta)))
 
-        # Review counts have changed, so run the task and trigger a reindex.
-        tasks.addon_review_aggregates.delay(self.addon_id, using='default')
+        # Review counts have changed, so queue the delta, which updates the
+        # ratings of the app and triggers a reindex.
+        tasks.queue_review_delta(self.addon_id, delta)
 
     @staticmethod
     def transformer(reviews):
@@ -99,6 +135,8 @@ class Review(amo.models.ModelBase):
             user_ids[user.id].user = user
 
 
+models.signals.post_init.connect(Review.post_init, sender=Review,
+                                 dispatch_uid='review_post_init')
 models.signals.post_save.connect(Review.post_save, sender=Review,
                                  dispatch_uid='review_post_save')
 models.signals.post_delete.connect(Review.post_delete, sender=Review,
@@ -107,6 +145,29 @@ models.signals.pre_save.connect(save_signal, sender=Review,
                                 dispatch_uid='review_translations')
 
 
+class ReviewAggregate(amo.models.ModelBase):
+    """
+    The running totals of the latest reviews of an app, kept up to date with
+    the deltas the Review signals queue, see mkt.ratings.tasks.
+    """
+    addon = models.OneToOneField('webapps.Addon',
+                                 related_name='review_aggregate')
+    total_reviews = models.IntegerField(default=0)
+    rated_reviews = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+
+    objects = amo.models.UncachedManagerBase()
+
+    class Meta:
+        db_table = 'review_aggregates'
+
+    @property
+    def average_rating(self):
+        if not self.rated_reviews:
+            return 0
+        return float(self.rating_sum) / self.rated_reviews
+
+
 # TODO: translate old flags.
 class ReviewFlag(amo.models.ModelBase):
     SPAM = 'review_flag_reason_spam'
@@ -1,13 +1,20 @@
 import logging
+import time
 
-from django.db.models import Count, Avg, F
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, Sum
 
 import caching.base as caching
+import redisutils
 from celeryutils import task
+from django_statsd.clients import statsd
 
-from mkt.webapps.models import Addon
+from amo.decorators import write
+from mkt.webapps.models import Addon, Webapp
+from mkt.webapps.tasks import index_webapps
 
-from .models import Review
+from .models import Review, ReviewAggregate
 
 
 log = logging.getLogger('z.task')
@@ -18,10 +25,14 @@ def update_denorm(*pairs, **kw):
     """
     Takes a bunch of (addon, user) pairs and sets the denormalized fields for
     all reviews matching that pair.
+
+    Returns the delta of the aggregates, for the caller to queue with its
+    own.
     """
     log.info('[%s@%s] Updating review denorms.' %
              (len(pairs), update_denorm.rate_limit))
     using = kw.get('using')
+    delta = (0, 0, 0)
     for addon, user in pairs:
         reviews = list(Review.objects.valid().no_cache().using(using)
                        .filter(addon=addon, user=user).order_by('created'))
@@ -34,48 +45,201 @@ def update_denorm(*pairs, **kw):
         reviews[-1].is_latest = True
 
         for review in reviews:
+            # Taking the delta here means the save doesn't queue it.
+            delta = tuple(map(sum, zip(delta, review.aggregate_delta())))
             review.save()
+    return delta
 
 
-@task
-def addon_review_aggregates(*addons, **kw):
-    log.info('[%s@%s] Updating total reviews and average ratings.' %
-             (len(addons), addon_review_aggregates.rate_limit))
-    using = kw.get('using')
-    addon_objs = list(Addon.objects.filter(pk__in=addons))
-    stats = dict((x[0], x[1:]) for x in
+# The review aggregates.
+#
+# The Review signals work out how a save or delete changes the totals of the
+# latest reviews of the app and queue that delta, summed per app in a redis
+# hash. The first delta queued schedules `process_review_aggregates`, which
+# applies all of them after REVIEW_AGGREGATES_DELAY seconds with one write
+# and one reindex per app. The reconcile_review_aggregates cron repairs any
+# drift, from queryset updates that don't send signals for example.
+
+DELTAS_KEY = 'ratings:aggregates:deltas'
+SCHEDULED_KEY = 'ratings:aggregates:scheduled'
+# The totals of ReviewAggregate, then the number of deltas.
+DELTA_FIELDS = ('total_reviews', 'rated_reviews', 'rating_sum', 'events')
+
+
+def queue_review_delta(addon_id, delta):
+    """Adds the delta to the queue, scheduling a run if none is."""
+    values = list(delta) + [1]
+    if not settings.REVIEW_AGGREGATES_QUEUE:
+        update_review_aggregates({addon_id: values})
+        return
+    delay = settings.REVIEW_AGGREGATES_DELAY
+    try:
+        redis = redisutils.connections['master']
+        pipe = redis.pipeline()
+        for field, value in zip(DELTA_FIELDS, values):
+            pipe.hincrby(DELTAS_KEY, '%s:%s' % (addon_id, field), value)
+        # The key expires in case the run is lost, to not stop updating
+        # for good.
+        pipe.set(SCHEDULED_KEY, 1, nx=True, ex=delay + 60)
+        scheduled = pipe.execute()[-1]
+    except Exception, e:
+        log.error(u'Review aggregates queue unavailable, updating app %s '
+                  u'now: %s' % (addon_id, e))
+        update_review_aggregates({addon_id: values})
+        return
+    if scheduled:
+        process_review_aggregates.apply_async(countdown=delay)
+
+
+@task(acks_late=True)
+@write
+def process_review_aggregates(**kw):
+    """Applies all the deltas in the queue."""
+    redis = redisutils.connections['master']
+    # Deltas queued from now on schedule another run.
+    redis.delete(SCHEDULED_KEY)
+    pipe = redis.pipeline()
+    pipe.hgetall(DELTAS_KEY)
+    pipe.delete(DELTAS_KEY)
+    raw = pipe.execute()[0]
+    if not raw:
+        return
+
+    deltas = {}
+    for key, value in raw.items():
+        addon_id, field = key.split(':')
+        values = deltas.setdefault(int(addon_id), [0] * len(DELTA_FIELDS))
+        values[DELTA_FIELDS.index(field)] = int(value)
+    start = time.time()
+    try:
+        apply_review_deltas(deltas)
+    except Exception:
+        # Nothing was applied, put them back for the next run.
+        pipe = redis.pipeline()
+        for key, value in raw.items():
+            pipe.hincrby(DELTAS_KEY, key, int(value))
+        pipe.execute()
+        raise
+    save_review_aggregates(deltas, start)
+
+
+def update_review_aggregates(deltas):
+    """
+    Applies the {app id: [total_reviews, rated_reviews, rating_sum, events]}
+    deltas to the ReviewAggregates, then saves the ratings of the apps.
+    """
+    start = time.time()
+    apply_review_deltas(deltas)
+    save_review_aggregates(deltas, start)
+
+
+def apply_review_deltas(deltas):
+    """Applies the deltas to the ReviewAggregates, all or none of them."""
+    ids = list(deltas)
+    with transaction.atomic():
+        existing = set(ReviewAggregate.objects.filter(addon__in=ids)
+                       .values_list('addon', flat=True))
+        for addon_id in existing:
+            total, rated, rating_sum = deltas[addon_id][:3]
+            if total or rated or rating_sum:
+                ReviewAggregate.objects.filter(addon=addon_id).update(
+                    total_reviews=F('total_reviews') + total,
+                    rated_reviews=F('rated_reviews') + rated,
+                    rating_sum=F('rating_sum') + rating_sum)
+        # The reviews already include the deltas of apps without
+        # aggregates.
+        missing = set(ids) - existing
+        if missing:
+            set_review_aggregates(count_review_aggregates(missing))
+
+
+def save_review_aggregates(deltas, start):
+    """Saves the ratings of the apps once their deltas are applied."""
+    ids = list(deltas)
+    save_ratings(ids)
+
+    events = sum(values[-1] for values in deltas.values())
+    statsd.timing('ratings.aggregates.update',
+                  int((time.time() - start) * 1000))
+    statsd.incr('ratings.aggregates.coalesced', events - len(ids))
+    log.info('Updated the review aggregates of %s apps from %s deltas.'
+             % (len(ids), events))
+
+
+def count_review_aggregates(ids, using='default'):
+    """Returns the {app id: (total, rated, sum)} counted from the reviews."""
+    stats = dict((x[0], (x[1], x[2], x[3] or 0)) for x in
                  Review.objects.valid().no_cache().using(using)
-                 .filter(addon__in=addons, is_latest=True)
+                 .filter(addon__in=ids, is_latest=True)
                  .values_list('addon')
-                 .annotate(Avg('rating'), Count('addon')))
-    for addon in addon_objs:
-        rating, reviews = stats.get(addon.id, [0, 0])
-        addon.update(total_reviews=reviews, average_rating=rating)
+                 .annotate(Count('addon'), Count('rating'), Sum('rating')))
+    return dict((addon_id, stats.get(addon_id, (0, 0, 0)))
+                for addon_id in ids)
 
-    # Delay bayesian calculations to avoid slave lag.
-    addon_bayesian_rating.apply_async(args=addons, countdown=5)
 
+def set_review_aggregates(values):
+    for addon_id, (total, rated, rating_sum) in values.items():
+        updated = ReviewAggregate.objects.filter(addon=addon_id).update(
+            total_reviews=total, rated_reviews=rated, rating_sum=rating_sum)
+        if not updated:
+            ReviewAggregate.objects.create(
+                addon_id=addon_id, total_reviews=total, rated_reviews=rated,
+                rating_sum=rating_sum)
 
-@task
-def addon_bayesian_rating(*addons, **kw):
-    log.info('[%s@%s] Updating bayesian ratings.' %
-             (len(addons), addon_bayesian_rating.rate_limit))
+
+def bayesian_rating(aggregate, avg):
+    """
+    The rating of the app weighted by the average number of reviews and
+    rating of the apps.
+    """
+    if not aggregate.total_reviews:
+        return 0
+    mc = avg['reviews'] * avg['rating']
+    return ((mc + aggregate.total_reviews * aggregate.average_rating) /
+            (avg['reviews'] + aggregate.total_reviews))
+
+
+def save_ratings(ids):
+    """
+    Saves the totals, average and bayesian ratings of the apps from their
+    ReviewAggregates, then reindexes them.
+    """
     f = lambda: Addon.objects.aggregate(rating=Avg('average_rating'),
                                         reviews=Avg('total_reviews'))
     avg = caching.cached(f, 'task.bayes.avg', 60 * 60 * 60)
-    # Rating can be NULL in the DB, so don't update it if it's not there.
-    if avg['rating'] is None:
-        return
-    mc = avg['reviews'] * avg['rating']
-    for addon in Addon.objects.no_cache().filter(id__in=addons):
-        if addon.average_rating is None:
-            # Ignoring addons with no average rating.
-            continue
+    aggregates = ReviewAggregate.objects.filter(addon__in=ids)
+    for aggregate in aggregates:
+        data = {'total_reviews': aggregate.total_reviews,
+                'average_rating': aggregate.average_rating}
+        # Rating can be NULL in the DB, so don't update it if it's not there.
+        if avg['rating'] is not None:
+            data['bayesian_rating'] = bayesian_rating(aggregate, avg)
+        Addon.objects.filter(pk=aggregate.addon_id).update(**data)
+    # The UPDATEs went around cache-machine, invalidate the apps ourselves.
+    Webapp.objects.invalidate(
+        *Webapp.objects.no_cache().filter(pk__in=ids).no_transforms())
+    index_webapps.delay(ids)
+
 
-        q = Addon.objects.filter(id=addon.id)
-        if addon.total_reviews:
-            num = mc + F('total_reviews') * F('average_rating')
-            denom = avg['reviews'] + F('total_reviews')
-            q.update(bayesian_rating=num / denom)
-        else:
-            q.update(bayesian_rating=0)
+@task
+@write
+def reconcile_review_aggregates(ids, **kw):
+    """
+    Counts the aggregates of the apps from their reviews again, repairing
+    the aggregates and ratings of the apps that drifted.
+    """
+    counts = count_review_aggregates(ids)
+    aggregates = dict((a.addon_id, (a.total_reviews, a.rated_reviews,
+                                    a.rating_sum))
+                      for a in ReviewAggregate.objects.filter(addon__in=ids))
+    totals = dict(Addon.objects.no_cache().filter(pk__in=ids)
+                  .values_list('id', 'total_reviews'))
+    drifted = dict((addon_id, values) for addon_id, values in counts.items()
+                   if aggregates.get(addon_id) != values or
+                   totals.get(addon_id) != values[0])
+    statsd.incr('ratings.aggregates.drift', len(drifted))
+    if drifted:
+        log.info('Repairing the review aggregates of apps: %s'
+                 % sorted(drifted))
+        set_review_aggregates(drifted)
+        save_ratings(list(drifted))
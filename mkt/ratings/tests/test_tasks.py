@@ -0,0 +1,157 @@
+import mock
+from nose.tools import eq_
+
+import amo.tests
+from mkt.ratings import tasks
+from mkt.ratings.models import Review, ReviewAggregate
+from mkt.site.fixtures import fixture
+from mkt.users.models import UserProfile
+from mkt.webapps.models import Webapp
+
+
+class TestReviewAggregates(amo.tests.TestCase):
+    fixtures = fixture('user_999', 'user_2519', 'webapp_337141')
+
+    def setUp(self):
+        self.app = Webapp.objects.get(pk=337141)
+        self.user = UserProfile.objects.get(pk=999)
+        self.other = UserProfile.objects.get(pk=2519)
+
+    def check(self, total, rated, rating_sum):
+        aggregate = ReviewAggregate.objects.get(addon=self.app)
+        eq_((aggregate.total_reviews, aggregate.rated_reviews,
+             aggregate.rating_sum), (total, rated, rating_sum))
+        app = Webapp.objects.no_cache().get(pk=self.app.pk)
+        eq_(app.total_reviews, total)
+        eq_(app.average_rating, aggregate.average_rating)
+
+    def review(self, user, rating, **kw):
+        return Review.objects.create(addon=self.app, user=user, rating=rating,
+                                     **kw)
+
+    def test_create(self):
+        self.review(self.user, 4)
+        self.review(self.other, 1)
+        self.check(2, 2, 5)
+
+    def test_new_review_replaces(self):
+        self.review(self.user, 4)
+        self.review(self.user, 2)
+        self.check(1, 1, 2)
+
+    def test_edit(self):
+        review = self.review(self.user, 4)
+        review.update(rating=5)
+        self.check(1, 1, 5)
+
+    def test_delete_latest(self):
+        self.review(self.user, 4)
+        self.review(self.user, 2).delete()
+        self.check(1, 1, 4)
+
+    def test_reply(self):
+        review = self.review(self.user, 4)
+        self.review(self.other, None, reply_to=review)
+        self.check(1, 1, 4)
+
+    def test_bayesian_rating(self):
+        self.review(self.user, 4)
+        app = Webapp.objects.no_cache().get(pk=self.app.pk)
+        assert app.bayesian_rating > 0
+
+    def test_cached_app_invalidated(self):
+        with mock.patch.object(Webapp.objects, 'invalidate') as invalidate:
+            self.review(self.user, 4)
+        assert any([app.pk for app in args] == [self.app.pk]
+                   for args, kw in invalidate.call_args_list)
+
+    @mock.patch('mkt.ratings.tasks.statsd')
+    def test_coalesced(self, statsd):
+        tasks.update_review_aggregates({self.app.pk: [0, 0, 0, 3]})
+        statsd.incr.assert_called_with('ratings.aggregates.coalesced', 2)
+        assert statsd.timing.called
+
+    @mock.patch('mkt.ratings.tasks.statsd')
+    def test_reconcile(self, statsd):
+        self.review(self.user, 4)
+        ReviewAggregate.objects.filter(addon=self.app).update(rating_sum=9)
+        tasks.reconcile_review_aggregates([self.app.pk])
+        statsd.incr.assert_called_with('ratings.aggregates.drift', 1)
+        self.check(1, 1, 4)
+
+    @mock.patch('mkt.ratings.tasks.statsd')
+    def test_reconcile_no_drift(self, statsd):
+        self.review(self.user, 4)
+        tasks.reconcile_review_aggregates([self.app.pk])
+        statsd.incr.assert_called_with('ratings.aggregates.drift', 0)
+
+
+class TestReviewAggregatesQueue(amo.tests.TestCase):
+    fixtures = fixture('webapp_337141')
+
+    def setUp(self):
+        self.app = Webapp.objects.get(pk=337141)
+        patcher = mock.patch('mkt.ratings.tasks.redisutils')
+        self.redis = patcher.start().connections['master']
+        self.addCleanup(patcher.stop)
+        self.pipe = self.redis.pipeline.return_value
+
+    @mock.patch('mkt.ratings.tasks.process_review_aggregates')
+    def test_queue(self, process):
+        self.pipe.execute.return_value = [1, 1, 4, 1, True]
+        with self.settings(REVIEW_AGGREGATES_QUEUE=True):
+            tasks.queue_review_delta(self.app.pk, (1, 1, 4))
+        self.pipe.hincrby.assert_any_call(
+            tasks.DELTAS_KEY, '337141:rating_sum', 4)
+        assert process.apply_async.called
+
+    @mock.patch('mkt.ratings.tasks.process_review_aggregates')
+    def test_queue_already_scheduled(self, process):
+        self.pipe.execute.return_value = [1, 1, 4, 1, None]
+        with self.settings(REVIEW_AGGREGATES_QUEUE=True):
+            tasks.queue_review_delta(self.app.pk, (1, 1, 4))
+        assert not process.apply_async.called
+
+    @mock.patch('mkt.ratings.tasks.save_review_aggregates')
+    @mock.patch('mkt.ratings.tasks.apply_review_deltas')
+    def test_process(self, apply_, save):
+        self.pipe.execute.return_value = [
+            {'337141:total_reviews': '1', '337141:rated_reviews': '1',
+             '337141:rating_sum': '4', '337141:events': '2'}, True]
+        tasks.process_review_aggregates()
+        apply_.assert_called_with({337141: [1, 1, 4, 2]})
+        eq_(save.call_args[0][0], {337141: [1, 1, 4, 2]})
+
+    @mock.patch('mkt.ratings.tasks.save_review_aggregates')
+    @mock.patch('mkt.ratings.tasks.apply_review_deltas')
+    def test_process_failed(self, apply_, save):
+        apply_.side_effect = ValueError
+        self.pipe.execute.return_value = [{'337141:events': '2'}, True]
+        with self.assertRaises(ValueError):
+            tasks.process_review_aggregates()
+        self.pipe.hincrby.assert_called_with(
+            tasks.DELTAS_KEY, '337141:events', 2)
+        assert not save.called
+
+    @mock.patch('mkt.ratings.tasks.save_ratings')
+    def test_process_save_failed(self, save_ratings):
+        # The deltas are applied, saving the ratings again must not apply
+        # them twice.
+        save_ratings.side_effect = ValueError
+        self.pipe.execute.return_value = [{'337141:events': '2'}, True]
+        with self.assertRaises(ValueError):
+            tasks.process_review_aggregates()
+        assert not self.pipe.hincrby.called
+
+    @mock.patch('mkt.ratings.tasks.save_ratings')
+    @mock.patch('mkt.ratings.tasks.set_review_aggregates')
+    def test_apply_rolled_back(self, set_review_aggregates, save_ratings):
+        ReviewAggregate.objects.create(addon=self.app, total_reviews=1,
+                                       rated_reviews=1, rating_sum=4)
+        other = amo.tests.app_factory()
+        set_review_aggregates.side_effect = ValueError
+        with self.assertRaises(ValueError):
+            tasks.apply_review_deltas({self.app.pk: [1, 1, 5, 1],
+                                       other.pk: [1, 1, 3, 1]})
+        aggregate = ReviewAggregate.objects.get(addon=self.app)
+        eq_(aggregate.rating_sum, 4)
@@ -24,7 +24,7 @@ from mkt.receipts.tests.utils import (get_sample_app_receipt,
 from mkt.receipts.utils import create_receipt
 from mkt.site.fixtures import fixture
 from mkt.webapps.models import Addon
-from services import utils, verify
+from services import cache, utils, verify
 from mkt.users.models import UserProfile
 
 
@@ -37,6 +37,7 @@ def get_response(data, status):
 
 # There are two "different" settings files that need to be patched,
 # even though they are the same file.
+@mock.patch.object(utils.settings, 'SERVICES_RECEIPT_CACHE_SIZE', 0)
 @mock.patch.object(utils.settings, 'WEBAPPS_RECEIPT_KEY',
                    amo.tests.AMOPaths.sample_key())
 @mock.patch.object(settings, 'SITE_URL', 'http://foo.com/')
@@ -383,6 +384,227 @@ class TestVerify(amo.tests.TestCase):
         assert ('Cache-Control', 'no-cache') in hdrs, 'No cache header needed'
 
 
+@mock.patch.object(utils.settings, 'SERVICES_RECEIPT_CACHE_SIZE', 0)
+@mock.patch.object(utils.settings, 'WEBAPPS_RECEIPT_KEY',
+                   amo.tests.AMOPaths.sample_key())
+@mock.patch.object(settings, 'SITE_URL', 'http://foo.com/')
+@mock.patch.object(settings, 'WEBAPPS_RECEIPT_URL', '/verifyme/')
+class TestBatchVerify(amo.tests.TestCase):
+    fixtures = fixture('prices', 'webapp_337141', 'user_999')
+
+    def setUp(self):
+        self.app = Addon.objects.get(pk=337141)
+        self.user = UserProfile.objects.get(pk=999)
+        self.inapp = InAppProduct.objects.create(logo_url='image.png',
+                                                 name='Kiwii',
+                                                 price=Price.objects.get(pk=1),
+                                                 webapp=self.app)
+
+    @mock.patch.object(verify, 'decode_receipt')
+    def verify_receipts(self, receipts, decode_receipt):
+        # Each receipt is a key into `receipts`, so the decoder can hand
+        # back the matching receipt data.
+        decode_receipt.side_effect = lambda r, **kw: receipts[int(r)]
+        batch = verify.BatchVerify(
+            [str(k) for k in range(len(receipts))],
+            RequestFactory().get('/verifyme/').META
+        )
+        batch.cursor = connection.cursor()
+        return batch.check_full()
+
+    def test_statuses_in_order(self):
+        AddonPurchase.objects.create(addon=self.app, user=self.user,
+                                     uuid='some-uuid')
+        refunded = Contribution.objects.create(
+            addon=self.app, inapp_product=self.inapp, user=self.user,
+            type=amo.CONTRIB_REFUND)
+        unknown = get_sample_app_receipt()
+        unknown['user']['value'] = 'other-uuid'
+        wrong_type = get_sample_app_receipt()
+        wrong_type['typ'] = 'anything'
+
+        res = self.verify_receipts([get_sample_app_receipt(), unknown,
+                                    get_sample_inapp_receipt(refunded),
+                                    wrong_type])
+        eq_([r['status'] for r in res],
+            ['ok', 'invalid', 'refunded', 'invalid'])
+        eq_(res[1]['reason'], 'NO_PURCHASE')
+        eq_(res[3]['reason'], 'WRONG_TYPE')
+
+    def test_queries(self):
+        AddonPurchase.objects.create(addon=self.app, user=self.user,
+                                     uuid='some-uuid')
+        contribution = Contribution.objects.create(
+            addon=self.app, inapp_product=self.inapp, user=self.user,
+            type=amo.CONTRIB_PURCHASE)
+        receipts = ([get_sample_app_receipt() for k in range(5)] +
+                    [get_sample_inapp_receipt(contribution)
+                     for k in range(5)])
+        # One query for the apps and one for the inapp contributions.
+        with self.assertNumQueries(2):
+            res = self.verify_receipts(receipts)
+        eq_(set(r['status'] for r in res), set(['ok']))
+
+    @mock.patch.object(utils.settings, 'WEBAPPS_RECEIPT_BATCH_QUERY_SIZE', 2)
+    def test_chunked_queries(self):
+        AddonPurchase.objects.create(addon=self.app, user=self.user,
+                                     uuid='some-uuid')
+        receipts = []
+        for user_uuid in ['some-uuid', 'a', 'b', 'c']:
+            receipt = get_sample_app_receipt()
+            receipt['user']['value'] = user_uuid
+            receipts.append(receipt)
+        with self.assertNumQueries(2):
+            res = self.verify_receipts(receipts)
+        eq_([r['status'] for r in res], ['ok', 'invalid', 'invalid',
+                                         'invalid'])
+
+    @mock.patch.object(verify, 'decode_receipt')
+    def test_decodes_once(self, decode_receipt):
+        decode_receipt.return_value = get_sample_app_receipt()
+        batch = verify.BatchVerify(['a', 'a', 'b'], {})
+        for receipt in ['a', 'a', 'b']:
+            batch.decode(receipt)
+        eq_(decode_receipt.call_count, 2)
+
+    @mock.patch.object(verify, 'decode_receipt')
+    def test_decode_error_remembered(self, decode_receipt):
+        decode_receipt.side_effect = ValueError
+        batch = verify.BatchVerify(['a', 'a'], {})
+        for receipt in ['a', 'a']:
+            with self.assertRaises(ValueError):
+                batch.decode(receipt)
+        eq_(decode_receipt.call_count, 1)
+
+
+class TestBatchCheck(amo.tests.TestCase):
+
+    def check(self, data):
+        return verify.batch_receipt_check({}, data)
+
+    def test_not_json(self):
+        eq_(self.check('[blah')[0], 400)
+
+    def test_not_strings(self):
+        eq_(self.check('[1, 2]')[0], 400)
+
+    @mock.patch.object(utils.settings, 'WEBAPPS_RECEIPT_BATCH_MAX', 1)
+    def test_too_many(self):
+        eq_(self.check('["a", "b"]')[0], 400)
+
+    @mock.patch.object(verify.BatchVerify, 'check_full')
+    def test_ok(self, check_full):
+        check_full.return_value = [{'status': 'ok'}]
+        eq_(self.check('["a"]'), (200, '[{"status": "ok"}]'))
+
+    @mock.patch('services.verify.batch_receipt_check')
+    def test_array_is_batch(self, batch_receipt_check):
+        batch_receipt_check.return_value = 200, '[]'
+        environ = {'wsgi.input': mock.Mock()}
+        environ['wsgi.input'].read.return_value = '["a"]'
+        eq_(verify.receipt_check(environ), (200, '[]'))
+
+
+class TestLRUCache(amo.tests.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        lru = cache.LRUCache(2, 60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        eq_(lru.get('a'), 1)
+        lru.set('c', 3)
+        eq_(lru.get('b'), None)
+        eq_(lru.get('a'), 1)
+        eq_(lru.get('c'), 3)
+
+    @mock.patch('services.cache.time.time')
+    def test_expires(self, time_):
+        time_.return_value = 100
+        lru = cache.LRUCache(2, 60)
+        lru.set('a', 1)
+        time_.return_value = 161
+        eq_(lru.get('a'), None)
+
+    def test_disabled(self):
+        lru = cache.LRUCache(0, 60)
+        lru.set('a', 1)
+        eq_(lru.get('a'), None)
+
+
+@mock.patch.object(utils.settings, 'SERVICES_RECEIPT_CACHE_SIZE', 10)
+@mock.patch.object(utils.settings, 'SERVICES_RECEIPT_CACHE_LOCATION', [])
+@mock.patch.object(utils.settings, 'WEBAPPS_RECEIPT_KEY',
+                   amo.tests.AMOPaths.sample_key())
+@mock.patch.object(settings, 'SITE_URL', 'http://foo.com/')
+@mock.patch.object(settings, 'WEBAPPS_RECEIPT_URL', '/verifyme/')
+class TestReceiptCache(amo.tests.TestCase):
+    fixtures = fixture('webapp_337141', 'user_999')
+
+    def setUp(self):
+        self.app = Addon.objects.get(pk=337141)
+        self.user = UserProfile.objects.get(pk=999)
+        self.client = mock.Mock()
+        self.client.get.return_value = None
+        self.client.get_multi.return_value = {}
+        self.patch = mock.patch.object(verify.ReceiptCache, 'client',
+                                       self.client)
+        self.patch.start()
+        self.addCleanup(self.patch.stop)
+        self.addCleanup(verify.receipt_cache.local.clear)
+
+    @mock.patch.object(verify, 'decode_receipt')
+    def check(self, receipt, decode_receipt):
+        decode_receipt.return_value = get_sample_app_receipt()
+        verifier = verify.Verify(receipt,
+                                 RequestFactory().get('/verifyme/').META)
+        verifier.cursor = connection.cursor()
+        return verifier.check_full(), decode_receipt.call_count
+
+    def test_decoded_cached(self):
+        AddonPurchase.objects.create(addon=self.app, user=self.user,
+                                     uuid='some-uuid')
+        eq_(self.check('receipt')[1], 1)
+        eq_(self.check('receipt')[1], 0)
+        eq_(self.check('other')[1], 1)
+
+    def test_decoded_copied(self):
+        verify.receipt_cache.set_decoded('receipt', {'exp': 1})
+        verify.receipt_cache.get_decoded('receipt')['exp'] = 2
+        eq_(verify.receipt_cache.get_decoded('receipt'), {'exp': 1})
+
+    def test_purchase_cached(self):
+        AddonPurchase.objects.create(addon=self.app, user=self.user,
+                                     uuid='some-uuid')
+        eq_(self.check('receipt')[0]['status'], 'ok')
+        key = cache.app_purchase_key(337141, 'some-uuid')
+        self.client.add.assert_called_with(
+            key, (amo.CONTRIB_PURCHASE,), time=mock.ANY)
+
+    def test_purchase_from_cache(self):
+        key = cache.app_purchase_key(337141, 'some-uuid')
+        self.client.get_multi.return_value = {key: (amo.CONTRIB_REFUND,)}
+        with self.assertNumQueries(0):
+            eq_(self.check('receipt')[0]['status'], 'refunded')
+
+    def test_purchase_invalidated(self):
+        AddonPurchase.objects.create(addon=self.app, user=self.user,
+                                     uuid='some-uuid', type=amo.CONTRIB_REFUND)
+        key = cache.app_purchase_key(337141, 'some-uuid')
+        self.client.get_multi.return_value = {key: cache.INVALIDATED}
+        eq_(self.check('receipt')[0]['status'], 'refunded')
+
+    def test_purchase_invalidation(self):
+        key = cache.app_purchase_key(337141, 'some-uuid')
+        verify.receipt_cache.delete_purchases([key])
+        self.client.set_multi.assert_called_with(
+            {key: cache.INVALIDATED}, time=mock.ANY)
+        assert not self.client.delete_multi.called
+
+    def test_no_purchase_not_cached(self):
+        eq_(self.check('receipt')[0]['status'], 'invalid')
+        assert not self.client.add.called
+
+
 class TestBase(amo.tests.TestCase):
 
     def create(self, data, request=None):
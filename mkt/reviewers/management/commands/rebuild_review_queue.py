@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+import amo
+from amo.utils import chunked
+from mkt.reviewers.models import update_queue_entries
+from mkt.webapps.models import Webapp
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the review_queue_entry table the reviewer queues use.'
+
+    def handle(self, *args, **options):
+        ids = (Webapp.with_deleted.filter(type=amo.ADDON_WEBAPP)
+               .order_by('id').values_list('id', flat=True))
+        # Not update_review_queue, it only runs at the end of a request.
+        for chunk in chunked(ids, 100):
+            update_queue_entries(chunk)
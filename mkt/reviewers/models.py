@@ -1,7 +1,9 @@
+import collections
 import datetime
 
+from django.conf import settings
 from django.core.cache import cache
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Sum
 
 import commonware.log
@@ -134,9 +136,9 @@ class ReviewerScore(amo.models.ModelBase):
         if val is not None:
             return val
 
-        val = (ReviewerScore.objects.no_cache().filter(user=user)
-                                    .aggregate(total=Sum('score'))
-                                    .values())[0]
+        val = (ReviewerScoreDaily.objects.filter(user=user)
+                                         .aggregate(total=Sum('score'))
+                                         .values())[0]
         if val is None:
             val = 0
 
@@ -159,6 +161,21 @@ class ReviewerScore(amo.models.ModelBase):
         cache.set(key, val, None)
         return val
 
+    @classmethod
+    def _breakdown(cls, user, since=None):
+        """
+        Returns ScoreBreakdowns of the points of the user by addon type,
+        most points first.
+        """
+        query = (ReviewerScoreDaily.objects.filter(user=user)
+                                           .values_list('addon_type')
+                                           .annotate(total=Sum('score'))
+                                           .order_by('-total'))
+        if since is not None:
+            query = query.filter(day__gte=since)
+        return [ScoreBreakdown(atype or None, int(total))
+                for atype, total in query]
+
     @classmethod
     def get_breakdown(cls, user):
         """Returns points broken down by addon type."""
@@ -168,53 +185,31 @@ class ReviewerScore(amo.models.ModelBase):
         if val is not None:
             return val
 
-        sql = """
-             SELECT `reviewer_scores`.*,
-                    SUM(`reviewer_scores`.`score`) AS `total`,
-                    `addons`.`addontype_id` AS `atype`
-             FROM `reviewer_scores`
-             LEFT JOIN `addons` ON (`reviewer_scores`.`addon_id`=`addons`.`id`)
-             WHERE `reviewer_scores`.`user_id` = %s
-             GROUP BY `addons`.`addontype_id`
-             ORDER BY `total` DESC
-        """
-        with amo.models.skip_cache():
-            val = list(ReviewerScore.objects.raw(sql, [user.id]))
+        val = cls._breakdown(user)
         cache.set(key, val, None)
         return val
 
     @classmethod
     def get_breakdown_since(cls, user, since):
         """
-        Returns points broken down by addon type since the given datetime.
+        Returns points broken down by addon type since the day of the given
+        datetime.
         """
         key = cls.get_key('get_breakdown:%s:%s' % (user.id, since.isoformat()))
         val = cache.get(key)
         if val is not None:
             return val
 
-        sql = """
-             SELECT `reviewer_scores`.*,
-                    SUM(`reviewer_scores`.`score`) AS `total`,
-                    `addons`.`addontype_id` AS `atype`
-             FROM `reviewer_scores`
-             LEFT JOIN `addons` ON (`reviewer_scores`.`addon_id`=`addons`.`id`)
-             WHERE `reviewer_scores`.`user_id` = %s AND
-                   `reviewer_scores`.`created` >= %s
-             GROUP BY `addons`.`addontype_id`
-             ORDER BY `total` DESC
-        """
-        with amo.models.skip_cache():
-            val = list(ReviewerScore.objects.raw(sql, [user.id, since]))
+        val = cls._breakdown(user, since=since)
         cache.set(key, val, 3600)
         return val
 
     @classmethod
     def _leaderboard_query(cls, since=None, types=None, addon_type=None):
         """
-        Returns common SQL to leaderboard calls.
+        Returns common SQL to leaderboard calls, summing the daily totals.
         """
-        query = (cls.objects
+        query = (ReviewerScoreDaily.objects
                     .values_list('user__id', 'user__display_name')
                     .annotate(total=Sum('score'))
                     .exclude(user__groups__name__in=('No Reviewer Incentives',
@@ -222,13 +217,13 @@ class ReviewerScore(amo.models.ModelBase):
                     .order_by('-total'))
 
         if since is not None:
-            query = query.filter(created__gte=since)
+            query = query.filter(day__gte=since)
 
         if types is not None:
             query = query.filter(note_key__in=types)
 
         if addon_type is not None:
-            query = query.filter(addon__type=addon_type)
+            query = query.filter(addon_type=addon_type)
 
         return query
 
@@ -254,39 +249,37 @@ class ReviewerScore(amo.models.ModelBase):
 
         week_ago = datetime.date.today() - datetime.timedelta(days=days)
 
-        leader_top = []
-        leader_near = []
+        def score(rank, row):
+            user_id, name, total = row
+            return {'user_id': user_id, 'name': name, 'rank': rank,
+                    'total': int(total)}
 
         query = cls._leaderboard_query(since=week_ago, types=types,
                                        addon_type=addon_type)
-        scores = []
+        leader_top = [score(rank, row) for rank, row in
+                      enumerate(query[:5], 1)]
+        leader_near = []
 
         user_rank = 0
-        in_leaderboard = False
-        for rank, row in enumerate(query, 1):
-            user_id, name, total = row
-            scores.append({
-                'user_id': user_id,
-                'name': name,
-                'rank': rank,
-                'total': int(total),
-            })
-            if user_id == user.id:
-                user_rank = rank
-                in_leaderboard = True
-
-        if not in_leaderboard:
-            leader_top = scores[:5]
-        else:
-            if user_rank <= 5:  # User is in top 5, show top 5.
-                leader_top = scores[:5]
-            else:
-                leader_top = scores[:3]
-                leader_near = [scores[user_rank - 2], scores[user_rank - 1]]
-                try:
-                    leader_near.append(scores[user_rank])
-                except IndexError:
-                    pass  # User is last on the leaderboard.
+        for row in leader_top:
+            if row['user_id'] == user.id:
+                user_rank = row['rank']
+
+        if not user_rank:
+            # Rank the user by counting who scored more, then show who is
+            # right above and below.
+            rows = list(query.filter(user=user))
+            if rows:
+                total = rows[0][2]
+                user_rank = query.filter(total__gt=total).count() + 1
+                above = query.filter(total__gt=total).order_by('total')[:1]
+                below = (query.filter(total__lte=total).exclude(user=user)
+                              [:1])
+                leader_top = leader_top[:3]
+                leader_near = (
+                    [score(user_rank - 1, row) for row in above] +
+                    [score(user_rank, rows[0])] +
+                    [score(user_rank + 1, row) for row in below])
 
         val = {
             'leader_top': leader_top,
@@ -335,6 +328,80 @@ class ReviewerScore(amo.models.ModelBase):
         return scores
 
 
+# A user's points for an addon type, see ReviewerScore.get_breakdown.
+ScoreBreakdown = collections.namedtuple('ScoreBreakdown', 'atype total')
+
+
+class ReviewerScoreDaily(amo.models.ModelBase):
+    """
+    The ReviewerScores of a user summed per day, event and addon type, so
+    that the totals and leaderboards sum a bounded number of rows. The rows
+    of a user and day are summed again when one of their ReviewerScores is
+    saved or deleted.
+    """
+    user = models.ForeignKey(UserProfile, related_name='+')
+    day = models.DateField()
+    note_key = models.SmallIntegerField(default=0)
+    # 0 for the ReviewerScores without an addon.
+    addon_type = models.PositiveIntegerField(default=0)
+    score = models.IntegerField(default=0)
+
+    objects = amo.models.UncachedManagerBase()
+
+    class Meta:
+        db_table = 'reviewer_score_daily'
+        index_together = [('user', 'day'), ('day', 'note_key')]
+        unique_together = ('user', 'day', 'note_key', 'addon_type')
+
+
+def update_reviewer_score_daily(user_id, day):
+    """Sums the ReviewerScores of the user on the day again."""
+    start = datetime.datetime.combine(day, datetime.time())
+    with transaction.atomic():
+        # Lock the user so that concurrent sums of the same user don't
+        # both insert their rows, the day may not have any rows to lock yet.
+        list(UserProfile.objects.no_cache().select_for_update()
+             .filter(pk=user_id).values_list('pk', flat=True))
+        totals = (ReviewerScore.objects.no_cache()
+                  .filter(user=user_id, created__gte=start,
+                          created__lt=start + datetime.timedelta(days=1))
+                  .values_list('note_key', 'addon__type')
+                  .annotate(total=Sum('score'))
+                  .order_by())
+        ReviewerScoreDaily.objects.filter(user=user_id, day=day).delete()
+        ReviewerScoreDaily.objects.bulk_create([
+            ReviewerScoreDaily(user_id=user_id, day=day, note_key=note_key,
+                               addon_type=addon_type or 0, score=total)
+            for note_key, addon_type, total in totals])
+
+
+def _score_day(score):
+    if score.user_id and score.created:
+        return score.user_id, score.created.date()
+
+
+def remember_score_day(sender, instance, **kw):
+    instance._score_day = _score_day(instance)
+
+
+def update_score_days(sender, instance, **kw):
+    """Updates the days the score was and is now in."""
+    if kw.get('raw'):
+        return
+    days = set([getattr(instance, '_score_day', None), _score_day(instance)])
+    for day in days - set([None]):
+        update_reviewer_score_daily(*day)
+    instance._score_day = _score_day(instance)
+
+
+models.signals.post_init.connect(remember_score_day, sender=ReviewerScore,
+                                 dispatch_uid='reviewerscore_day')
+models.signals.post_save.connect(update_score_days, sender=ReviewerScore,
+                                 dispatch_uid='reviewerscore_daily_save')
+models.signals.post_delete.connect(update_score_days, sender=ReviewerScore,
+                                   dispatch_uid='reviewerscore_daily_delete')
+
+
 class EscalationQueue(amo.models.ModelBase):
     addon = models.ForeignKey(Addon)
 
@@ -408,6 +475,97 @@ class AdditionalReview(amo.models.ModelBase):
         tarako_failed(self)
 
 
+class ReviewQueueEntry(amo.models.ModelBase):
+    """
+    An app waiting in a review queue. The rows are kept up to date from
+    signals by update_queue_entries() so that the queues and their counts are
+    simple reads, `manage.py rebuild_review_queue` rebuilds them all.
+    """
+    QUEUES = ('pending', 'updates', 'rereview', 'escalated')
+
+    addon = models.ForeignKey(Addon)
+    queue = models.CharField(max_length=20,
+                             choices=[(q, q) for q in QUEUES])
+    priority_review = models.BooleanField(default=False)
+    # When the app entered the queue: the nomination of the version for the
+    # pending and updates queues, the flagging date for the others.
+    nomination = models.DateTimeField(null=True)
+    name_sort = models.CharField(max_length=255, default='')
+    abuse_count = models.PositiveIntegerField(default=0)
+
+    objects = amo.models.UncachedManagerBase()
+
+    class Meta:
+        db_table = 'review_queue_entry'
+        unique_together = ('addon', 'queue')
+        index_together = [('queue', 'priority_review', 'nomination')]
+
+
+def get_queue_entries(ids):
+    """
+    Returns a {(app id, queue): nomination} dict of the queues the apps are
+    in, with the same rules as the reviewer queue pages.
+    """
+    from mkt.versions.models import Version
+
+    apps = dict(Addon.with_deleted.no_cache().filter(
+        id__in=ids, type=amo.ADDON_WEBAPP, disabled_by_user=False)
+        .exclude(status=amo.STATUS_DELETED).values_list('id', 'status'))
+    escalated = dict(EscalationQueue.objects.no_cache()
+                     .filter(addon__in=apps).values_list('addon', 'created'))
+    rereview = dict(RereviewQueue.objects.no_cache()
+                    .filter(addon__in=apps).values_list('addon', 'created'))
+    # The latest nominated version with pending files of each app.
+    nominated = dict(Version.objects.no_cache()
+                     .filter(addon__in=apps, files__status=amo.STATUS_PENDING)
+                     .order_by('created').values_list('addon', 'nomination'))
+
+    entries = {}
+    for app_id, status in apps.items():
+        if app_id in escalated:
+            entries[app_id, 'escalated'] = escalated[app_id]
+            continue
+        if app_id in rereview:
+            entries[app_id, 'rereview'] = rereview[app_id]
+        if app_id in nominated:
+            if status == amo.STATUS_PENDING:
+                entries[app_id, 'pending'] = nominated[app_id]
+            elif status in amo.WEBAPPS_APPROVED_STATUSES:
+                entries[app_id, 'updates'] = nominated[app_id]
+    return entries
+
+
+def update_queue_entries(ids):
+    """Adds, updates and removes the ReviewQueueEntry rows of the apps."""
+    entries = get_queue_entries(ids)
+    app_ids = set(app_id for app_id, queue in entries)
+    apps = dict((app.id, app) for app in Addon.with_deleted.no_cache()
+                .filter(id__in=app_ids)
+                .annotate(abuse_count=models.Count('abuse_reports')))
+
+    def values(app_id, queue):
+        app = apps[app_id]
+        return {'nomination': entries[app_id, queue],
+                'priority_review': app.priority_review,
+                'name_sort': unicode(app.name or '').lower()[:255],
+                'abuse_count': app.abuse_count}
+
+    for entry in ReviewQueueEntry.objects.filter(addon__in=ids):
+        key = entry.addon_id, entry.queue
+        if key not in entries:
+            entry.delete()
+            continue
+        data = values(*key)
+        del entries[key]
+        if any(getattr(entry, k) != v for k, v in data.items()):
+            entry.update(_signal=False, **data)
+
+    ReviewQueueEntry.objects.bulk_create([
+        ReviewQueueEntry(addon_id=app_id, queue=queue,
+                         **values(app_id, queue))
+        for app_id, queue in entries])
+
+
 def cleanup_queues(sender, instance, **kwargs):
     RereviewQueue.objects.filter(addon=instance).delete()
     EscalationQueue.objects.filter(addon=instance).delete()
@@ -415,3 +573,38 @@ def cleanup_queues(sender, instance, **kwargs):
 
 models.signals.post_delete.connect(cleanup_queues, sender=Addon,
                                    dispatch_uid='queue-addon-cleanup')
+
+
+def update_queues(sender, instance, **kw):
+    """Updates the ReviewQueueEntry rows when anything they depend on
+    changes."""
+    from mkt.reviewers.tasks import update_review_queue
+    if kw.get('raw') or not settings.REVIEWER_QUEUE_TABLE:
+        return
+    try:
+        if isinstance(instance, Addon):
+            app_id = instance.id
+        elif hasattr(instance, 'version_id'):
+            app_id = instance.version.addon_id
+        else:
+            app_id = instance.addon_id
+    except models.ObjectDoesNotExist:
+        return
+    if app_id:
+        update_review_queue.delay([app_id])
+
+
+def _connect_queue_signals():
+    from mkt.abuse.models import AbuseReport
+    from mkt.files.models import File
+    from mkt.versions.models import Version
+    from mkt.webapps.models import Webapp
+
+    for sender in (Addon, Webapp, Version, File, EscalationQueue,
+                   RereviewQueue, AbuseReport):
+        for signal in (models.signals.post_save, models.signals.post_delete):
+            signal.connect(update_queues, sender=sender,
+                           dispatch_uid='review-queue-%s-%s' % (
+                               sender._meta.object_name, id(signal)))
+
+_connect_queue_signals()
@@ -0,0 +1,15 @@
+import commonware.log
+
+from amo.decorators import write
+from lib.post_request_task.task import task as post_request_task
+from mkt.reviewers.models import update_queue_entries
+
+
+log = commonware.log.getLogger('z.task')
+
+
+@post_request_task
+@write
+def update_review_queue(ids, **kw):
+    log.info('Updating review queue entries for %s apps.' % len(ids))
+    update_queue_entries(ids)
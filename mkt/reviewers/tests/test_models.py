@@ -2,14 +2,22 @@
 import time
 from datetime import datetime, timedelta
 
+from django.core.management import call_command
+
 import mock
 from nose.tools import eq_, ok_
 
 import amo
 import amo.tests
-from mkt.reviewers.models import (AdditionalReview, RereviewQueue,
-                                  ReviewerScore, QUEUE_TARAKO, tarako_passed,
-                                  tarako_failed)
+from amo.tests import app_factory, version_factory
+from mkt.abuse.models import AbuseReport
+from mkt.reviewers.models import (AdditionalReview, EscalationQueue,
+                                  RereviewQueue, ReviewerScore,
+                                  ReviewerScoreDaily, ReviewQueueEntry,
+                                  QUEUE_TARAKO,
+                                  tarako_passed, tarako_failed,
+                                  update_queue_entries,
+                                  update_reviewer_score_daily)
 from mkt.site.fixtures import fixture
 from mkt.tags.models import Tag
 from mkt.users.models import UserProfile
@@ -145,6 +153,46 @@ class TestReviewerScore(amo.tests.TestCase):
         eq_(leaders['user_rank'], 6)
         eq_(len(leaders['leader_top']), 3)
         eq_(len(leaders['leader_near']), 2)
+        eq_([l['rank'] for l in leaders['leader_near']], [5, 6])
+        eq_(leaders['leader_near'][1]['user_id'], last_user.id)
+
+    def test_daily(self):
+        self._give_points()
+        self._give_points()
+        ReviewerScore.award_moderation_points(self.user, self.app, 1)
+        daily = dict(ReviewerScoreDaily.objects.filter(user=self.user)
+                     .values_list('note_key', 'score'))
+        eq_(daily, {
+            amo.REVIEWED_WEBAPP_HOSTED:
+                amo.REVIEWED_SCORES[amo.REVIEWED_WEBAPP_HOSTED] * 2,
+            amo.REVIEWED_APP_REVIEW:
+                amo.REVIEWED_SCORES[amo.REVIEWED_APP_REVIEW]})
+        eq_(ReviewerScoreDaily.objects.get(
+            note_key=amo.REVIEWED_APP_REVIEW).addon_type, amo.ADDON_WEBAPP)
+
+    def test_daily_moved(self):
+        self._give_points()
+        score = ReviewerScore.objects.no_cache().get()
+        score.update(created=self.days_ago(50))
+        eq_(list(ReviewerScoreDaily.objects.values_list('day', flat=True)),
+            [self.days_ago(50).date()])
+
+    def test_daily_again(self):
+        self._give_points()
+        score = ReviewerScore.objects.no_cache().get()
+        update_reviewer_score_daily(self.user.pk, score.created.date())
+        eq_(ReviewerScoreDaily.objects.count(), 1)
+
+    def test_daily_without_addon(self):
+        ReviewerScore.objects.create(user=self.user, score=10,
+                                     note_key=amo.REVIEWED_MANUAL)
+        eq_(ReviewerScoreDaily.objects.get().addon_type, 0)
+        eq_(ReviewerScore.get_breakdown(self.user)[0].atype, None)
+
+    def test_daily_delete(self):
+        self._give_points()
+        ReviewerScore.objects.no_cache().get().delete()
+        eq_(ReviewerScoreDaily.objects.count(), 0)
 
     def test_all_users_by_score(self):
         user2 = UserProfile.objects.get(email='regular@mozilla.com')
@@ -289,3 +337,70 @@ class TestTarakoFunctions(amo.tests.TestCase):
         ok_(not self.index.called)
         tarako_failed(self.review)
         self.index.assert_called_with([self.app.pk])
+
+
+class TestReviewQueueEntry(amo.tests.TestCase):
+
+    def setUp(self):
+        self.pending = app_factory(
+            name='Pending', status=amo.STATUS_PENDING,
+            version_kw={'nomination': self.days_ago(2)},
+            file_kw={'status': amo.STATUS_PENDING})
+        self.public = app_factory(name='Public', is_packaged=True)
+        version_factory(addon=self.public, version='1.1',
+                        nomination=self.days_ago(1),
+                        file_kw={'status': amo.STATUS_PENDING})
+        self.ids = [self.pending.id, self.public.id]
+
+    def entries(self):
+        return sorted(ReviewQueueEntry.objects.values_list('addon', 'queue'))
+
+    def test_pending_and_updates(self):
+        update_queue_entries(self.ids)
+        eq_(self.entries(), [(self.pending.id, 'pending'),
+                             (self.public.id, 'updates')])
+        entry = ReviewQueueEntry.objects.get(addon=self.pending)
+        eq_(entry.nomination.date(), self.days_ago(2).date())
+        eq_(entry.name_sort, 'pending')
+
+    def test_rereview(self):
+        RereviewQueue.objects.create(addon=self.public)
+        update_queue_entries(self.ids)
+        eq_(self.entries(), [(self.pending.id, 'pending'),
+                             (self.public.id, 'updates'),
+                             (self.public.id, 'rereview')])
+
+    def test_escalated_only(self):
+        EscalationQueue.objects.create(addon=self.pending)
+        update_queue_entries(self.ids)
+        eq_(self.entries(), [(self.pending.id, 'escalated'),
+                             (self.public.id, 'updates')])
+
+    def test_removed(self):
+        update_queue_entries(self.ids)
+        self.pending.update(disabled_by_user=True)
+        self.public.versions.latest().all_files[0].update(
+            status=amo.STATUS_PUBLIC)
+        update_queue_entries(self.ids)
+        eq_(self.entries(), [])
+
+    def test_updated(self):
+        update_queue_entries(self.ids)
+        AbuseReport.objects.create(addon=self.pending)
+        self.pending.update(priority_review=True)
+        update_queue_entries([self.pending.id])
+        entry = ReviewQueueEntry.objects.get(addon=self.pending)
+        eq_(entry.abuse_count, 1)
+        ok_(entry.priority_review)
+
+    def test_rebuild_command(self):
+        ReviewQueueEntry.objects.all().delete()
+        call_command('rebuild_review_queue')
+        eq_(self.entries(), [(self.pending.id, 'pending'),
+                             (self.public.id, 'updates')])
+
+    @mock.patch('mkt.reviewers.tasks.update_review_queue.delay')
+    def test_signals(self, update):
+        with self.settings(REVIEWER_QUEUE_TABLE=True):
+            RereviewQueue.objects.create(addon=self.pending)
+        update.assert_called_with([self.pending.id])
@@ -43,7 +43,8 @@ from mkt.developers.models import ActivityLog, ActivityLogAttachment, AppLog
 from mkt.files.models import File
 from mkt.ratings.models import Review, ReviewFlag
 from mkt.reviewers.models import (CannedResponse, EscalationQueue,
-                                  RereviewQueue, ReviewerScore)
+                                  RereviewQueue, ReviewerScore,
+                                  update_queue_entries)
 from mkt.reviewers.views import (_do_sort, _progress, app_review, queue_apps,
                                  route_reviewer)
 from mkt.site.fixtures import fixture
@@ -584,6 +585,45 @@ class TestRegionQueue(AppReviewerTest, AccessMixin, FlagsMixin, SearchMixin,
         eq_([a.app for a in res.context['addons']], [self.apps[1]])
 
 
+class TestQueueTable(AppReviewerTest):
+
+    def setUp(self):
+        self.apps = [app_factory(name='XXX',
+                                 status=amo.STATUS_PENDING,
+                                 version_kw={'nomination': self.days_ago(2)},
+                                 file_kw={'status': amo.STATUS_PENDING}),
+                     app_factory(name='YYY',
+                                 status=amo.STATUS_PENDING,
+                                 version_kw={'nomination': self.days_ago(1)},
+                                 file_kw={'status': amo.STATUS_PENDING}),
+                     app_factory(name='ZZZ')]
+        RereviewQueue.objects.create(addon=self.apps[2])
+        update_queue_entries([app.id for app in self.apps])
+        self.create_switch('reviewer-queue-table')
+        self.login_as_editor()
+        self.url = reverse('reviewers.apps.queue_pending')
+
+    def test_queue(self):
+        res = self.client.get(self.url)
+        eq_(res.status_code, 200)
+        eq_([a.app for a in res.context['addons']], self.apps[:2])
+        eq_(res.context['addons'][0].created.date(),
+            self.days_ago(2).date())
+
+    def test_sort(self):
+        self.apps[1].update(priority_review=True)
+        update_queue_entries([self.apps[1].id])
+        res = self.client.get(self.url, {'sort': 'name', 'order': 'desc'})
+        eq_([a.app for a in res.context['addons']], self.apps[1::-1])
+
+    def test_queue_count(self):
+        res = self.client.get(self.url)
+        doc = pq(res.content)
+        eq_(doc('.tabnav li a:eq(0)').text(), u'Apps (2)')
+        eq_(doc('.tabnav li a:eq(1)').text(), u'Re-reviews (1)')
+        eq_(doc('.tabnav li a:eq(2)').text(), u'Updates (0)')
+
+
 @mock.patch('mkt.versions.models.Version.is_privileged', False)
 class TestRereviewQueue(AppReviewerTest, AccessMixin, FlagsMixin, SearchMixin,
                         XSSMixin):
@@ -30,6 +30,7 @@ from rest_framework.generics import CreateAPIView, ListAPIView, UpdateAPIView
 from rest_framework.response import Response
 from rest_framework.serializers import ModelSerializer, PrimaryKeyRelatedField
 from tower import ugettext as _
+import waffle
 from waffle.decorators import waffle_switch
 
 import amo
@@ -61,7 +62,8 @@ from mkt.reviewers.forms import (ApiReviewersSearchForm, ApproveRegionForm,
                                  MOTDForm)
 from mkt.reviewers.models import (AdditionalReview, EditorSubscription,
                                   EscalationQueue, RereviewQueue,
-                                  ReviewerScore, QUEUE_TARAKO)
+                                  ReviewerScore, ReviewQueueEntry,
+                                  QUEUE_TARAKO)
 from mkt.reviewers.serializers import (ReviewersESAppSerializer,
                                        ReviewingSerializer)
 from mkt.reviewers.utils import (AppsReviewing, clean_sort_param,
@@ -150,6 +152,8 @@ def home(request):
 
 
 def queue_counts(request):
+    if waffle.switch_is_active('reviewer-queue-table'):
+        return _queue_table_counts(request)
     excluded_ids = EscalationQueue.objects.no_cache().values_list('addon',
                                                                   flat=True)
     public_statuses = amo.WEBAPPS_APPROVED_STATUSES
@@ -203,6 +207,28 @@ def queue_counts(request):
     return rv
 
 
+def _queue_table_counts(request):
+    """queue_counts() reading the materialized ReviewQueueEntry table."""
+    counts = dict.fromkeys(ReviewQueueEntry.QUEUES, 0)
+    counts.update(ReviewQueueEntry.objects.values_list('queue')
+                                  .annotate(Count('id')).order_by())
+    counts.update({
+        'moderated': Review.objects.no_cache()
+                           .exclude(Q(addon__isnull=True) |
+                                    Q(reviewflag__isnull=True))
+                           .exclude(addon__status=amo.STATUS_DELETED)
+                           .filter(addon__type=amo.ADDON_WEBAPP,
+                                   editorreview=True)
+                           .count(),
+        'region_cn': Webapp.objects.pending_in_region(mkt.regions.CN).count(),
+        'additional_tarako': AdditionalReview.objects.filter(
+            queue=QUEUE_TARAKO, passed=None).count(),
+    })
+    if 'pro' in request.GET:
+        counts.update({'device': device_queue_search(request).count()})
+    return counts
+
+
 def _progress():
     """Returns unreviewed apps progress.
 
@@ -527,6 +553,39 @@ def _queue(request, apps, tab, pager_processor=None, date_sort='created',
     return render(request, template, context(request, **ctx))
 
 
+class QueueEntryList(object):
+    """
+    The QueuedApps of a ReviewQueueEntry queryset, only the apps of the page
+    being sliced are loaded.
+    """
+
+    def __init__(self, qs):
+        self.qs = qs
+
+    def count(self):
+        return self.qs.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, k):
+        entries = list(self.qs[k])
+        apps = Webapp.objects.in_bulk([e.addon_id for e in entries])
+        return [QueuedApp(apps[e.addon_id], e.nomination) for e in entries
+                if e.addon_id in apps]
+
+
+def _queue_entries(request, queue, date_sort='created'):
+    """Returns the sorted QueueEntryList of a queue."""
+    sort_type, order = clean_sort_param(request, date_sort=date_sort)
+    field = {'name': 'name_sort',
+             'num_abuse_reports': 'abuse_count'}.get(sort_type, 'nomination')
+    qs = (ReviewQueueEntry.objects.filter(queue=queue)
+          .order_by('-priority_review',
+                    ('-' if order == 'desc' else '') + field, 'id'))
+    return QueueEntryList(qs)
+
+
 def _do_sort(request, qs, date_sort='created'):
     """Returns sorted Webapp queryset."""
     if qs.model is Webapp:
@@ -590,6 +649,10 @@ def _do_sort_queue_obj(request, qs, date_sort):
 
 @reviewer_required
 def queue_apps(request):
+    if waffle.switch_is_active('reviewer-queue-table'):
+        apps = _queue_entries(request, 'pending', date_sort='nomination')
+        return _queue(request, apps, 'pending', date_sort='nomination')
+
     excluded_ids = EscalationQueue.objects.no_cache().values_list('addon',
                                                                   flat=True)
     qs = (Version.objects.no_cache().filter(
@@ -647,6 +710,10 @@ def additional_review(request, queue):
 
 @reviewer_required
 def queue_rereview(request):
+    if waffle.switch_is_active('reviewer-queue-table'):
+        apps = _queue_entries(request, 'rereview')
+        return _queue(request, apps, 'rereview')
+
     excluded_ids = EscalationQueue.objects.no_cache().values_list('addon',
                                                                   flat=True)
     rqs = (RereviewQueue.objects.no_cache()
@@ -661,6 +728,10 @@ def queue_rereview(request):
 
 @permission_required('Apps', 'ReviewEscalated')
 def queue_escalated(request):
+    if waffle.switch_is_active('reviewer-queue-table'):
+        apps = _queue_entries(request, 'escalated')
+        return _queue(request, apps, 'escalated')
+
     eqs = EscalationQueue.objects.no_cache().filter(
         addon__type=amo.ADDON_WEBAPP, addon__disabled_by_user=False)
     apps = _do_sort(request, eqs)
@@ -671,6 +742,10 @@ def queue_escalated(request):
 
 @reviewer_required
 def queue_updates(request):
+    if waffle.switch_is_active('reviewer-queue-table'):
+        apps = _queue_entries(request, 'updates', date_sort='nomination')
+        return _queue(request, apps, 'updates', date_sort='nomination')
+
     excluded_ids = EscalationQueue.objects.no_cache().values_list('addon',
                                                                   flat=True)
     qs = (Version.objects.no_cache().filter(
@@ -1,9 +1,13 @@
 import logging
 import sys
+import threading
 
 from django.conf import settings
+from django.core.signals import got_request_exception, request_finished
 
 import elasticsearch
+import redisutils
+from celery.signals import task_postrun
 from celeryutils import task
 from elasticsearch import helpers
 from elasticsearch_dsl import Search
@@ -12,10 +16,13 @@ import amo
 from amo.decorators import write
 from lib.es.models import Reindexing
 from lib.post_request_task.task import task as post_request_task
+from mkt.search.signals import indexed
 
 
 task_log = logging.getLogger('z.task')
 
+_locals = threading.local()
+
 
 class BaseIndexer(object):
     """
@@ -25,6 +32,9 @@ class BaseIndexer(object):
     - get_mapping(cls)
     - extract_document(cls, pk=None, obj=None)
 
+    and can implement extract_documents(cls, objs) to extract many documents
+    at once more efficiently.
+
     """
     _es = {}
 
@@ -72,26 +82,37 @@ class BaseIndexer(object):
                  body=document, id=id_)
 
     @classmethod
-    def bulk_index(cls, documents, id_field='id', es=None, index=None):
-        """Index of a bunch of documents."""
+    def bulk_index(cls, documents, id_field='id', es=None, index=None,
+                   refresh=False):
+        """
+        Index of a bunch of documents. `index` can be a list of indices, in
+        which case the documents are indexed in all of them in one request.
+        With `refresh`, the documents can be searched when this returns.
+        """
         es = es or cls.get_es()
         index = index or cls.get_index()
+        indices = [index] if isinstance(index, basestring) else index
         type = cls.get_mapping_type_name()
 
         actions = [
-            {'_index': index, '_type': type, '_id': d['id'], '_source': d}
-            for d in documents]
+            {'_index': idx, '_type': type, '_id': d[id_field], '_source': d}
+            for d in documents for idx in indices]
 
-        helpers.bulk(es, actions)
+        helpers.bulk(es, actions, refresh=refresh)
 
     @classmethod
     def index_ids(cls, ids, no_delay=False):
         """
-        Start task to index instances of indexer class matching the IDs.
-        Calls the helper method outside this BaseIndexer class.
+        Index instances of indexer class matching the IDs.
+
+        Unless `no_delay` is set and if ES_INDEX_QUEUE is set, the IDs are
+        added to the index queue, which indexes them all together after
+        ES_INDEX_QUEUE_DELAY seconds. Otherwise a task is started.
         """
         if no_delay:
             index(ids, cls)
+        elif settings.ES_INDEX_QUEUE:
+            queue_index(ids, cls)
         else:
             index.delay(ids, cls)
 
@@ -263,26 +284,37 @@ class BaseIndexer(object):
                                   (cls.get_model()._meta.model_name, id_))
 
     @classmethod
-    def run_indexing(cls, ids, ES, index=None, **kw):
-        """Used in reindex_mkt."""
-        sys.stdout.write('Indexing {0} {1}\n'.format(
-            len(ids), cls.get_model()._meta.model_name))
-
-        # Fetch QS given the IDs.
+    def extract_documents(cls, objs):
+        """
+        Extracts the documents of all the objects. Objects that fail to
+        extract are left out of the returned documents.
+        """
         docs = []
-        qs = cls.get_model().objects.filter(id__in=ids)
-
-        # For each object, extract document.
-        for obj in qs:
+        for obj in objs:
             try:
                 docs.append(cls.extract_document(obj.id, obj=obj))
             except Exception as e:
                 sys.stdout.write('Failed to index {0} {1}: {2}\n'.format(
                     cls.get_model()._meta.model_name, obj.id, e))
+        return docs
+
+    @classmethod
+    def run_indexing(cls, ids, ES, index=None, **kw):
+        """
+        Used in reindex_mkt. Returns the number of documents indexed and the
+        number of objects that failed.
+        """
+        sys.stdout.write('Indexing {0} {1}\n'.format(
+            len(ids), cls.get_model()._meta.model_name))
+
+        # Fetch QS given the IDs and extract the documents.
+        objs = list(cls.get_model().objects.filter(id__in=ids))
+        docs = cls.extract_documents(objs)
 
         # Index.
         if docs:
             cls.bulk_index(docs, es=ES, index=index or cls.get_index())
+        return len(docs), len(objs) - len(docs)
 
     @classmethod
     def attach_translation_mappings(cls, mapping, field_names):
@@ -321,7 +353,100 @@ def index(ids, indexer, **kw):
     indices = Reindexing.get_indices(indexer.get_index())
 
     es = indexer.get_es(urls=settings.ES_URLS)
-    for obj in indexer.get_indexable().filter(id__in=ids):
-        doc = indexer.extract_document(obj.id, obj)
-        for idx in indices:
-            indexer.index(doc, id_=obj.id, es=es, index=idx)
+    docs = indexer.extract_documents(
+        list(indexer.get_indexable().filter(id__in=set(ids))))
+    if docs:
+        # The receivers of `indexed` (e.g. the feed cache) expect searches
+        # to return the new documents.
+        listened = indexed.has_listeners(indexer)
+        indexer.bulk_index(docs, es=es, index=indices, refresh=listened)
+        if listened:
+            indexed.send(sender=indexer, ids=[doc['id'] for doc in docs])
+
+
+# The index queue.
+#
+# Saving an object usually means reindexing it, and the same object is often
+# saved many times in a short while, by one request or by many. Instead of
+# indexing it every time, the IDs to index are collected in the thread until
+# the end of the request or task, then added to a redis set per indexer. The
+# first IDs added to an empty set schedule `flush_index_queue`, which indexes
+# everything in the set after ES_INDEX_QUEUE_DELAY seconds.
+
+def queue_key(indexer):
+    return 'es:index-queue:%s' % indexer.get_mapping_type_name()
+
+
+def queue_scheduled_key(indexer):
+    return 'es:index-queue:%s:scheduled' % indexer.get_mapping_type_name()
+
+
+def _get_pending():
+    """Returns the calling thread's IDs to add to the queue by indexer."""
+    return _locals.__dict__.setdefault('index_queue', {})
+
+
+def queue_index(ids, indexer):
+    """Adds the IDs to the queue once the request or task is finished."""
+    _get_pending().setdefault(indexer, set()).update(ids)
+
+
+def _send_pending(**kwargs):
+    """Adds the IDs collected by the calling thread to the queue."""
+    pending = _get_pending()
+    while pending:
+        indexer, ids = pending.popitem()
+        push_index_queue(ids, indexer)
+
+
+def _discard_pending(**kwargs):
+    _get_pending().clear()
+
+
+def push_index_queue(ids, indexer):
+    """
+    Adds the IDs to the indexer's queue, scheduling a flush if none is.
+    """
+    ids = list(ids)
+    if not ids:
+        return
+    delay = settings.ES_INDEX_QUEUE_DELAY
+    try:
+        redis = redisutils.connections['master']
+        redis.sadd(queue_key(indexer), *ids)
+        # The key expires in case the flush is lost, to not stop flushing
+        # for good.
+        scheduled = redis.set(queue_scheduled_key(indexer), 1, nx=True,
+                              ex=delay + 60)
+    except Exception, e:
+        task_log.error(u'Index queue unavailable, indexing %s %s now: %s' %
+                       (len(ids), indexer.get_mapping_type_name(), e))
+        index.original_apply_async(args=[ids, indexer])
+        return
+    if scheduled:
+        flush_index_queue.apply_async(args=[indexer], countdown=delay)
+
+
+@task(acks_late=True)
+def flush_index_queue(indexer, **kw):
+    """Indexes all the IDs in the indexer's queue, in batches."""
+    redis = redisutils.connections['master']
+    # IDs added from now on schedule another flush.
+    redis.delete(queue_scheduled_key(indexer))
+    pipe = redis.pipeline()
+    pipe.smembers(queue_key(indexer))
+    pipe.delete(queue_key(indexer))
+    ids = sorted(int(id_) for id_ in pipe.execute()[0])
+
+    size = settings.ES_INDEX_QUEUE_BATCH_SIZE
+    for i in range(0, len(ids), size):
+        index(ids[i:i + size], indexer)
+
+
+# Add the IDs to the queue when the request or a task is finished, just like
+# post request tasks, and forget about them if the request failed.
+request_finished.connect(_send_pending,
+                         dispatch_uid='request_finished_index_queue')
+task_postrun.connect(_send_pending, dispatch_uid='tasks_finished_index_queue')
+got_request_exception.connect(_discard_pending,
+                              dispatch_uid='request_exception_index_queue')
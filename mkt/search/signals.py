@@ -0,0 +1,6 @@
+import django.dispatch
+
+
+# Sent by the index task once objects are in ES, with the indexer as the
+# sender and the indexed `ids`.
+indexed = django.dispatch.Signal(providing_args=['ids'])
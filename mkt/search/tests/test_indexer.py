@@ -1,7 +1,12 @@
+from django.test.utils import override_settings
+
+import mock
 from nose.tools import eq_
 
 import amo
+from mkt.search import indexers
 from mkt.search.indexers import BaseIndexer
+from mkt.search.signals import indexed
 
 
 class TestBaseIndexer(amo.tests.TestCase):
@@ -13,3 +18,101 @@ class TestBaseIndexer(amo.tests.TestCase):
         es1 = self.indexer().get_es()
         es2 = self.indexer().get_es()
         eq_(id(es1), id(es2))
+
+    @mock.patch.object(BaseIndexer, 'get_mapping_type_name',
+                       mock.Mock(return_value='webapp'))
+    @mock.patch('mkt.search.indexers.helpers.bulk')
+    def test_bulk_index_indices(self, bulk):
+        self.indexer.bulk_index([{'id': 1}, {'id': 2}], es='es',
+                                index=['old', 'new'])
+        es, actions = bulk.call_args[0]
+        eq_(es, 'es')
+        eq_([(a['_index'], a['_id']) for a in actions],
+            [('old', 1), ('new', 1), ('old', 2), ('new', 2)])
+
+
+class TestIndexTask(amo.tests.TestCase):
+
+    def setUp(self):
+        self.indexer = mock.Mock()
+        self.indexer.get_index.return_value = 'apps'
+        self.indexer.extract_documents.return_value = [{'id': 1}]
+
+    def test_index(self):
+        indexers.index([1], self.indexer)
+        eq_(self.indexer.bulk_index.call_args[1]['refresh'], False)
+
+    def test_index_refresh_before_signal(self):
+        receiver = mock.Mock()
+        receiver.side_effect = lambda **kw: (
+            # The documents are searchable by the time receivers run.
+            eq_(self.indexer.bulk_index.call_args[1]['refresh'], True))
+        indexed.connect(receiver, sender=self.indexer, weak=False)
+        self.addCleanup(indexed.disconnect, receiver, sender=self.indexer)
+        indexers.index([1], self.indexer)
+        eq_(receiver.call_args[1]['ids'], [1])
+
+
+@override_settings(ES_INDEX_QUEUE=True, ES_INDEX_QUEUE_DELAY=5,
+                   ES_INDEX_QUEUE_BATCH_SIZE=2)
+@mock.patch('mkt.search.indexers.redisutils')
+class TestIndexQueue(amo.tests.TestCase):
+
+    def setUp(self):
+        self.indexer = mock.Mock()
+        self.indexer.get_mapping_type_name.return_value = 'webapp'
+        self.addCleanup(indexers._discard_pending)
+
+    def redis(self, redisutils):
+        return redisutils.connections['master']
+
+    @mock.patch.object(indexers.flush_index_queue, 'apply_async')
+    def test_queue_coalesces(self, apply_async, redisutils):
+        indexers.queue_index([1, 2], self.indexer)
+        indexers.queue_index([2, 3], self.indexer)
+        # Nothing is sent until the request is finished.
+        eq_(self.redis(redisutils).sadd.call_count, 0)
+        indexers._send_pending()
+        redis = self.redis(redisutils)
+        redis.sadd.assert_called_once_with('es:index-queue:webapp', 1, 2, 3)
+        redis.set.assert_called_once_with('es:index-queue:webapp:scheduled',
+                                          1, nx=True, ex=65)
+        apply_async.assert_called_once_with(args=[self.indexer], countdown=5)
+
+    @mock.patch.object(indexers.flush_index_queue, 'apply_async')
+    def test_queue_already_scheduled(self, apply_async, redisutils):
+        self.redis(redisutils).set.return_value = None
+        indexers.push_index_queue([1], self.indexer)
+        eq_(self.redis(redisutils).sadd.call_count, 1)
+        eq_(apply_async.call_count, 0)
+
+    @mock.patch.object(indexers.index, 'original_apply_async')
+    def test_queue_unavailable(self, apply_async, redisutils):
+        self.redis(redisutils).sadd.side_effect = Exception('down')
+        indexers.push_index_queue([1], self.indexer)
+        apply_async.assert_called_once_with(args=[[1], self.indexer])
+
+    def test_queue_discarded(self, redisutils):
+        indexers.queue_index([1], self.indexer)
+        indexers._discard_pending()
+        indexers._send_pending()
+        eq_(self.redis(redisutils).sadd.call_count, 0)
+
+    @mock.patch.object(indexers.index, 'delay')
+    @mock.patch('mkt.search.indexers.queue_index')
+    def test_index_ids(self, queue_index, delay, redisutils):
+        BaseIndexer.index_ids([1])
+        queue_index.assert_called_once_with([1], BaseIndexer)
+        with self.settings(ES_INDEX_QUEUE=False):
+            BaseIndexer.index_ids([1])
+        delay.assert_called_once_with([1], BaseIndexer)
+
+    @mock.patch('mkt.search.indexers.index')
+    def test_flush(self, index, redisutils):
+        redis = self.redis(redisutils)
+        redis.pipeline.return_value.execute.return_value = [
+            set(['3', '1', '2']), 1]
+        indexers.flush_index_queue(self.indexer)
+        redis.delete.assert_called_with('es:index-queue:webapp:scheduled')
+        eq_(index.call_args_list,
+            [mock.call([1, 2], self.indexer), mock.call([3], self.indexer)])
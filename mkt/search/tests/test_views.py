@@ -230,9 +230,11 @@ class TestApi(RestOAuth, ESTestCase):
         ok_('latest_version' not in obj)
         ok_('reviewer_flags' not in obj)
 
+    @patch('mkt.webapps.models.build_exclusion_masks')
     @patch('mkt.webapps.models.Webapp.get_excluded_region_ids')
-    def test_upsell(self, get_excluded_region_ids):
+    def test_upsell(self, get_excluded_region_ids, build_exclusion_masks):
         get_excluded_region_ids.return_value = []
+        build_exclusion_masks.side_effect = lambda ids: dict.fromkeys(ids, 0)
         upsell = app_factory(premium_type=amo.ADDON_PREMIUM)
         AddonUpsell.objects.create(free=self.webapp, premium=upsell)
         self.webapp.save()
@@ -398,6 +398,8 @@ CELERY_ROUTES = {
     'mkt.versions.tasks.update_supported_locales_single': {'queue': 'priority'},
     'mkt.webapps.tasks.index_webapps': {'queue': 'priority'},
     'mkt.webapps.tasks.unindex_webapps': {'queue': 'priority'},
+    'mkt.installs.tasks.process_install_queue': {'queue': 'priority'},
+    'mkt.ratings.tasks.process_review_aggregates': {'queue': 'priority'},
     'stats.tasks.update_monolith_stats': {'queue': 'priority'},
     # And the rest.
     'mkt.developers.tasks.validator': {'queue': 'devhub'},
@@ -420,8 +422,8 @@ CELERY_SEND_TASK_ERROR_EMAILS = True
 # Otherwise your task will use the default settings.
 CELERY_TIME_LIMITS = {
     'lib.video.tasks.resize_video': {'soft': 360, 'hard': 600},
-    'lib.es.management.commands.reindex_mkt.run_indexing': {
-        'soft': 60 * 20,  # 20 mins to reindex.
+    'lib.es.management.commands.reindex_mkt.index_chunk': {
+        'soft': 60 * 20,  # 20 mins to reindex a chunk.
         'hard': 60 * 120,  # 120 mins hard limit.
     },
 }
@@ -449,6 +451,10 @@ AES_KEYS = {
 # In production we do not want to allow this.
 ALLOW_SELF_REVIEWS = True
 
+# Keep the review_queue_entry table the reviewer queues are read from (behind
+# the reviewer-queue-table switch) up to date when apps change.
+REVIEWER_QUEUE_TABLE = True
+
 # A smaller range of languages for the Marketplace.
 AMO_LANGUAGES = (
     'bg', 'bn-BD', 'ca', 'cs', 'da', 'de', 'el', 'en-US', 'es', 'eu', 'fr',
@@ -540,6 +546,10 @@ CACHE_PREFIX = 'marketplace:%s' % build_id
 # Cache timeout on the /search/featured API.
 CACHE_SEARCH_FEATURED_API_TIMEOUT = 60 * 60  # 1 hour.
 
+# Cache timeout on the /feed/get API. Pages are invalidated when the feed or
+# its apps are reindexed, this only bounds how long an unused page is kept.
+CACHE_FEED_TIMEOUT = 60 * 60 * 6  # 6 hours.
+
 # jingo-minify settings
 CACHEBUST_IMGS = True
 try:
@@ -691,9 +701,19 @@ ES_INDEXES = {
     'mkt_feed_collection': 'feed_collections',
     'mkt_feed_shelf': 'feed_shelves',
     'mkt_feed_item': 'feed_items',
+    'users': 'users',
     # Adding an index? Don't forget to add the indexer to ESTestCase.
     # Also add the index to reindex_mkt.py.
 }
+# Collect the objects to index after a save in a redis set and index them
+# together every ES_INDEX_QUEUE_DELAY seconds, ES_INDEX_QUEUE_BATCH_SIZE at a
+# time, instead of indexing them one by one right away.
+ES_INDEX_QUEUE = True
+ES_INDEX_QUEUE_BATCH_SIZE = 100
+ES_INDEX_QUEUE_DELAY = 5
+# Override the number of objects indexed per task by reindex_mkt, keyed by
+# the keys of ES_INDEXES, eg: {'webapp': 50}.
+ES_REINDEX_CHUNK_SIZES = {}
 ES_URLS = ['http://%s' % h for h in ES_HOSTS]
 ES_USE_PLUGINS = False
 ES_TIMEOUT = 30
@@ -707,6 +727,14 @@ FETCH_BY_ID = True
 # The maximum file size that is shown inside the file viewer.
 FILE_VIEWER_SIZE_LIMIT = 1048576
 
+# Read packages in place in the file viewer instead of extracting them, see
+# mkt.files.helpers.ZipFileViewer.
+FILE_VIEWER_ZIP = True
+
+# The total size in bytes of the files read from packages that the file viewer
+# keeps in memory.
+FILE_VIEWER_MEMBER_CACHE_SIZE = 10 * 1024 * 1024
+
 # The maximum file size that you can have inside a zip file.
 FILE_UNZIP_SIZE_LIMIT = 104857600
 
@@ -731,6 +759,13 @@ if DEBUG:
 GEOIP_URL = ''
 GEOIP_DEFAULT_VAL = 'restofworld'
 GEOIP_DEFAULT_TIMEOUT = .2
+# Path to a local "<network>,<country code>" file, eg. "1.0.0.0/24,AU", to
+# resolve IPs without calling the GeoIP server. The server is then only
+# called for IPs that aren't in the file.
+GEOIP_DATABASE = ''
+# How many resolved IPs to keep in memory, and for how many seconds.
+GEOIP_CACHE_SIZE = 10000
+GEOIP_CACHE_TIMEOUT = 60 * 60
 
 # Credentials for accessing Google Analytics stats.
 GOOGLE_ANALYTICS_CREDENTIALS = {}
@@ -806,6 +841,25 @@ IARC_TOS_URL = 'https://www.globalratings.com/IARCPRODClient/termsofuse.aspx'
 # True when the Django app is running from the test suite.
 IN_TEST_SUITE = False
 
+# Record the installs of the installs API in a redis list, saved every
+# INSTALLS_QUEUE_DELAY seconds, INSTALLS_QUEUE_BATCH_SIZE at a time, instead
+# of during the request. See mkt.installs.tasks.
+INSTALLS_QUEUE = True
+INSTALLS_QUEUE_BATCH_SIZE = 500
+INSTALLS_QUEUE_DELAY = 5
+
+# Apply the review aggregate deltas queued by review saves every
+# REVIEW_AGGREGATES_DELAY seconds, instead of during the request. See
+# mkt.ratings.tasks.
+REVIEW_AGGREGATES_QUEUE = True
+REVIEW_AGGREGATES_DELAY = 5
+
+# The update_manifests task fetches the manifests of hosted apps with
+# MANIFEST_CRAWL_WORKERS threads, with at most MANIFEST_CRAWL_PER_HOST
+# requests to the same host at a time. See mkt.webapps.tasks.crawl_manifests.
+MANIFEST_CRAWL_WORKERS = 10
+MANIFEST_CRAWL_PER_HOST = 2
+
 # For YUI compressor.
 JAVA_BIN = '/usr/bin/java'
 
@@ -909,6 +963,13 @@ MINIFY_MOZMARKET = True
 MONOLITH_SERVER = None
 MONOLITH_INDEX = 'time_*'
 MONOLITH_MAX_DATE_RANGE = 365
+# Monolith records are saved in batches of this size, or once the oldest
+# one is MONOLITH_BUFFER_TIMEOUT seconds old. 0 saves each record right away.
+MONOLITH_BUFFER_SIZE = 100
+MONOLITH_BUFFER_TIMEOUT = 10
+# File to append monolith records to when the database is unavailable. Load
+# it with the load_monolith_spill command.
+MONOLITH_SPILL_PATH = ''
 
 # The issuer for unverified Persona email addresses.
 # We only trust one issuer to grant us unverified emails.
@@ -938,6 +999,10 @@ POSTFIX_AUTH_TOKEN = 'make-sure-to-override-this-with-a-long-weird-string'
 # Domain name of the postfix server.
 POSTFIX_DOMAIN = 'marketplace.firefox.com'
 
+# How often, in seconds, each process checks that its price tier matrix is
+# still current. See mkt.prices.models.get_price_matrix.
+PRICE_MATRIX_CHECK_INTERVAL = 60
+
 PFS_URL = 'https://pfs.mozilla.org/plugins/PluginFinderService.php'
 
 # Path to pngcrush (for image optimization).
@@ -1033,6 +1098,19 @@ SERVICES_DATABASE = {
     'HOST': '',
 }
 
+# Memcached servers used by the receipt verifier to share decoded receipts
+# and purchases between processes, and by the marketplace to remove refunded
+# purchases from it. Leave empty to only cache decoded receipts in process.
+SERVICES_RECEIPT_CACHE_LOCATION = []
+# How many decoded receipts the receipt verifier keeps in process, and for
+# how long, in seconds, anything is cached. A size of 0 disables the
+# in process cache.
+SERVICES_RECEIPT_CACHE_SIZE = 10000
+SERVICES_RECEIPT_CACHE_TIMEOUT = 60 * 60
+# How long, in seconds, the receipt verifier doesn't cache a refunded or
+# charged back purchase again. Longer than it takes to look a purchase up.
+SERVICES_RECEIPT_CACHE_TOMBSTONE = 5 * 60
+
 SHORTER_LANGUAGES = {'en': 'en-US', 'ga': 'ga-IE', 'pt': 'pt-PT',
                      'sv': 'sv-SE', 'zh': 'zh-CN'}
 
@@ -1183,6 +1261,11 @@ WEBAPPS_RECEIPT_EXPIRED_SEND = False
 # Set to 6 months for the next little while.
 WEBAPPS_RECEIPT_EXPIRY_SECONDS = 60 * 60 * 24 * 182
 
+# The maximum number of receipts that can be verified in one batch request
+# to the receipt verifier, and how many purchases are looked up per query.
+WEBAPPS_RECEIPT_BATCH_MAX = 100
+WEBAPPS_RECEIPT_BATCH_QUERY_SIZE = 50
+
 # The key we'll use to sign webapp receipts.
 WEBAPPS_RECEIPT_KEY = os.path.join(ROOT, 'mkt/webapps/tests/sample.key')
 
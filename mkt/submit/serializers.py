@@ -67,6 +67,13 @@ class FileUploadSerializer(serializers.ModelSerializer):
         return json.loads(value) if value else value
 
 
+class ChunkedUploadSerializer(FileUploadSerializer):
+    received = serializers.IntegerField(read_only=True)
+
+    class Meta(FileUploadSerializer.Meta):
+        fields = FileUploadSerializer.Meta.fields + ('received',)
+
+
 class PreviewSerializer(serializers.ModelSerializer):
     filetype = serializers.CharField()
     id = serializers.IntegerField(source='pk')
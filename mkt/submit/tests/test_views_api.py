@@ -1,7 +1,9 @@
 import base64
+import hashlib
 import json
 import os
 
+from django.core.files.storage import default_storage as storage
 from django.core.urlresolvers import reverse
 
 from mock import patch
@@ -205,6 +207,142 @@ class TestGetValidationHandler(ValidationHandler):
         eq_(data['valid'], False)
 
 
+class TestChunkedUpload(amo.tests.AMOPaths, RestOAuth):
+    fixtures = fixture('user_2519')
+
+    def setUp(self):
+        super(TestChunkedUpload, self).setUp()
+        self.list_url = reverse('app-upload-list')
+        self.package = open(self.packaged_app_path('mozball.zip')).read()
+        self.size = len(self.package)
+
+    def start(self, **data):
+        data.setdefault('name', 'mozball.zip')
+        data.setdefault('size', self.size)
+        res = self.client.post(self.list_url, data=json.dumps(data))
+        if res.status_code == 201:
+            self.upload = FileUpload.objects.get(
+                pk=json.loads(res.content)['id'])
+            self.addCleanup(storage.delete, self.upload.path)
+            self.url = reverse('app-upload-detail',
+                               kwargs={'pk': self.upload.pk})
+        return res
+
+    def put(self, start, end, client=None):
+        client = client or self.client
+        return client.put(
+            self.url, data=self.package[start:end],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE='bytes %s-%s/%s' % (start, end - 1, self.size))
+
+    def test_has_cors(self):
+        self.assertCORS(self.client.get(self.list_url), 'get', 'post', 'put')
+
+    def test_start(self):
+        res = self.start()
+        eq_(res.status_code, 201)
+        data = json.loads(res.content)
+        eq_(data['received'], 0)
+        eq_(data['processed'], False)
+        eq_(self.upload.user, self.user)
+        eq_(self.upload.name, 'mozball.zip')
+
+    @patch('mkt.developers.forms.MAX_PACKAGED_APP_SIZE', 2)
+    def test_start_too_big(self):
+        res = self.start()
+        eq_(res.status_code, 400)
+        eq_(json.loads(res.content)['size'],
+            ['Packaged app too large for submission. '
+             'Packages must be smaller than 2 bytes.'])
+
+    @patch('mkt.submit.views.tasks')
+    def test_chunks(self, tasks_mock):
+        self.start()
+        half = self.size / 2
+        res = self.put(0, half)
+        eq_(res.status_code, 200)
+        eq_(json.loads(res.content)['received'], half)
+        assert not tasks_mock.validator.delay.called
+
+        # The client can check where to resume from.
+        res = self.client.get(self.url)
+        eq_(json.loads(res.content)['received'], half)
+
+        res = self.put(half, self.size)
+        eq_(res.status_code, 202)
+        tasks_mock.validator.delay.assert_called_with(self.upload.pk)
+        upload = self.upload.reload()
+        eq_(upload.hash, 'sha256:%s' % hashlib.sha256(self.package)
+                                               .hexdigest())
+        eq_(open(upload.path).read(), self.package)
+
+    def test_wrong_start(self):
+        self.start()
+        self.put(0, 10)
+        res = self.put(20, 30)
+        eq_(res.status_code, 416)
+        eq_(json.loads(res.content)['received'], 10)
+        eq_(self.upload.received, 10)
+
+    def test_bad_range(self):
+        self.start()
+        res = self.client.put(self.url, data='x',
+                              content_type='application/octet-stream')
+        eq_(res.status_code, 400)
+
+    def test_range_past_total(self):
+        self.start()
+        res = self.client.put(
+            self.url, data=self.package,
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE='bytes 0-%s/%s' % (self.size * 10, self.size))
+        eq_(res.status_code, 400)
+        eq_(self.upload.received, 0)
+
+    def test_range_end_before_start(self):
+        self.start()
+        res = self.client.put(
+            self.url, data=self.package,
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE='bytes 10-5/%s' % self.size)
+        eq_(res.status_code, 400)
+
+    def test_total_not_declared_size(self):
+        self.start()
+        res = self.client.put(
+            self.url, data=self.package[:10],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE='bytes 0-9/%s' % (self.size + 1))
+        eq_(res.status_code, 400)
+        eq_(self.upload.received, 0)
+
+    def test_not_zip(self):
+        self.start()
+        self.package = 'x' * self.size
+        res = self.put(0, 10)
+        eq_(res.status_code, 400)
+        data = json.loads(res.content)
+        eq_(data['processed'], True)
+        eq_(data['valid'], False)
+        eq_(self.upload.received, 0)
+        # The upload can't be continued.
+        eq_(self.put(0, 10).status_code, 400)
+
+    @patch('mkt.submit.views.tasks')
+    def test_invalid_zip(self, tasks_mock):
+        self.start()
+        self.package = self.package[:-10] + 'x' * 10
+        res = self.put(0, self.size)
+        eq_(res.status_code, 400)
+        eq_(json.loads(res.content)['validation']['messages'][0]['message'],
+            'The package is not a valid zip file.')
+        assert not tasks_mock.validator.delay.called
+
+    def test_other_user(self):
+        self.start()
+        eq_(self.put(0, 10, client=self.anon).status_code, 403)
+
+
 class TestAppStatusHandler(RestOAuth, amo.tests.AMOPaths):
     fixtures = fixture('user_2519', 'webapp_337141')
 
@@ -1,6 +1,12 @@
+import itertools
 import json
+import re
+from zipfile import BadZipfile
 
-from django.core.exceptions import ObjectDoesNotExist
+from django import forms as django_forms
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
+from django.core.files.storage import default_storage as storage
 from django.core.urlresolvers import reverse
 from django.db import transaction
 from django.shortcuts import redirect, render
@@ -11,9 +17,12 @@ from rest_framework import mixins
 from rest_framework.exceptions import MethodNotAllowed
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from rest_framework.status import (HTTP_201_CREATED, HTTP_202_ACCEPTED,
-                                   HTTP_400_BAD_REQUEST)
+from rest_framework.status import (HTTP_200_OK, HTTP_201_CREATED,
+                                   HTTP_202_ACCEPTED, HTTP_400_BAD_REQUEST,
+                                   HTTP_409_CONFLICT,
+                                   HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
 from rest_framework.viewsets import GenericViewSet
+from tower import ugettext as _
 
 import amo
 import mkt
@@ -25,18 +34,21 @@ from mkt.api.authentication import (RestAnonymousAuthentication,
 from mkt.api.authorization import (AllowAppOwner, AllowRelatedAppOwner, AnyOf,
                                    GroupPermission)
 from mkt.api.base import CORSMixin, MarketplaceView
-from mkt.api.forms import NewPackagedForm, PreviewJSONForm
+from mkt.api.forms import ChunkedUploadForm, NewPackagedForm, PreviewJSONForm
 from mkt.constants import PLATFORMS_NAMES
 from mkt.developers import tasks
 from mkt.developers.decorators import dev_required
 from mkt.developers.forms import (AppFormMedia, CategoryForm, NewManifestForm,
+                                  NewPackagedAppForm,
                                   PreviewForm, PreviewFormSet)
 from mkt.developers.utils import escalate_prerelease_permissions
 from mkt.files.models import FileUpload, Platform
+from mkt.files.utils import SafeUnzip
 from mkt.submit.forms import AppDetailsBasicForm
 from mkt.submit.models import AppSubmissionChecklist
-from mkt.submit.serializers import (AppStatusSerializer, FileUploadSerializer,
-                                    PreviewSerializer)
+from mkt.submit.serializers import (AppStatusSerializer,
+                                    ChunkedUploadSerializer,
+                                    FileUploadSerializer, PreviewSerializer)
 from mkt.users.models import UserProfile
 from mkt.webapps.models import Addon, AddonUser, Preview, Webapp
 
@@ -312,6 +324,152 @@ class ValidationViewSet(CORSMixin, mixins.CreateModelMixin,
         return Response(serializer.data, status=status)
 
 
+def read_chunks(stream, size, chunk_size=64 * 1024):
+    """Yields the `size` bytes of `stream`, or less if it ends before."""
+    while size > 0:
+        chunk = stream.read(min(size, chunk_size))
+        if not chunk:
+            break
+        size -= len(chunk)
+        yield chunk
+
+
+class ChunkedUploadViewSet(CORSMixin, mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin, GenericViewSet):
+    """
+    Uploads a packaged app in chunks, so that an interrupted upload can be
+    resumed: POST the name and size of the package, then PUT the chunks in
+    order with a Content-Range header. GET tells how many bytes have been
+    received. Once the last chunk is in, the package is checked and queued
+    for validation like the ones POSTed to the validation API.
+    """
+    cors_allowed_methods = ['get', 'post', 'put']
+    authentication_classes = [RestOAuthAuthentication,
+                              RestSharedSecretAuthentication,
+                              RestAnonymousAuthentication]
+    permission_classes = [AllowAny]
+    model = FileUpload
+    serializer_class = ChunkedUploadSerializer
+    content_range = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+    @write
+    def create(self, request, *args, **kwargs):
+        form = ChunkedUploadForm(request.DATA)
+        if not form.is_valid():
+            return Response(form.errors, status=HTTP_400_BAD_REQUEST)
+
+        user = request.user if request.user.is_authenticated() else None
+        upload = FileUpload.start_chunked(form.cleaned_data['name'],
+                                          form.cleaned_data['size'], user)
+        log.info('Chunked upload created: %s' % upload.pk)
+        serializer = self.get_serializer(upload)
+        return Response(serializer.data, status=HTTP_201_CREATED)
+
+    @write
+    def update(self, request, *args, **kwargs):
+        upload = self.get_object()
+        if upload.user_id and upload.user_id != request.user.pk:
+            raise PermissionDenied
+
+        match = self.content_range.match(
+            request.META.get('HTTP_CONTENT_RANGE', ''))
+        if not match:
+            return Response({'detail': 'Invalid Content-Range header.'},
+                            status=HTTP_400_BAD_REQUEST)
+        start, end, total = map(int, match.groups())
+        if end < start or end >= total:
+            return Response({'detail': 'Invalid Content-Range header.'},
+                            status=HTTP_400_BAD_REQUEST)
+        if total != upload.size:
+            return Response({'detail': 'The Content-Range total is not the '
+                                       'size of the upload.'},
+                            status=HTTP_400_BAD_REQUEST)
+        if upload.hash or upload.processed:
+            return Response({'detail': 'The upload is already complete.'},
+                            status=HTTP_400_BAD_REQUEST)
+
+        packaged = NewPackagedAppForm(user=upload.user)
+        errors = packaged.size_errors(total)
+        if errors:
+            return self.fail(upload, errors)
+
+        # Only one request at a time can append to the file.
+        lock = 'chunked-upload:%s' % upload.pk
+        if not cache.add(lock, 1, 60):
+            return Response({'detail': 'Another chunk is being uploaded.'},
+                            status=HTTP_409_CONFLICT)
+        try:
+            chunks = read_chunks(request._request,
+                                 min(end + 1, total) - start)
+            if start == 0:
+                # Fail early if this isn't a zip file.
+                first = next(chunks, '')
+                if not first.startswith('PK\x03\x04'):
+                    return self.fail(upload, [{
+                        'type': 'error',
+                        'message': _('The package is not a zip file.'),
+                        'tier': 1,
+                    }])
+                chunks = itertools.chain([first], chunks)
+
+            if not upload.add_chunk(chunks, start):
+                # Tell the client where to resume from.
+                serializer = self.get_serializer(upload)
+                return Response(
+                    serializer.data,
+                    status=HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        finally:
+            cache.delete(lock)
+
+        if upload.received < total:
+            serializer = self.get_serializer(upload)
+            return Response(serializer.data, status=HTTP_200_OK)
+
+        # Never validate more than the size that was checked.
+        errors = packaged.size_errors(storage.size(upload.path))
+        if errors:
+            return self.fail(upload, errors)
+
+        upload.finish_chunked()
+        errors = self.package_errors(upload, packaged)
+        if errors:
+            return self.fail(upload, errors)
+
+        log.info('Chunked upload complete: %s' % upload.pk)
+        tasks.validator.delay(upload.pk)
+        serializer = self.get_serializer(upload)
+        return Response(serializer.data, status=HTTP_202_ACCEPTED)
+
+    def package_errors(self, upload, packaged):
+        """
+        Checks the zip central directory and the manifest of the package,
+        which don't need the full validation.
+        """
+        message = None
+        try:
+            SafeUnzip(upload.path).is_valid(fatal=True)
+        except (BadZipfile, IOError):
+            message = _('The package is not a valid zip file.')
+        except django_forms.ValidationError, e:
+            message = ''.join(e.messages)
+        if message:
+            return [{'type': 'error', 'message': message, 'tier': 1}]
+
+        with storage.open(upload.path) as fd:
+            return packaged.package_errors(fd)
+
+    def fail(self, upload, errors):
+        """Saves the `errors` as the upload validation result."""
+        upload.validation = json.dumps({
+            'errors': len(errors),
+            'success': False,
+            'messages': errors,
+        })
+        upload.save()
+        serializer = self.get_serializer(upload)
+        return Response(serializer.data, status=HTTP_400_BAD_REQUEST)
+
+
 class StatusViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin,
                     GenericViewSet):
     queryset = Webapp.objects.all()
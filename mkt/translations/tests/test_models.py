@@ -15,7 +15,8 @@ from nose import SkipTest
 from nose.tools import eq_
 from test_utils import trans_eq, TestCase
 
-from mkt.translations import widgets
+from amo.utils import attach_trans_dict
+from mkt.translations import transformer, widgets
 from mkt.translations.models import (LinkifiedTranslation, NoLinksTranslation,
                                  NoLinksNoMarkupTranslation,
                                  PurifiedTranslation, Translation,
@@ -119,6 +120,42 @@ class TranslationTestCase(TestCase):
         finally:
             translation.deactivate()
 
+    def test_fetch_all_translations(self):
+        o = TranslatedModel.objects.no_cache().all_translations().get(id=1)
+        trans_eq(o.name, 'some name', 'en-US')
+        trans_eq(o.description, 'some description', 'en-US')
+        eq_(sorted(t.locale.lower() for t in o._trans_map[o.name_id]),
+            ['de', 'en-us'])
+
+    def test_fetch_all_translations_de_locale(self):
+        try:
+            translation.activate('de')
+            o = TranslatedModel.objects.no_cache().all_translations().get(id=1)
+            trans_eq(o.name, 'German!! (unst unst)', 'de')
+            trans_eq(o.description, 'some description', 'en-US')
+        finally:
+            translation.deactivate()
+
+    def test_all_translations_attach_trans_dict(self):
+        objs = list(TranslatedModel.objects.no_cache().all_translations())
+        with self.assertNumQueries(0):
+            attach_trans_dict(TranslatedModel, objs)
+        eq_(sorted(objs[0].translations[objs[0].name_id]),
+            [('de', 'German!! (unst unst)'), ('en-us', 'some name')])
+
+    def test_build_query_current_language(self):
+        connection = connections['default']
+        sql, params = transformer.build_query(TranslatedModel, connection)
+        eq_(params[0], 'en-US')
+        try:
+            translation.activate('de')
+            de_sql, params = transformer.build_query(TranslatedModel,
+                                                     connection)
+            eq_(de_sql, sql)
+            eq_(params[0], 'de')
+        finally:
+            translation.deactivate()
+
     def test_create_translation(self):
         o = TranslatedModel.objects.create(name='english name')
         get_model = lambda: TranslatedModel.objects.get(id=o.id)
@@ -2,6 +2,7 @@ from django.conf import settings
 from django.db import connections, models, router
 from django.utils import translation
 
+from amo.utils import sorted_groupby
 from mkt.translations.fields import TranslatedField
 from mkt.translations.models import Translation
 
@@ -14,23 +15,38 @@ no_locale_join = """LEFT OUTER JOIN translations {t}
 
 trans_fields = [f.name for f in Translation._meta.fields]
 
+# Stands for the current language in the params of a query plan.
+CURRENT_LANGUAGE = object()
 
-def build_query(model, connection):
-    qn = connection.ops.quote_name
-    selects, joins, params = [], [], []
+# Query plans by (model, connection alias).
+_plans = {}
 
+
+def get_fallback(model):
     # The model can define a fallback locale (which may be a Field).
     if hasattr(model, 'get_fallback'):
-        fallback = model.get_fallback()
-    else:
-        fallback = settings.LANGUAGE_CODE
+        return model.get_fallback()
+    return settings.LANGUAGE_CODE
+
 
+def get_translated_fields(model):
     if not hasattr(model._meta, 'translated_fields'):
         model._meta.translated_fields = [f for f in model._meta.fields
                                          if isinstance(f, TranslatedField)]
+    return model._meta.translated_fields
+
+
+def build_plan(model, connection):
+    """
+    Returns the SQL joining the translations of the model and its params,
+    with CURRENT_LANGUAGE in place of the language.
+    """
+    qn = connection.ops.quote_name
+    selects, joins, params = [], [], []
+    fallback = get_fallback(model)
 
     # Add the selects and joins for each translated field on the model.
-    for field in model._meta.translated_fields:
+    for field in get_translated_fields(model):
         if isinstance(fallback, models.Field):
             fallback_str = '%s.%s' % (qn(model._meta.db_table),
                                       qn(fallback.column))
@@ -44,7 +60,7 @@ def build_query(model, connection):
         selects.extend(isnull.format(col=f, **d) for f in trans_fields)
 
         joins.append(join.format(t=d['t1'], locale='%s', **d))
-        params.append(translation.get_language())
+        params.append(CURRENT_LANGUAGE)
 
         if field.require_locale:
             joins.append(join.format(t=d['t2'], locale=fallback_str, **d))
@@ -61,6 +77,19 @@ def build_query(model, connection):
     return s, params
 
 
+def build_query(model, connection):
+    """
+    Returns the SQL and params to join the translations of the model in the
+    current language. The SQL is only built once per model and connection.
+    """
+    key = (model, connection.alias)
+    if key not in _plans:
+        _plans[key] = build_plan(model, connection)
+    sql, params = _plans[key]
+    lang = translation.get_language()
+    return sql, [lang if p is CURRENT_LANGUAGE else p for p in params]
+
+
 def get_trans(items):
     if not items:
         return
@@ -85,3 +114,58 @@ def get_trans(items):
             t = Translation(*row[start:start+step])
             if t.id is not None and t.localized_string is not None:
                 setattr(item, field.name, t)
+
+
+def load_trans_map(model, items):
+    """
+    Fetches the translations of every locale of the items in one query, and
+    keeps them on each item as `_trans_map`, a {translation id: [Translation,
+    ...]} dict. Returns the translations of all the items in the same format.
+    """
+    fields = get_translated_fields(model)
+    ids = set(getattr(item, f.attname) for f in fields for item in items
+              if getattr(item, f.attname, None) is not None)
+    qs = (Translation.objects.no_cache()
+          .filter(id__in=ids, localized_string__isnull=False))
+    trans_map = dict((k, list(v)) for k, v in
+                     sorted_groupby(qs, lambda trans: trans.id))
+    for item in items:
+        item._trans_map = dict(
+            (t_id, trans_map[t_id]) for t_id in
+            (getattr(item, f.attname, None) for f in fields)
+            if t_id in trans_map)
+    return trans_map
+
+
+def get_all_trans(items):
+    """
+    Like get_trans, but loads all the translations of the items in one
+    query without joins, see load_trans_map. amo.utils.attach_trans_dict
+    then reuses them instead of querying again.
+    """
+    if not items:
+        return
+
+    model = items[0].__class__
+    load_trans_map(model, items)
+    lang = translation.get_language().lower()
+    fallback = get_fallback(model)
+    for item in items:
+        if isinstance(fallback, models.Field):
+            item_fallback = getattr(item, fallback.attname)
+        else:
+            item_fallback = fallback
+        item_fallback = (item_fallback or '').lower()
+
+        for field in model._meta.translated_fields:
+            translations = item._trans_map.get(
+                getattr(item, field.attname, None), [])
+            by_locale = dict((t.locale.lower(), t) for t in translations)
+            t = by_locale.get(lang)
+            if t is None:
+                if field.require_locale:
+                    t = by_locale.get(item_fallback)
+                elif translations:
+                    t = translations[0]
+            if t is not None:
+                setattr(item, field.name, t)
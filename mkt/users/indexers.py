@@ -0,0 +1,94 @@
+"""
+Indexer for UserProfile, used by the lookup tool to find users by any part of
+their username, display name or email.
+"""
+from mkt.search.indexers import BaseIndexer
+
+
+def get_prefix_multifield(name, analyzer):
+    """
+    The field analyzed with `analyzer`, with sub-fields indexing the prefixes
+    of the whole value (`name.ngram`) and of its words (`name.words`), for
+    search as you type.
+    """
+    # TODO: convert to new syntax on ES 1.0+.
+    return {
+        'type': 'multi_field',
+        'fields': {
+            name: {'type': 'string', 'analyzer': analyzer},
+            'ngram': {'type': 'string', 'index_analyzer': 'value_prefix',
+                      'search_analyzer': analyzer},
+            'words': {'type': 'string', 'index_analyzer': 'word_prefix',
+                      'search_analyzer': 'standard'},
+        }
+    }
+
+
+class UserProfileIndexer(BaseIndexer):
+
+    @classmethod
+    def get_model(cls):
+        from mkt.users.models import UserProfile
+        return UserProfile
+
+    @classmethod
+    def get_analysis(cls):
+        analysis = super(UserProfileIndexer, cls).get_analysis()
+        analysis['filter']['prefix_ngram'] = {
+            'type': 'edgeNGram',
+            'min_gram': 1,
+            'max_gram': 30,
+        }
+        analysis['analyzer'].update({
+            # The whole value, lowercased: usernames and emails.
+            'lowercase_keyword': {
+                'type': 'custom',
+                'tokenizer': 'keyword',
+                'filter': ['lowercase'],
+            },
+            # The prefixes of every word, splitting emails on "@" and ".".
+            'word_prefix': {
+                'type': 'custom',
+                'tokenizer': 'standard',
+                'filter': ['lowercase', 'asciifolding', 'prefix_ngram'],
+            },
+            # The prefixes of the whole value, so that "kr-r" finds "kr-raj"
+            # and "fonzi@happ" finds "fonzi@happydays.com".
+            'value_prefix': {
+                'type': 'custom',
+                'tokenizer': 'keyword',
+                'filter': ['lowercase', 'prefix_ngram'],
+            },
+        })
+        return analysis
+
+    @classmethod
+    def get_mapping(cls):
+        doc_type = cls.get_mapping_type_name()
+
+        return {
+            doc_type: {
+                '_all': {'enabled': False},
+                'properties': {
+                    'id': {'type': 'long'},
+                    'display_name': get_prefix_multifield('display_name',
+                                                          'standard'),
+                    'email': get_prefix_multifield('email',
+                                                   'lowercase_keyword'),
+                    'username': get_prefix_multifield('username',
+                                                      'lowercase_keyword'),
+                }
+            }
+        }
+
+    @classmethod
+    def extract_document(cls, pk=None, obj=None):
+        if obj is None:
+            obj = cls.get_model().objects.get(pk=pk)
+
+        return {
+            'id': obj.id,
+            'display_name': obj.display_name,
+            'email': obj.email,
+            'username': obj.username,
+        }
@@ -6,6 +6,7 @@ from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser
 from django.core import validators
 from django.db import models
+from django.dispatch import receiver
 from django.utils import translation
 from django.utils.encoding import smart_unicode
 from django.utils.functional import lazy
@@ -249,6 +250,21 @@ models.signals.pre_save.connect(save_signal, sender=UserProfile,
                                 dispatch_uid='userprofile_translations')
 
 
+@receiver(models.signals.post_save, sender=UserProfile,
+          dispatch_uid='userprofile.search.index')
+def update_search_index(sender, instance, **kw):
+    from mkt.users.indexers import UserProfileIndexer
+    if not kw.get('raw'):
+        UserProfileIndexer.index_ids([instance.id])
+
+
+@receiver(models.signals.post_delete, sender=UserProfile,
+          dispatch_uid='userprofile.search.unindex')
+def delete_search_index(sender, instance, **kw):
+    from mkt.users.indexers import UserProfileIndexer
+    UserProfileIndexer.unindexer([instance.id])
+
+
 class UserNotification(amo.models.ModelBase):
     user = models.ForeignKey(UserProfile, related_name='notifications')
     notification_id = models.IntegerField()
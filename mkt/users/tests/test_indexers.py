@@ -0,0 +1,43 @@
+import mock
+from nose.tools import eq_
+
+import amo.tests
+from mkt.site.fixtures import fixture
+from mkt.users.indexers import UserProfileIndexer
+from mkt.users.models import UserProfile
+
+
+class TestUserProfileIndexer(amo.tests.TestCase):
+    fixtures = fixture('user_999')
+
+    def setUp(self):
+        self.user = UserProfile.objects.get(pk=999)
+
+    def test_mapping_type_name(self):
+        eq_(UserProfileIndexer.get_mapping_type_name(), 'users')
+
+    def test_mapping(self):
+        mapping = UserProfileIndexer.get_mapping()
+        eq_(mapping.keys(), ['users'])
+        email = mapping['users']['properties']['email']['fields']
+        eq_(email['email']['analyzer'], 'lowercase_keyword')
+        eq_(email['ngram']['index_analyzer'], 'value_prefix')
+        eq_(email['words']['index_analyzer'], 'word_prefix')
+
+    def test_analysis(self):
+        analysis = UserProfileIndexer.get_analysis()
+        for analyzer in ('lowercase_keyword', 'value_prefix', 'word_prefix'):
+            assert analyzer in analysis['analyzer'], analyzer
+        eq_(analysis['filter']['prefix_ngram']['type'], 'edgeNGram')
+
+    def test_extract(self):
+        doc = UserProfileIndexer.extract_document(self.user.pk)
+        eq_(doc, {'id': self.user.pk,
+                  'display_name': self.user.display_name,
+                  'email': self.user.email,
+                  'username': self.user.username})
+
+    @mock.patch.object(UserProfileIndexer, 'index_ids')
+    def test_save_indexes(self, index_ids):
+        self.user.save()
+        index_ids.assert_called_with([self.user.pk])
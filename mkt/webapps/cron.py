@@ -18,54 +18,36 @@ from amo.utils import chunked, walkfiles
 from mkt.api.models import Nonce
 from mkt.developers.models import ActivityLog
 from mkt.files.models import File
+from mkt.versions.models import Version
 
 from .models import Addon, Installed, Webapp
-from .tasks import (dump_user_installs, update_downloads, update_trending,
-                    zip_users)
+from .tasks import (dump_user_installs, fix_last_updated, update_downloads,
+                    update_trending, zip_users)
 
 
 log = commonware.log.getLogger('z.cron')
 task_log = logging.getLogger('z.task')
 
 
-def _change_last_updated(next):
-    # We jump through some hoops here to make sure we only change the add-ons
-    # that really need it, and to invalidate properly.
-    current = dict(Addon.objects.values_list('id', 'last_updated'))
-    changes = {}
-
-    for addon, last_updated in next.items():
-        try:
-            if current[addon] != last_updated:
-                changes[addon] = last_updated
-        except KeyError:
-            pass
-
-    if not changes:
-        return
-
-    log.debug('Updating %s add-ons' % len(changes))
-    # Update + invalidate.
-    qs = Addon.objects.no_cache().filter(id__in=changes).no_transforms()
-    for addon in qs:
-        addon.last_updated = changes[addon.id]
-        addon.save()
-
-
 @cronjobs.register
 @write
 def addon_last_updated():
-    next = {}
-    qs = Addon._last_updated_queries().values()
-    for addon, last_updated in qs.values_list('id', 'last_updated'):
-        next[addon] = last_updated
-
-    _change_last_updated(next)
-
-    # Get anything that didn't match above.
-    other = (Addon.objects.no_cache().filter(last_updated__isnull=True)
-             .values_list('id', 'created'))
-    _change_last_updated(dict(other))
+    """
+    Version and file status changes keep last_updated current. This catches
+    the apps they missed among the ones touched since the previous run, and
+    the apps without a last_updated.
+    """
+    since = datetime.now() - timedelta(hours=2)
+    ids = set(Webapp.objects.filter(Q(modified__gte=since) |
+                                    Q(last_updated__isnull=True))
+              .values_list('id', flat=True))
+    ids.update(Version.with_deleted.filter(modified__gte=since)
+               .values_list('addon', flat=True))
+    ids.update(File.objects.filter(modified__gte=since)
+               .values_list('version__addon', flat=True))
+    log.info('Checking last updated of %s apps.' % len(ids))
+    for chunk in chunked(sorted(ids), 100):
+        fix_last_updated.delay(chunk)
 
 
 @cronjobs.register
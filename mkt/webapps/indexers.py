@@ -4,7 +4,7 @@ from operator import attrgetter
 
 from django.conf import settings
 from django.core.urlresolvers import reverse
-from django.db.models import Max, Min
+from django.db.models import Count, Max
 
 import commonware.log
 
@@ -221,52 +221,224 @@ class WebappIndexer(BaseIndexer):
     @classmethod
     def extract_document(cls, pk=None, obj=None):
         """Extracts the ElasticSearch index document for this instance."""
-        from mkt.webapps.models import (AppFeatures, attach_devices,
-                                        attach_prices, attach_tags,
-                                        attach_translations, Geodata,
-                                        Installed, RatingDescriptors,
-                                        RatingInteractives, Webapp)
-
         if obj is None:
             obj = cls.get_model().objects.no_cache().get(pk=pk)
 
-        # Attach everything we need to index apps.
+        cls.attach_indexing_data([obj])
+        return cls._extract_document(obj, cls.get_max_downloads())
+
+    @classmethod
+    def extract_documents(cls, objs):
+        """
+        Extracts the documents of a chunk of apps. Everything the documents
+        need is fetched for the whole chunk with a fixed number of queries.
+
+        Apps that fail to extract are left out of the returned documents.
+        """
+        if not objs:
+            return []
+
+        cls.attach_indexing_data(objs)
+        max_downloads = cls.get_max_downloads()
+
+        docs = []
+        for obj in objs:
+            try:
+                docs.append(cls._extract_document(obj, max_downloads))
+            except Exception as e:
+                sys.stdout.write('Failed to index webapp {0}: {1}\n'.format(
+                    obj.id, e))
+        return docs
+
+    @classmethod
+    def get_max_downloads(cls):
+        """
+        The max weekly downloads for the whole database, used to compute the
+        weight of the documents.
+        """
+        from mkt.webapps.models import Webapp
+        return float(
+            Webapp.objects.aggregate(Max('weekly_downloads')).values()[0] or 0)
+
+    @classmethod
+    def attach_indexing_data(cls, objs):
+        """
+        Attach everything we need to index the apps, fetching each relation
+        for all the apps at once.
+        """
+        from mkt.collections.models import CollectionMembership
+        from mkt.reviewers.models import EscalationQueue
+        from mkt.webapps.models import (AddonUpsell, AddonUser,
+                                        attach_devices, attach_prices,
+                                        attach_tags, attach_translations,
+                                        AppFeatures, AppManifest,
+                                        build_exclusion_masks, ContentRating,
+                                        Geodata, Installed, mask_region_ids,
+                                        Preview, RatingDescriptors,
+                                        RatingInteractives, Webapp)
+        from mkt.files.models import File
+
+        objs_dict = dict((obj.id, obj) for obj in objs)
+        ids = objs_dict.keys()
+
         for transform in (attach_devices, attach_prices, attach_tags,
                           attach_translations):
-            transform([obj])
+            transform(objs)
+
+        # Set _latest_version and _current_version.
+        Webapp.attach_related_versions(objs, objs_dict)
+        latest_versions = dict((obj.latest_version.id, obj.latest_version)
+                               for obj in objs if obj.latest_version)
+        current_versions = dict((obj.current_version.id, obj.current_version)
+                                for obj in objs if obj.current_version)
+
+        versions = dict(latest_versions)
+        versions.update(current_versions)
+
+        files = File.objects.no_cache().filter(version__in=versions)
+        files = dict((k, list(v)) for k, v in
+                     amo.utils.sorted_groupby(files, 'version_id'))
+        for version in versions.values():
+            version.all_files = files.get(version.id, [])
+            for file_ in version.all_files:
+                file_.version = version
+
+        features = dict((f.version_id, f) for f in
+                        AppFeatures.objects.filter(
+                            version__in=current_versions))
+        manifests = dict((m.version_id, m) for m in
+                         AppManifest.objects.filter(
+                             version__in=current_versions))
+        for version in current_versions.values():
+            setattr(version, Version.features.cache_name,
+                    features.get(version.id))
+            setattr(version, Version.manifest_json.cache_name,
+                    manifests.get(version.id))
+        amo.utils.attach_trans_dict(Version, current_versions.values())
+
+        geodata = dict((g.addon_id, g) for g in
+                       Geodata.objects.filter(addon__in=ids))
+        amo.utils.attach_trans_dict(Geodata, geodata.values())
+
+        descriptors = dict((r.addon_id, r) for r in
+                           RatingDescriptors.objects.filter(addon__in=ids))
+        interactives = dict((r.addon_id, r) for r in
+                            RatingInteractives.objects.filter(addon__in=ids))
+        premiums = dict((p.addon_id, p) for p in
+                        AddonPremium.objects.filter(addon__in=ids)
+                                            .select_related('price'))
+
+        escalated = set(EscalationQueue.objects.filter(addon__in=ids)
+                        .values_list('addon', flat=True))
+        installed = dict(Installed.objects.filter(addon__in=ids)
+                         .values_list('addon').annotate(Count('id')))
+
+        def group(qs, key):
+            return dict((k, list(v)) for k, v in
+                        amo.utils.sorted_groupby(qs, key))
+
+        memberships = group(CollectionMembership.objects.filter(app__in=ids),
+                            'app_id')
+        owners = group(AddonUser.objects.filter(addon__in=ids,
+                                                role=amo.AUTHOR_ROLE_OWNER)
+                                        .values_list('addon', 'user'),
+                       lambda x: x[0])
+        # Keep the default ordering of the relations within each app.
+        previews = group(Preview.objects.filter(addon__in=ids)
+                         .no_transforms(), 'addon_id')
+        versions = group(Version.objects.no_cache().filter(addon__in=ids)
+                         .no_transforms(), 'addon_id')
+        content_ratings = group(ContentRating.objects.filter(addon__in=ids),
+                                'addon_id')
+        upsells = dict((u.free_id, u) for u in
+                       AddonUpsell.objects.filter(free__in=ids)
+                                          .select_related('premium'))
+        exclusions = build_exclusion_masks(
+            ids + [u.premium_id for u in upsells.values()])
+
+        for obj in objs:
+            try:
+                # Same as get_latest_file(), the newest file of the current
+                # version.
+                version = obj.current_version
+                obj._latest_file = (
+                    sorted(version.all_files, key=attrgetter('created'))[-1]
+                    if version and version.all_files else None)
+                if not obj.is_packaged:
+                    manifest = (obj._latest_file and obj.get_manifest_json(
+                        file_obj=obj._latest_file))
+                    obj.is_offline = bool(manifest and
+                                          'appcache_path' in manifest)
+                # upsell is a read only cached property.
+                obj.__dict__['upsell'] = upsells.get(obj.id)
+
+                if obj.id in geodata:
+                    obj._geodata = geodata[obj.id]
+                setattr(obj, Webapp.rating_descriptors.cache_name,
+                        descriptors.get(obj.id))
+                setattr(obj, Webapp.rating_interactives.cache_name,
+                        interactives.get(obj.id))
+                setattr(obj, Webapp.addonpremium.cache_name,
+                        premiums.get(obj.id))
+                obj._is_escalated = obj.id in escalated
+                obj._installed_count = installed.get(obj.id, 0)
+                obj._collection_memberships = memberships.get(obj.id, [])
+                obj._owner_ids = [o[1] for o in owners.get(obj.id, [])]
+                obj._indexed_previews = previews.get(obj.id, [])
+                obj._indexed_versions = versions.get(obj.id, [])
+                obj._content_ratings = content_ratings.get(obj.id, [])
+                obj._excluded_region_ids = mask_region_ids(exclusions[obj.id])
+                if obj.id in upsells:
+                    obj._upsell_excluded_region_ids = mask_region_ids(
+                        exclusions[upsells[obj.id].premium_id])
+            except Exception as e:
+                # Fail this app only, when its document is extracted.
+                obj._indexing_error = e
+
+    @classmethod
+    def _extract_document(cls, obj, max_downloads):
+        """
+        Extracts the document of an app, which must have gone through
+        `attach_indexing_data` first.
+        """
+        from mkt.webapps.models import (AppFeatures, Geodata,
+                                        RatingDescriptors, RatingInteractives)
+
+        if getattr(obj, '_indexing_error', None):
+            raise obj._indexing_error
 
         latest_version = obj.latest_version
         version = obj.current_version
         geodata = obj.geodata
         features = (version.features.to_dict()
                     if version else AppFeatures().to_dict())
-        is_escalated = obj.escalationqueue_set.exists()
+        is_escalated = obj._is_escalated
 
         try:
             status = latest_version.statuses[0][1] if latest_version else None
         except IndexError:
             status = None
 
-        installed_ids = list(Installed.objects.filter(addon=obj)
-                             .values_list('id', flat=True))
-
         attrs = ('app_slug', 'bayesian_rating', 'created', 'id', 'is_disabled',
                  'last_updated', 'modified', 'premium_type', 'status', 'type',
-                 'uses_flash', 'weekly_downloads')
+                 'weekly_downloads')
         d = dict(zip(attrs, attrgetter(*attrs)(obj)))
+        d['uses_flash'] = (obj._latest_file.uses_flash if obj._latest_file
+                           else False)
 
-        d['boost'] = len(installed_ids) or 1
+        d['boost'] = obj._installed_count or 1
         d['app_type'] = obj.app_type_id
         d['author'] = obj.developer_name
         d['banner_regions'] = geodata.banner_regions_slugs()
         d['category'] = obj.categories if obj.categories else []
         if obj.is_public:
             d['collection'] = [{'id': cms.collection_id, 'order': cms.order}
-                               for cms in obj.collectionmembership_set.all()]
+                               for cms in obj._collection_memberships]
         else:
             d['collection'] = []
-        d['content_ratings'] = (obj.get_content_ratings_by_body(es=True) or
-                                None)
+        d['content_ratings'] = (
+            obj.get_content_ratings_by_body(
+                es=True, ratings=obj._content_ratings) or None)
         try:
             d['content_descriptors'] = obj.rating_descriptors.to_keys()
         except RatingDescriptors.DoesNotExist:
@@ -304,12 +476,11 @@ class WebappIndexer(BaseIndexer):
         d['name'] = list(
             set(string for _, string in obj.translations[obj.name_id]))
         d['name_sort'] = unicode(obj.name).lower()
-        d['owners'] = [au.user.id for au in
-                       obj.addonuser_set.filter(role=amo.AUTHOR_ROLE_OWNER)]
-        d['popularity'] = len(installed_ids)
+        d['owners'] = obj._owner_ids
+        d['popularity'] = obj._installed_count
         d['previews'] = [{'filetype': p.filetype, 'modified': p.modified,
                           'id': p.id, 'sizes': p.sizes}
-                         for p in obj.previews.all()]
+                         for p in obj._indexed_previews]
         try:
             p = obj.addonpremium.price
             d['price_tier'] = p.name
@@ -320,9 +491,10 @@ class WebappIndexer(BaseIndexer):
             'average': obj.average_rating,
             'count': obj.total_reviews,
         }
-        d['region_exclusions'] = obj.get_excluded_region_ids()
-        d['reviewed'] = obj.versions.filter(
-            deleted=False).aggregate(Min('reviewed')).get('reviewed__min')
+        d['region_exclusions'] = obj._excluded_region_ids
+        reviewed = filter(None, (v.reviewed for v in obj._indexed_versions
+                                 if not v.deleted))
+        d['reviewed'] = min(reviewed) if reviewed else None
         if version:
             d['supported_locales'] = filter(
                 None, version.supported_locales.split(','))
@@ -338,18 +510,16 @@ class WebappIndexer(BaseIndexer):
                 'icon_url': upsell_obj.get_icon_url(128),
                 # TODO: Store all localizations of upsell.name.
                 'name': unicode(upsell_obj.name),
-                'region_exclusions': upsell_obj.get_excluded_region_ids()
+                'region_exclusions': obj._upsell_excluded_region_ids
             }
 
         d['versions'] = [dict(version=v.version,
                               resource_uri=reverse_version(v))
-                         for v in obj.versions.all()]
+                         for v in obj._indexed_versions]
 
         # Calculate weight. It's similar to popularity, except that we can
         # expose the number - it's relative to the max weekly downloads for
         # the whole database.
-        max_downloads = float(
-            Webapp.objects.aggregate(Max('weekly_downloads')).values()[0] or 0)
         if max_downloads:
             d['weight'] = math.ceil(d['weekly_downloads'] / max_downloads * 5)
         else:
@@ -364,14 +534,15 @@ class WebappIndexer(BaseIndexer):
                 in obj.translations[getattr(obj, '%s_id' % field)]
                 if string]
         if version:
-            amo.utils.attach_trans_dict(Version, [version])
             d['release_notes_translations'] = [
                 {'lang': to_language(lang), 'string': string}
                 for lang, string
                 in version.translations[version.releasenotes_id]]
         else:
             d['release_notes_translations'] = None
-        amo.utils.attach_trans_dict(Geodata, [geodata])
+        if not hasattr(geodata, 'translations'):
+            # The geodata was only just created.
+            amo.utils.attach_trans_dict(Geodata, [geodata])
         d['banner_message_translations'] = [
             {'lang': to_language(lang), 'string': string}
             for lang, string
@@ -432,17 +603,13 @@ class WebappIndexer(BaseIndexer):
         from mkt.webapps.models import Webapp
         sys.stdout.write('Indexing %s webapps\n' % len(ids))
 
-        qs = Webapp.with_deleted.no_cache().filter(id__in=ids)
-
-        docs = []
-        for obj in qs:
-            try:
-                docs.append(cls.extract_document(obj.id, obj=obj))
-            except Exception as e:
-                sys.stdout.write('Failed to index webapp {0}: {1}\n'.format(
-                    obj.id, e))
+        # All the translations are indexed, load them at once.
+        objs = list(Webapp.with_deleted.no_cache().filter(id__in=ids)
+                    .all_translations())
+        docs = cls.extract_documents(objs)
 
         WebappIndexer.bulk_index(docs, es=ES, index=index or cls.get_index())
+        return len(docs), len(objs) - len(docs)
 
 
 def reverse_version(version):
@@ -1,11 +1,54 @@
-from django.core.management.base import BaseCommand
+import datetime
+from optparse import make_option
 
-from mkt.webapps.tasks import export_data
+from django.core.management.base import BaseCommand, CommandError
+
+from mkt.webapps.tasks import (EXPORT_FORMATS, export_data,
+                               get_export_progress, get_last_export)
 
 
 class Command(BaseCommand):
     help = 'Export our data as a tgz for third-parties'
+    option_list = BaseCommand.option_list + (
+        make_option('--name',
+                    help='The name of the export, defaults to the date.'),
+        make_option('--format', default='tgz',
+                    help='One of %s, defaults to tgz.'
+                         % ', '.join(sorted(EXPORT_FORMATS))),
+        make_option('--since',
+                    help='Only export what changed since this date, '
+                         'as YYYY-MM-DD.'),
+        make_option('--incremental', action='store_true', default=False,
+                    help='Only export what changed since the last export.'),
+        make_option('--progress', action='store_true', default=False,
+                    help='Show the progress of the export named --name.'),
+    )
 
     def handle(self, *args, **kwargs):
+        name = kwargs.get('name')
+        if kwargs.get('progress'):
+            progress = get_export_progress(
+                name or datetime.date.today().strftime('%Y-%m-%d'))
+            if progress is None:
+                raise CommandError('No export running.')
+            self.stdout.write('Exported {done} of {total} objects in '
+                              '{elapsed:.0f}s.'.format(**progress))
+            return
+
+        if kwargs['format'] not in EXPORT_FORMATS:
+            raise CommandError('Unknown format: %s' % kwargs['format'])
+
+        since = None
+        if kwargs.get('incremental'):
+            since = get_last_export()
+            if since is None:
+                raise CommandError('No previous export.')
+        elif kwargs.get('since'):
+            try:
+                since = datetime.datetime.strptime(kwargs['since'],
+                                                   '%Y-%m-%d')
+            except ValueError:
+                raise CommandError('--since must be YYYY-MM-DD.')
+
         # Execute as a celery task so we get the right permissions.
-        export_data.delay()
+        export_data.delay(name=name, since=since, format=kwargs['format'])
@@ -48,7 +48,8 @@ from mkt.constants.applications import DEVICE_TYPES
 from mkt.constants.payments import PROVIDER_CHOICES
 from mkt.files.models import File, nfd_str, Platform
 from mkt.files.utils import parse_addon, WebAppParser
-from mkt.prices.models import AddonPremium, Price
+from mkt.prices.models import (AddonPremium, default_providers, Price,
+                               PriceCurrency)
 from mkt.ratings.models import Review
 from mkt.regions.utils import parse_region
 from mkt.site.models import DynamicBoolFieldsMixin
@@ -945,6 +946,10 @@ class Addon(amo.models.OnChangeMixin, amo.models.ModelBase):
         # to avoid having to catch NotImplemented errors.
         return False
 
+    def is_mini_manifest_available(self):
+        return (self.is_packaged and not self.disabled_by_user and
+                self.status in (amo.STATUS_PUBLIC, amo.STATUS_BLOCKED))
+
     def sign_if_packaged(self, version_pk, reviewer=False):
         raise NotImplementedError('Not available for add-ons.')
 
@@ -1919,23 +1924,7 @@ class Webapp(Addon):
 
         Note: free and in-app are not included in this.
         """
-        excluded = set(self.addonexcludedregion
-                           .values_list('region', flat=True))
-
-        if self.is_premium():
-            all_regions = set(mkt.regions.ALL_REGION_IDS)
-            # Find every region that does not have payments supported
-            # and add that into the exclusions.
-            excluded = excluded.union(
-                all_regions.difference(self.get_price_region_ids()))
-
-        geo = self.geodata
-        if geo.region_de_iarc_exclude or geo.region_de_usk_exclude:
-            excluded.add(mkt.regions.DE.id)
-        if geo.region_br_iarc_exclude:
-            excluded.add(mkt.regions.BR.id)
-
-        return sorted(list(excluded))
+        return mask_region_ids(get_exclusion_masks([self.id])[self.id])
 
     def get_price_region_ids(self):
         tier = self.get_tier()
@@ -2047,7 +2036,8 @@ class Webapp(Addon):
 
     def get_cached_manifest(self, force=False):
         """
-        Creates the "mini" manifest for packaged apps and caches it.
+        Creates the "mini" manifest for packaged apps and caches it, with its
+        ETag.
 
         Call this with `force=True` whenever we need to update the cached
         version of this manifest, e.g., when a new version of the packaged app
@@ -2059,12 +2049,15 @@ class Webapp(Addon):
         if not self.is_packaged:
             return
 
-        key = 'webapp:{0}:manifest'.format(self.pk)
+        key = mini_manifest_key(self.guid)
 
         if not force:
-            data = cache.get(key)
-            if data:
-                return data
+            cached = cache.get(key)
+            if cached:
+                data = cache.get(mini_manifest_content_key(self.guid,
+                                                           cached[0]))
+                if data:
+                    return data
 
         version = self.current_version
         if not version:
@@ -2093,16 +2086,31 @@ class Webapp(Addon):
                 'release_notes': version.releasenotes,
                 'package_path': package_path,
             }
-            for key in ['developer', 'icons', 'locales']:
-                if key in manifest:
-                    data[key] = manifest[key]
+            for field in ['developer', 'icons', 'locales']:
+                if field in manifest:
+                    data[field] = manifest[field]
 
         data = json.dumps(data, cls=JSONEncoder)
 
-        cache.set(key, data, None)
+        # The content is stored under its ETag before the app points to it,
+        # so that the ETag and the content served always go together.
+        etag = self.get_manifest_etag(data)
+        cache.set(mini_manifest_content_key(self.guid, etag), data,
+                  MINI_MANIFEST_TIMEOUT)
+        cache.set(key, (etag, self.is_mini_manifest_available()),
+                  MINI_MANIFEST_TIMEOUT)
 
         return data
 
+    def get_manifest_etag(self, manifest_content):
+        """The ETag of the mini-manifest, which changes with the package."""
+        package_etag = hashlib.sha256()
+        package_etag.update(manifest_content)
+        package_file = self.get_latest_file()
+        if package_file:
+            package_etag.update(package_file.hash)
+        return package_etag.hexdigest()
+
     def sign_if_packaged(self, version_pk, reviewer=False):
         if not self.is_packaged:
             return
@@ -2291,15 +2299,18 @@ class Webapp(Addon):
         """
         return hashlib.sha512(settings.SECRET_KEY + str(self.id)).hexdigest()
 
-    def get_content_ratings_by_body(self, es=False):
+    def get_content_ratings_by_body(self, es=False, ratings=None):
         """
         Gets content ratings on this app keyed by bodies.
 
         es -- denotes whether to return ES-friendly results (just the IDs of
               rating classes) to fetch and translate later.
+        ratings -- the ContentRatings of this app, if already fetched.
         """
+        if ratings is None:
+            ratings = self.content_ratings.all()
         content_ratings = {}
-        for cr in self.content_ratings.all():
+        for cr in ratings:
             body = cr.get_body()
             rating_serialized = {
                 'body': body.id,
@@ -2494,9 +2505,10 @@ Webapp._meta.translated_fields = [
 def update_search_index(sender, instance, **kw):
     from . import tasks
     if not kw.get('raw'):
+        ids = [instance.id]
         if instance.upsold and instance.upsold.free_id:
-            tasks.index_webapps.delay([instance.upsold.free_id])
-        tasks.index_webapps.delay([instance.id])
+            ids.append(instance.upsold.free_id)
+        tasks.index_webapps.delay(ids)
 
 
 @receiver(dbsignals.post_save, sender=AddonUpsell,
@@ -2505,16 +2517,29 @@ def update_search_index_upsell(sender, instance, **kw):
     # When saving an AddonUpsell instance, reindex both apps to update their
     # upsell/upsold properties in ES.
     from . import tasks
-    if instance.free:
-        tasks.index_webapps.delay([instance.free.id])
-    if instance.premium:
-        tasks.index_webapps.delay([instance.premium.id])
+    ids = [app.id for app in (instance.free, instance.premium) if app]
+    if ids:
+        tasks.index_webapps.delay(ids)
 
 
 models.signals.pre_save.connect(save_signal, sender=Webapp,
                                 dispatch_uid='webapp_translations')
 
 
+# The mini-manifests are updated when the apps are saved, the timeout only
+# catches the changes made without saving them.
+MINI_MANIFEST_TIMEOUT = 60 * 15
+
+
+def mini_manifest_key(guid):
+    """The (ETag, available) of the mini-manifest of the app."""
+    return 'webapp:{0}:manifest'.format(guid)
+
+
+def mini_manifest_content_key(guid, etag):
+    return 'webapp:{0}:manifest:{1}'.format(guid, etag)
+
+
 @receiver(signals.version_changed, dispatch_uid='update_cached_manifests')
 def update_cached_manifests(sender, **kw):
     if not kw.get('raw') and sender.is_packaged:
@@ -2568,6 +2593,61 @@ def watch_disabled(old_attr={}, new_attr={}, instance=None, sender=None, **kw):
             f.hide_disabled_file()
 
 
+@Webapp.on_change
+def watch_last_updated(old_attr={}, new_attr={}, instance=None, sender=None,
+                       **kw):
+    """Only public apps have the date of their last version as last_updated."""
+    if old_attr.get('status') != new_attr.get('status'):
+        from . import tasks
+        tasks.version_changed.delay(instance.id)
+
+
+@File.on_change
+def watch_file_last_updated(old_attr={}, new_attr={}, instance=None,
+                            sender=None, **kw):
+    """Only versions with public files count towards last_updated."""
+    if (old_attr.get('id') is None or
+            old_attr.get('status') != new_attr.get('status')):
+        try:
+            addon_id = instance.version.addon_id
+        except models.ObjectDoesNotExist:
+            return
+        from . import tasks
+        tasks.version_changed.delay(addon_id)
+
+
+@receiver(dbsignals.post_save, sender=Addon,
+          dispatch_uid='addon.mini_manifest')
+@receiver(dbsignals.post_save, sender=Webapp,
+          dispatch_uid='webapp.mini_manifest')
+def update_mini_manifest_available(sender, instance, **kw):
+    """
+    Keeps whether the cached mini-manifest can be served up to date. The
+    reviewer tools update the app without signals and send post_save once
+    the review is done.
+    """
+    if kw.get('raw') or not instance.guid:
+        return
+    key = mini_manifest_key(instance.guid)
+    cached = cache.get(key)
+    if cached:
+        cache.set(key, (cached[0], instance.is_mini_manifest_available()),
+                  MINI_MANIFEST_TIMEOUT)
+
+
+@File.on_change
+def watch_file_mini_manifest(old_attr={}, new_attr={}, instance=None,
+                             sender=None, **kw):
+    """The ETag of the mini-manifest depends on the hash of the package."""
+    if old_attr.get('id') and old_attr.get('hash') != new_attr.get('hash'):
+        try:
+            addon = instance.version.addon
+        except models.ObjectDoesNotExist:
+            return
+        if addon.is_packaged:
+            cache.delete(mini_manifest_key(addon.guid))
+
+
 @receiver(dbsignals.post_save, sender=Webapp,
           dispatch_uid='webapp.pre_generate_apk')
 def pre_generate_apk(sender=None, instance=None, **kw):
@@ -2667,13 +2747,8 @@ def get_excluded_in(region_id):
     return set(aers + geodata_exclusions)
 
 
-@receiver(models.signals.post_save, sender=AddonExcludedRegion,
-          dispatch_uid='clean_memoized_exclusions')
-def clean_memoized_exclusions(sender, **kw):
-    if not kw.get('raw'):
-        for k in mkt.regions.ALL_REGION_IDS:
-            cache.delete_many([memoize_key('get_excluded_in', k)
-                               for k in mkt.regions.ALL_REGION_IDS])
+def clean_memoized_exclusions(region_ids):
+    cache.delete_many([memoize_key('get_excluded_in', k) for k in region_ids])
 
 
 class IARCInfo(amo.models.ModelBase):
@@ -3056,3 +3131,136 @@ for region in (mkt.regions.BR, mkt.regions.DE):
 # Save geodata translations when a Geodata instance is saved.
 models.signals.pre_save.connect(save_signal, sender=Geodata,
                                 dispatch_uid='geodata_translations')
+
+
+# Region exclusions.
+#
+# The regions an app is excluded from, as returned by
+# Webapp.get_excluded_region_ids(), are kept in the cache as a bitset with
+# one bit per region id. They are built for many apps at once by
+# build_exclusion_masks() and forgotten when anything they are built from
+# changes.
+
+def region_mask(region_ids):
+    """Returns the bitset of `region_ids`."""
+    mask = 0
+    for region_id in region_ids:
+        mask |= 1 << region_id
+    return mask
+
+
+ALL_REGIONS_MASK = region_mask(mkt.regions.ALL_REGION_IDS)
+
+
+def mask_region_ids(mask):
+    """Returns the sorted region ids in the bitset `mask`."""
+    return [r for r in mkt.regions.ALL_REGION_IDS if mask & (1 << r)]
+
+
+def exclusion_mask_key(app_id):
+    return 'webapps:region-exclusions:%s' % app_id
+
+
+def build_exclusion_masks(app_ids):
+    """
+    Returns a {app id: excluded regions bitset} dict, with one query for the
+    AddonExcludedRegions, one for the Geodata flags and one for the paid
+    regions of the price tiers of premium apps.
+    """
+    masks = dict.fromkeys(app_ids, 0)
+    for app_id, region in (AddonExcludedRegion.objects.no_cache()
+                           .filter(addon__in=app_ids)
+                           .values_list('addon', 'region')):
+        masks[app_id] |= 1 << region
+
+    flags = (Geodata.objects.no_cache().filter(addon__in=app_ids)
+             .filter(Q(region_de_iarc_exclude=True) |
+                     Q(region_de_usk_exclude=True) |
+                     Q(region_br_iarc_exclude=True))
+             .values_list('addon', 'region_de_iarc_exclude',
+                          'region_de_usk_exclude', 'region_br_iarc_exclude'))
+    for app_id, de_iarc, de_usk, br_iarc in flags:
+        if de_iarc or de_usk:
+            masks[app_id] |= 1 << mkt.regions.DE.id
+        if br_iarc:
+            masks[app_id] |= 1 << mkt.regions.BR.id
+
+    # Premium apps are excluded from the regions their tier isn't paid in,
+    # and from all of them without a tier.
+    tiers = dict(Addon.with_deleted.no_cache()
+                 .filter(id__in=app_ids, premium_type__in=amo.ADDON_PREMIUMS)
+                 .values_list('id', 'addonpremium__price'))
+    paid = {}
+    for tier, region in (PriceCurrency.objects.no_cache()
+                         .filter(tier__in=filter(None, tiers.values()),
+                                 provider__in=default_providers(), paid=True)
+                         .values_list('tier', 'region')):
+        paid[tier] = paid.get(tier, 0) | 1 << region
+    for app_id, tier in tiers.items():
+        masks[app_id] |= ALL_REGIONS_MASK & ~paid.get(tier, 0)
+    return masks
+
+
+def get_exclusion_masks(app_ids):
+    """
+    Returns a {app id: excluded regions bitset} dict, from the cache if
+    possible.
+    """
+    keys = dict((exclusion_mask_key(app_id), app_id) for app_id in app_ids)
+    masks = dict((keys[k], mask) for k, mask in cache.get_many(keys).items())
+    missing = [app_id for app_id in app_ids if app_id not in masks]
+    if missing:
+        built = build_exclusion_masks(missing)
+        cache.set_many(dict((exclusion_mask_key(app_id), mask)
+                            for app_id, mask in built.items()))
+        masks.update(built)
+    return masks
+
+
+def clean_exclusion_masks(app_ids):
+    cache.delete_many([exclusion_mask_key(app_id) for app_id in app_ids])
+
+
+@receiver(models.signals.post_save, sender=AddonExcludedRegion,
+          dispatch_uid='aer.clean_exclusions')
+@receiver(models.signals.post_delete, sender=AddonExcludedRegion,
+          dispatch_uid='aer.clean_exclusions.delete')
+def aer_clean_exclusions(sender, instance, **kw):
+    if not kw.get('raw'):
+        clean_memoized_exclusions([instance.region])
+        clean_exclusion_masks([instance.addon_id])
+
+
+@receiver(models.signals.post_save, sender=Geodata,
+          dispatch_uid='geodata.clean_exclusions')
+def geodata_clean_exclusions(sender, instance, **kw):
+    if not kw.get('raw'):
+        clean_memoized_exclusions([mkt.regions.BR.id, mkt.regions.DE.id])
+        clean_exclusion_masks([instance.addon_id])
+
+
+@receiver(models.signals.post_save, sender=Addon,
+          dispatch_uid='addon.clean_exclusions')
+@receiver(models.signals.post_save, sender=Webapp,
+          dispatch_uid='webapp.clean_exclusions')
+@receiver(models.signals.post_save, sender=AddonPremium,
+          dispatch_uid='addonpremium.clean_exclusions')
+@receiver(models.signals.post_delete, sender=AddonPremium,
+          dispatch_uid='addonpremium.clean_exclusions.delete')
+def premium_clean_exclusions(sender, instance, **kw):
+    # The premium type or the price tier of the app may have changed.
+    if not kw.get('raw'):
+        clean_exclusion_masks([getattr(instance, 'addon_id', instance.id)])
+
+
+def tier_clean_exclusions(sender, instance, **kw):
+    if not kw.get('raw'):
+        clean_exclusion_masks(AddonPremium.objects.filter(
+            price=instance.tier_id).values_list('addon', flat=True))
+
+
+models.signals.post_save.connect(tier_clean_exclusions, sender=PriceCurrency,
+                                 dispatch_uid='pricecurrency.clean_exclusions')
+models.signals.post_delete.connect(
+    tier_clean_exclusions, sender=PriceCurrency,
+    dispatch_uid='pricecurrency.clean_exclusions.delete')
@@ -1,16 +1,27 @@
+import collections
 import datetime
+import glob
+import gzip
 import hashlib
+import itertools
 import json
 import logging
 import os
 import shutil
-import subprocess
+import tarfile
+import threading
 import time
+import urlparse
+import zipfile
+from cStringIO import StringIO
+from multiprocessing.pool import ThreadPool
 
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 from django.core.files.storage import default_storage as storage
 from django.core.urlresolvers import reverse
+from django.db import connection
 from django.template import Context, loader
 
 import elasticsearch
@@ -19,6 +30,7 @@ import requests
 from celery import chord
 from celery.exceptions import RetryTaskError
 from celeryutils import task
+from django_statsd.clients import statsd
 from requests.exceptions import RequestException
 from test_utils import RequestFactory
 from tower import ugettext as _
@@ -40,7 +52,8 @@ from mkt.reviewers.models import RereviewQueue
 from mkt.users.models import UserProfile
 from mkt.users.utils import get_task_user
 from mkt.webapps.indexers import WebappIndexer
-from mkt.webapps.models import Addon, AppManifest, Preview, Webapp
+from mkt.webapps.models import (Addon, AppManifest, Installed, Preview,
+                                Trending, Webapp)
 from mkt.webapps.utils import get_locale_properties
 
 
@@ -50,25 +63,58 @@ task_log = logging.getLogger('z.task')
 @task
 @write
 def version_changed(addon_id, **kw):
-    update_last_updated(addon_id)
+    update_last_updated([addon_id])
 
 
-def update_last_updated(addon_id):
-    qs = Addon._last_updated_queries()
-    if not Webapp.objects.filter(pk=addon_id).exists():
-        task_log.info(
-            '[1@None] Updating last updated for %s failed, no addon found'
-            % addon_id)
-        return
+def update_last_updated(ids):
+    """
+    Computes the last_updated of the apps in `ids` again and saves the ones
+    that changed in a single UPDATE. Returns the number of apps changed.
+    """
+    current = dict((pk, (last_updated, created)) for pk, last_updated, created
+                   in Webapp.objects.no_cache().using('default')
+                   .filter(pk__in=ids)
+                   .values_list('id', 'last_updated', 'created'))
+    computed = dict(Addon._last_updated_queries().filter(pk__in=ids)
+                    .using('default').values_list('id', 'last_updated'))
+    changes = {}
+    for pk, (last_updated, created) in current.items():
+        # Apps that are not public keep their last_updated, or get their
+        # creation date if they never had one.
+        new = computed.get(pk) or last_updated or created
+        if new != last_updated:
+            changes[pk] = new
+    if changes:
+        task_log.info('[%s@None] Updating last updated for apps: %s.'
+                      % (len(changes), sorted(changes)))
+        set_last_updated(changes)
+    return len(changes)
+
+
+def set_last_updated(changes):
+    """Saves the {app id: last_updated} `changes` in one UPDATE."""
+    ids = sorted(changes)
+    cursor = connection.cursor()
+    cursor.execute(
+        'UPDATE %s SET last_updated = CASE id %s END WHERE id IN (%s)'
+        % (Addon._meta.db_table, ' '.join(['WHEN %s THEN %s'] * len(ids)),
+           ', '.join(['%s'] * len(ids))),
+        list(itertools.chain(*[(pk, changes[pk]) for pk in ids])) + ids)
+    # The UPDATE went around cache-machine, invalidate the apps ourselves.
+    Webapp.objects.invalidate(
+        *Webapp.objects.no_cache().filter(pk__in=ids).no_transforms())
+    index_webapps.delay(ids)
 
-    task_log.info('[1@None] Updating last updated for %s.' % addon_id)
 
-    res = (qs.filter(pk=addon_id)
-             .using('default')
-             .values_list('id', 'last_updated'))
-    if res:
-        pk, t = res[0]
-        Webapp.objects.filter(pk=pk).update(last_updated=t)
+@task
+@write
+def fix_last_updated(ids, **kw):
+    """Repairs the last_updated of the apps that drifted."""
+    changed = update_last_updated(ids)
+    statsd.incr('webapps.last_updated.examined', len(ids))
+    statsd.incr('webapps.last_updated.changed', changed)
+    task_log.info('[%s@None] Checked last updated, %s changed.'
+                  % (len(ids), changed))
 
 
 @task
@@ -106,8 +152,11 @@ def update_manifests(ids, **kw):
     # we'll need to log in as user.
     amo.set_user(get_task_user())
 
+    fetched = {}
+    if len(ids) > 1:
+        fetched = crawl_manifests(ids, check_hash)
     for id in ids:
-        _update_manifest(id, check_hash, retries)
+        _update_manifest(id, check_hash, retries, fetched=fetched.get(id))
     if retries:
         try:
             update_manifests.retry(args=(retries.keys(),),
@@ -150,7 +199,95 @@ def notify_developers_of_failure(app, error_message, has_link=False):
                             context, recipient_list=to)
 
 
-def _update_manifest(id, check_hash, failed_fetches):
+MANIFEST_VALIDATORS_TIMEOUT = 60 * 60 * 24 * 30
+# The result of fetching a manifest: its content, None if it was not
+# modified, and the validators of the response.
+ManifestFetch = collections.namedtuple('ManifestFetch',
+                                       'content validators')
+
+
+def manifest_validators_key(id):
+    return 'manifest-validators:%s' % id
+
+
+def get_manifest_validators(id, hash_=None):
+    """
+    Returns the ETag and Last-Modified of the last manifest fetched for the
+    app, if it had the `hash_` of the current file.
+    """
+    validators = cache.get(manifest_validators_key(id))
+    if validators and (hash_ is None or validators['hash'] == hash_):
+        return validators
+
+
+def set_manifest_validators(id, validators, hash_):
+    if validators.get('etag') or validators.get('last_modified'):
+        cache.set(manifest_validators_key(id), dict(validators, hash=hash_),
+                  MANIFEST_VALIDATORS_TIMEOUT)
+
+
+def conditional_headers(validators):
+    headers = {}
+    if validators:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+
+def fetch_manifest(url, validators=None):
+    """Fetches the manifest, conditionally if there are `validators`."""
+    new_validators = {}
+    content = _fetch_manifest(url, headers=conditional_headers(validators),
+                              validators=new_validators)
+    return ManifestFetch(content, new_validators)
+
+
+def crawl_manifests(ids, check_hash=True):
+    """
+    Fetches the manifests of the hosted apps at the same time, with at most
+    MANIFEST_CRAWL_WORKERS requests in flight and MANIFEST_CRAWL_PER_HOST per
+    host. Returns {app id: ManifestFetch, or the exception raised}.
+    """
+    urls = dict(Webapp.objects.no_cache().filter(pk__in=ids, is_packaged=False)
+                .values_list('id', 'manifest_url'))
+    if not urls:
+        return {}
+    validators = {}
+    if check_hash:
+        validators = cache.get_many([manifest_validators_key(id)
+                                     for id in urls])
+    hosts = dict((urlparse.urlparse(url).netloc,
+                  threading.BoundedSemaphore(settings.MANIFEST_CRAWL_PER_HOST))
+                 for url in urls.values())
+
+    def fetch(item):
+        id, url = item
+        with hosts[urlparse.urlparse(url).netloc]:
+            try:
+                return id, fetch_manifest(
+                    url, validators.get(manifest_validators_key(id)))
+            except Exception, e:
+                return id, e
+
+    start = time.time()
+    pool = ThreadPool(min(settings.MANIFEST_CRAWL_WORKERS, len(urls)))
+    try:
+        fetched = dict(pool.map(fetch, urls.items()))
+    finally:
+        pool.close()
+        pool.join()
+    task_log.info(u'Fetched {0} manifests in {1:.1f}s.'.format(
+        len(fetched), time.time() - start))
+    return fetched
+
+
+def _update_manifest(id, check_hash, failed_fetches, fetched=None):
+    """
+    Updates the app from its manifest, `fetched` already by
+    crawl_manifests() or fetched now.
+    """
     webapp = Webapp.objects.get(pk=id)
     version = webapp.versions.latest()
     file_ = version.files.latest()
@@ -160,9 +297,17 @@ def _update_manifest(id, check_hash, failed_fetches):
         _log(webapp, u'Ignoring, no existing file')
         return
 
+    # The validators are only good if the manifest they were sent with is
+    # still the current file.
+    validators = check_hash and get_manifest_validators(id, file_.hash)
+
     # Fetch manifest, catching and logging any exception.
     try:
-        content = _fetch_manifest(webapp.manifest_url)
+        if isinstance(fetched, Exception):
+            raise fetched
+        if fetched is None or (fetched.content is None and not validators):
+            fetched = fetch_manifest(webapp.manifest_url, validators)
+        content = fetched.content
     except Exception, e:
         msg = u'Failed to get manifest from %s. Error: %s' % (
             webapp.manifest_url, e)
@@ -183,11 +328,16 @@ def _update_manifest(id, check_hash, failed_fetches):
             _log(webapp, msg, rereview=False, exc_info=True)
         return
 
+    if content is None:
+        _log(webapp, u'Manifest not modified')
+        return
+
     # Check hash.
+    hash_ = _get_content_hash(content)
     if check_hash:
-        hash_ = _get_content_hash(content)
         if file_.hash == hash_:
             _log(webapp, u'Manifest the same')
+            set_manifest_validators(id, fetched.validators, hash_)
             return
         _log(webapp, u'Manifest different')
 
@@ -227,6 +377,8 @@ def _update_manifest(id, check_hash, failed_fetches):
         webapp.manifest_updated(content, upload)
     except:
         _log(webapp, u'Failed to create version', exc_info=True)
+    else:
+        set_manifest_validators(id, fetched.validators, hash_)
 
     # Check for any name changes at root and in locales. If any were added or
     # updated, send to re-review queue.
@@ -343,6 +495,13 @@ def unindex_webapps(ids, **kw):
     WebappIndexer.unindexer(ids)
 
 
+def _export_request():
+    req = RequestFactory().get('/')
+    req.user = AnonymousUser()
+    req.REGION = RESTOFWORLD
+    return req
+
+
 @task
 def dump_app(id, **kw):
     from mkt.webapps.serializers import AppSerializer
@@ -358,9 +517,7 @@ def dump_app(id, **kw):
         task_log.info(u'Webapp does not exist: {0}'.format(id))
         return
 
-    req = RequestFactory().get('/')
-    req.user = AnonymousUser()
-    req.REGION = RESTOFWORLD
+    req = _export_request()
 
     if not os.path.exists(target_dir):
         os.makedirs(target_dir)
@@ -418,43 +575,234 @@ def rm_directory(path):
         shutil.rmtree(path)
 
 
-def dump_all_apps_tasks():
-    all_pks = (Webapp.objects.visible()
-                             .values_list('pk', flat=True)
-                             .order_by('pk'))
-    return [dump_apps.si(pks) for pks in chunked(all_pks, 100)]
+# The file extension of each format export_data can write.
+EXPORT_FORMATS = {
+    'tgz': 'tgz',
+    'zip': 'zip',
+    'ndjson': 'ndjson.gz',
+}
+EXPORT_CHUNK_SIZE = 100
+EXPORT_PROGRESS_TIMEOUT = 60 * 60 * 24
+
+
+def export_parts_dir(name):
+    return os.path.join(settings.DUMPED_APPS_PATH, 'parts', name)
+
+
+def export_progress_key(name, key):
+    return 'export:%s:%s' % (name, key)
+
+
+def start_export_progress(name, total):
+    cache.set_many({export_progress_key(name, 'total'): total,
+                    export_progress_key(name, 'done'): 0,
+                    export_progress_key(name, 'start'): time.time()},
+                   EXPORT_PROGRESS_TIMEOUT)
+
+
+def incr_export_progress(name, delta):
+    key = export_progress_key(name, 'done')
+    cache.add(key, 0, EXPORT_PROGRESS_TIMEOUT)
+    done = cache.incr(key, delta)
+    task_log.info(u'Exported {0} of {1} objects for {2}'.format(
+        done, cache.get(export_progress_key(name, 'total')), name))
+    return done
+
+
+def get_export_progress(name):
+    """
+    Returns a dict of the number of objects exported, the total and the
+    seconds elapsed for the export, or None if it is not running.
+    """
+    data = cache.get_many([export_progress_key(name, key)
+                           for key in ('total', 'done', 'start')])
+    if not data:
+        return None
+    start = data.get(export_progress_key(name, 'start')) or time.time()
+    return {'done': data.get(export_progress_key(name, 'done')) or 0,
+            'total': data.get(export_progress_key(name, 'total')),
+            'elapsed': time.time() - start}
+
+
+def write_export_part(name, part, entries):
+    """
+    Writes the (path, data) entries of a chunk of an export to a part file,
+    one "path<TAB>json" line per entry, for finish_export to stream into the
+    archive.
+    """
+    target_dir = export_parts_dir(name)
+    if not os.path.exists(target_dir):
+        try:
+            os.makedirs(target_dir)
+        except OSError:
+            pass  # Catch race condition if another chunk created it.
+
+    target_file = os.path.join(target_dir, part + '.ndjson')
+    count = 0
+    with open(target_file, 'w') as f:
+        for path, data in entries:
+            f.write('%s\t%s\n' % (path, json.dumps(data, cls=JSONEncoder)))
+            count += 1
+    incr_export_progress(name, count)
+    return target_file
+
+
+def read_export_parts(name):
+    """Yields the (path, json) entries of the part files of an export."""
+    for part in sorted(glob.glob(os.path.join(export_parts_dir(name),
+                                              '*.ndjson'))):
+        with open(part) as f:
+            for line in f:
+                path, content = line.rstrip('\n').split('\t', 1)
+                yield path, content
+
+
+@task(ignore_result=False)
+def export_apps(name, ids, **kw):
+    from mkt.collections.tasks import object_path
+    from mkt.webapps.serializers import AppSerializer
+    task_log.info(u'Exporting apps {0} to {1}. [{2}]'
+                  .format(ids[0], ids[-1], len(ids)))
+    req = _export_request()
+    # One query for the chunk, the transforms attach the rest in bulk.
+    apps = Webapp.objects.no_cache().filter(pk__in=ids).order_by('pk')
+    entries = ((os.path.join('apps', object_path(app)),
+                AppSerializer(app, context={'request': req}).data)
+               for app in apps)
+    return write_export_part(name, 'apps-%s' % ids[0], entries)
+
+
+def export_all_apps_tasks(name, since=None):
+    pks = Webapp.objects.visible()
+    if since:
+        pks = pks.filter(modified__gte=since)
+    pks = pks.values_list('pk', flat=True).order_by('pk')
+    return [export_apps.si(name, chunk)
+            for chunk in chunked(pks, EXPORT_CHUNK_SIZE)]
+
+
+def get_last_export():
+    """Returns when the last export_data started, or None."""
+    try:
+        with open(os.path.join(settings.DUMPED_APPS_PATH, 'tarballs',
+                               'last-export.json')) as f:
+            started = json.load(f)['started']
+    except (IOError, ValueError, KeyError):
+        return None
+    return datetime.datetime.strptime(started, '%Y-%m-%dT%H:%M:%S')
+
+
+def set_last_export(name, started):
+    target_dir = os.path.join(settings.DUMPED_APPS_PATH, 'tarballs')
+    with open(os.path.join(target_dir, 'last-export.json'), 'w') as f:
+        json.dump({'name': name,
+                   'started': started.strftime('%Y-%m-%dT%H:%M:%S')}, f)
 
 
 @task
-def export_data(name=None):
-    from mkt.collections.tasks import dump_all_collections_tasks
-    today = datetime.datetime.today().strftime('%Y-%m-%d')
+def export_data(name=None, since=None, format='tgz'):
+    """
+    Exports the public apps and collections, or only those modified since
+    the `since` datetime, to DUMPED_APPS_PATH/tarballs/<name>.<extension>.
+
+    The chunks are serialized in parallel by the tasks of a chord, then
+    finish_export streams them into the archive.
+    """
+    from mkt.collections.tasks import export_all_collections_tasks
+    if format not in EXPORT_FORMATS:
+        raise ValueError('Unknown export format: %s' % format)
+    started = datetime.datetime.now().replace(microsecond=0)
     if name is None:
-        name = today
-    root = settings.DUMPED_APPS_PATH
-    directories = ['apps', 'collections']
-    for directory in directories:
-        rm_directory(os.path.join(root, directory))
-    files = directories + compile_extra_files(date=today)
-    chord(dump_all_apps_tasks() + dump_all_collections_tasks(),
-          compress_export.si(filename=name, files=files)).apply_async()
+        name = started.strftime('%Y-%m-%d')
+    rm_directory(export_parts_dir(name))
+
+    chunks = (export_all_apps_tasks(name, since) +
+              export_all_collections_tasks(name, since))
+    start_export_progress(name, sum(len(chunk.args[1]) for chunk in chunks))
+    finish = finish_export.si(name, format, started)
+    if chunks:
+        chord(chunks, finish).apply_async()
+    else:
+        finish.apply_async()
+
+
+def render_extra_files(date, directory='apps'):
+    """Returns the (filename, content) of the .txt files of a dump."""
+    context = Context({'date': date, 'url': settings.SITE_URL})
+    return [(f, loader.get_template('webapps/dump/%s/%s' % (directory, f))
+                      .render(context).encode('utf-8'))
+            for f in ['license.txt', 'readme.txt']]
 
 
 def compile_extra_files(date):
     # Put some .txt files in place.
-    context = Context({'date': date, 'url': settings.SITE_URL})
-    files = ['license.txt', 'readme.txt']
     if not os.path.exists(settings.DUMPED_APPS_PATH):
         os.makedirs(settings.DUMPED_APPS_PATH)
     created_files = []
-    for f in files:
-        template = loader.get_template('webapps/dump/apps/' + f)
+    for f, content in render_extra_files(date):
         dest = os.path.join(settings.DUMPED_APPS_PATH, f)
-        open(dest, 'w').write(template.render(context))
+        open(dest, 'w').write(content)
         created_files.append(f)
     return created_files
 
 
+def write_tgz(target_file, entries):
+    now = time.time()
+    with tarfile.open(target_file, 'w:gz') as tar:
+        for path, content in entries:
+            info = tarfile.TarInfo(path)
+            info.size = len(content)
+            info.mtime = now
+            tar.addfile(info, StringIO(content))
+
+
+def write_zip(target_file, entries):
+    with zipfile.ZipFile(target_file, 'w', zipfile.ZIP_DEFLATED,
+                         allowZip64=True) as archive:
+        for path, content in entries:
+            archive.writestr(path, content)
+
+
+def write_ndjson(target_file, entries):
+    with gzip.open(target_file, 'wb') as f:
+        for path, content in entries:
+            f.write('{"path": %s, "data": %s}\n' % (json.dumps(path), content))
+
+
+@task
+def finish_export(name, format, started, **kw):
+    """
+    Streams the part files of an export into the archive, without extracting
+    them to a directory first, and records when the export started for the
+    next incremental export.
+    """
+    # Note: not using storage because all these operations should be local.
+    target_dir = os.path.join(settings.DUMPED_APPS_PATH, 'tarballs')
+    target_file = os.path.join(target_dir, '%s.%s' % (name,
+                                                      EXPORT_FORMATS[format]))
+    tmp_file = os.path.join(target_dir, '.%s' % os.path.basename(target_file))
+    if not os.path.exists(target_dir):
+        os.makedirs(target_dir)
+
+    task_log.info(u'Creating dump {0}'.format(target_file))
+    entries = read_export_parts(name)
+    if format == 'ndjson':
+        write_ndjson(tmp_file, entries)
+    else:
+        # Archives get the license and readme too.
+        extra = render_extra_files(started.strftime('%Y-%m-%d'))
+        writer = write_tgz if format == 'tgz' else write_zip
+        writer(tmp_file, itertools.chain(extra, entries))
+    # Don't let anyone download a half written archive.
+    os.rename(tmp_file, target_file)
+
+    rm_directory(export_parts_dir(name))
+    set_last_export(name, started)
+    cache.delete_many([export_progress_key(name, key)
+                       for key in ('total', 'done', 'start')])
+    return target_file
+
+
 @task
 def compress_export(filename, files):
     # Note: not using storage because all these operations should be local.
@@ -464,11 +812,10 @@ def compress_export(filename, files):
     if not os.path.exists(target_dir):
         os.makedirs(target_dir)
 
-    # Put some .txt files in place.
-    cmd = ['tar', 'czf', target_file, '-C',
-           settings.DUMPED_APPS_PATH] + files
     task_log.info(u'Creating dump {0}'.format(target_file))
-    subprocess.call(cmd)
+    with tarfile.open(target_file, 'w:gz') as tar:
+        for f in files:
+            tar.add(os.path.join(settings.DUMPED_APPS_PATH, f), arcname=f)
     return target_file
 
 
@@ -477,13 +824,29 @@ def dump_user_installs(ids, **kw):
     task_log.info(u'Dumping user installs {0} to {1}. [{2}]'
                   .format(ids[0], ids[-1], len(ids)))
 
-    for user_id in ids:
-        try:
-            user = UserProfile.objects.get(pk=user_id)
-        except UserProfile.DoesNotExist:
-            task_log.info('User profile does not exist: {0}'.format(user_id))
-            continue
-
+    users = UserProfile.objects.no_cache().filter(pk__in=ids)
+    missing = set(ids) - set(user.pk for user in users)
+    for user_id in missing:
+        task_log.info('User profile does not exist: {0}'.format(user_id))
+
+    # Gather data about the users, in one query for the chunk. We can't
+    # recommend deleted apps, so don't include them.
+    installed = collections.defaultdict(list)
+    zone = pytz.timezone(settings.TIME_ZONE)
+    installs = (Installed.objects.filter(user__in=ids,
+                                         addon__type=amo.ADDON_WEBAPP)
+                .exclude(addon__status=amo.STATUS_DELETED)
+                .order_by('pk')
+                .values_list('user', 'addon', 'addon__app_slug', 'created'))
+    for user_id, app_id, app_slug, created in installs:
+        installed[user_id].append({
+            'id': app_id,
+            'slug': app_slug,
+            'installed': pytz.utc.normalize(
+                zone.localize(created)).strftime('%Y-%m-%dT%H:%M:%S')
+        })
+
+    for user in users:
         hash = hashlib.sha256('%s%s' % (str(user.id),
                                         settings.SECRET_KEY)).hexdigest()
         target_dir = os.path.join(settings.DUMPED_USERS_PATH, 'users', hash[0])
@@ -495,28 +858,11 @@ def dump_user_installs(ids, **kw):
             except OSError:
                 pass  # Catch race condition if file exists now.
 
-        # Gather data about user.
-        installed = []
-        zone = pytz.timezone(settings.TIME_ZONE)
-        for install in user.installed_set.filter(addon__type=amo.ADDON_WEBAPP):
-            try:
-                app = install.addon
-            except Addon.DoesNotExist:
-                continue
-
-            installed.append({
-                'id': app.id,
-                'slug': app.app_slug,
-                'installed': pytz.utc.normalize(
-                    zone.localize(install.created)).strftime(
-                        '%Y-%m-%dT%H:%M:%S')
-            })
-
         data = {
             'user': hash,
             'region': user.region,
             'lang': user.lang,
-            'installed_apps': installed,
+            'installed_apps': installed[user.pk],
         }
 
         task_log.info('Dumping user {0} to {1}'.format(user.id, target_file))
@@ -534,17 +880,14 @@ def zip_users(*args, **kw):
         os.makedirs(target_dir)
 
     # Put some .txt files in place.
-    context = Context({'date': today, 'url': settings.SITE_URL})
-    files = ['license.txt', 'readme.txt']
-    for f in files:
-        template = loader.get_template('webapps/dump/users/' + f)
+    for f, content in render_extra_files(today, directory='users'):
         dest = os.path.join(settings.DUMPED_USERS_PATH, 'users', f)
-        open(dest, 'w').write(template.render(context))
+        open(dest, 'w').write(content)
 
-    cmd = ['tar', 'czf', target_file, '-C',
-           settings.DUMPED_USERS_PATH, 'users']
     task_log.info(u'Creating user dump {0}'.format(target_file))
-    subprocess.call(cmd)
+    with tarfile.open(target_file, 'w:gz') as tar:
+        tar.add(os.path.join(settings.DUMPED_USERS_PATH, 'users'),
+                arcname='users')
     return target_file
 
 
@@ -627,53 +970,81 @@ def import_manifests(ids, **kw):
                               '%s: %s' % (app.id, version.id, e))
 
 
-def _get_trending(app_id, region=None):
-    """
-    Calculate trending.
+def _date_range(start, end):
+    return {'range': {'date': {'gte': start.date().strftime('%Y-%m-%d'),
+                               'lte': end.date().strftime('%Y-%m-%d')}}}
 
-    a = installs from 7 days ago to now
-    b = installs from 28 days ago to 8 days ago, averaged per week
 
-    trending = (a - b) / b if a > 100 and b > 1 else 0
+def _installs_aggs(ranges, by_region):
+    """
+    Returns aggregations summing the installs of each app for each of the
+    `ranges` of dates, given as (start, end) tuples or None for all dates.
+    """
+    installs = {'installs': {'sum': {'field': 'app_installs'}}}
+    aggs = {}
+    for name, date_range in ranges.items():
+        agg = dict(installs)
+        if by_region:
+            # A size of 0 returns all the regions.
+            agg['regions'] = {'terms': {'field': 'region', 'size': 0},
+                              'aggs': installs}
+        aggs[name] = {
+            'filter': (_date_range(*date_range) if date_range
+                       else {'match_all': {}}),
+            'aggs': agg}
+    return aggs
+
+
+def _get_installs(app_ids, by_region=False, **ranges):
+    """
+    Fetches the installs of all the apps from monolith in one query.
+
+    Returns a dict of {app_id: {range name: {region slug: installs}}}, where
+    the region slug is None for the installs across all regions. Regions are
+    only included if `by_region` is True.
 
     """
     client = get_monolith_client()
+    query = {
+        'query': {'filtered': {
+            'query': {'match_all': {}},
+            'filter': {'terms': {'app-id': list(app_ids)}}}},
+        'aggs': {
+            'apps': {
+                'terms': {'field': 'app-id', 'size': len(app_ids)},
+                'aggs': _installs_aggs(ranges, by_region)}},
+        'size': 0}
+
+    resp = client.raw(query)
+    installs = {}
+    for app in resp.get('aggregations', {}).get('apps', {}).get('buckets', []):
+        counts = installs.setdefault(int(app['key']), {})
+        for name in ranges:
+            agg = app.get(name, {})
+            by_slug = counts[name] = {
+                None: agg.get('installs', {}).get('value') or 0}
+            for region in agg.get('regions', {}).get('buckets', []):
+                by_slug[region['key']] = (
+                    region.get('installs', {}).get('value') or 0)
+    return installs
+
+
+def _get_trending(week, prior):
+    """
+    Calculate trending.
 
-    kwargs = {'app-id': app_id}
-    if region:
-        kwargs['region'] = region.slug
-
-    today = datetime.datetime.today()
+    a = installs from 7 days ago to now (`week`)
+    b = installs from 28 days ago to 8 days ago (`prior`), averaged per week
 
-    # If we query monolith with interval=week and the past 7 days
-    # crosses a Monday, Monolith splits the counts into two. We want
-    # the sum over the past week so we need to `sum` these.
-    try:
-        count_1 = sum(
-            c['count'] for c in
-            client('app_installs', days_ago(7), today, 'week', **kwargs)
-            if c.get('count'))
-    except ValueError as e:
-        task_log.info('Call to ES failed: {0}'.format(e))
-        count_1 = 0
+    trending = (a - b) / b if a > 100 and b > 1 else 0
 
-    # If count_1 isn't more than 100, stop here to avoid extra Monolith calls.
-    if not count_1 > 100:
+    """
+    if not week > 100:
         return 0.0
-
-    # Get the average installs for the prior 3 weeks. Don't use the `len` of
-    # the returned counts because of week boundaries.
-    try:
-        count_3 = sum(
-            c['count'] for c in
-            client('app_installs', days_ago(28), days_ago(8), 'week', **kwargs)
-            if c.get('count')) / 3
-    except ValueError as e:
-        task_log.info('Call to ES failed: {0}'.format(e))
-        count_3 = 0
-
-    if count_3 > 1:
-        return (count_1 - count_3) / count_3
+    # Get the average installs for the prior 3 weeks.
+    prior = prior / 3.0
+    if prior > 1:
+        return (week - prior) / prior
     else:
         return 0.0
 
@@ -681,112 +1052,73 @@ def _get_trending(app_id, region=None):
 @task
 @write
 def update_trending(ids, **kw):
-    count = 0
-    times = []
-
-    for app in Webapp.objects.filter(id__in=ids).no_transforms():
-
-        count += 1
-        t_start = time.time()
-
-        # Calculate global trending, then per-region trending below.
-        value = _get_trending(app.id)
-        if value:
-            trending, created = app.trending.get_or_create(
-                region=0, defaults={'value': value})
-            if not created:
-                trending.update(value=value)
-
-        for region in mkt.regions.REGIONS_DICT.values():
-            value = _get_trending(app.id, region)
+    t_start = time.time()
+    try:
+        installs = _get_installs(ids, by_region=True,
+                                 week=(days_ago(7), days_ago(0)),
+                                 prior=(days_ago(28), days_ago(8)))
+    except Exception as e:
+        task_log.info('Call to ES failed: {0}'.format(e))
+        installs = {}
+
+    # Calculate global trending (region 0), then per-region trending.
+    regions = [(None, 0)] + [(region.slug, region.id) for region in
+                             mkt.regions.REGIONS_DICT.values()]
+    values = {}
+    for app_id, counts in installs.items():
+        for slug, region_id in regions:
+            value = _get_trending(counts['week'].get(slug, 0),
+                                  counts['prior'].get(slug, 0))
             if value:
-                trending, created = app.trending.get_or_create(
-                    region=region.id, defaults={'value': value})
-                if not created:
-                    trending.update(value=value)
-
-        times.append(time.time() - t_start)
-
-    task_log.info('Trending calculated for %s apps. Avg time overall: '
-                  '%0.2fs' % (count, sum(times) / count))
+                values[(app_id, region_id)] = value
+
+    # Write the values back, creating all the missing ones at once.
+    existing = dict(((t.addon_id, t.region), t) for t in
+                    Trending.objects.no_cache().filter(addon__in=ids))
+    created = []
+    for (app_id, region_id), value in values.items():
+        trending = existing.get((app_id, region_id))
+        if trending is None:
+            created.append(Trending(addon_id=app_id, region=region_id,
+                                    value=value))
+        elif trending.value != value:
+            trending.update(value=value, _signal=False)
+    if created:
+        Trending.objects.bulk_create(created)
+
+    task_log.info('Trending calculated for %s apps in %0.2fs.'
+                  % (len(ids), time.time() - t_start))
 
 
 @task
 @write
 def update_downloads(ids, **kw):
-    client = get_monolith_client()
-    count = 0
+    try:
+        installs = _get_installs(ids, weekly=(days_ago(8), days_ago(1)),
+                                 total=None)
+    except Exception as e:
+        task_log.info('Call to ES failed: {0}'.format(e))
+        installs = {}
 
+    count = 0
+    reindex = []
     for app in Webapp.objects.filter(id__in=ids).no_transforms():
+        counts = installs.get(app.id, {})
+        weekly = int(counts.get('weekly', {}).get(None, 0))
+        total = int(counts.get('total', {}).get(None, 0))
 
-        appid = {'app-id': app.id}
-
-        # Get weekly downloads.
-        query = {
-            'query': {'match_all': {}},
-            'facets': {
-                'installs': {
-                    'date_histogram': {
-                        'value_field': 'app_installs',
-                        'interval': 'week',
-                        'key_field': 'date',
-                    },
-                    'facet_filter': {
-                        'and': [
-                            {'term': appid},
-                            {'range': {'date': {
-                                'gte': days_ago(8).date().strftime('%Y-%m-%d'),
-                                'lte': days_ago(1).date().strftime('%Y-%m-%d'),
-                            }}}
-                        ]
-                    }
-                }
-            },
-            'size': 0}
-
-        try:
-            resp = client.raw(query)
-            # If we query monolith with interval=week and the past 7 days
-            # crosses a Monday, Monolith splits the counts into two. We want
-            # the sum over the past week so we need to `sum` these.
-            weekly = sum(
-                c['total'] for c in
-                resp.get('facets', {}).get('installs', {}).get('entries')
-                if c.get('total'))
-        except Exception as e:
-            task_log.info('Call to ES failed: {0}'.format(e))
-            weekly = 0
-
-        # Get total downloads.
-        query = {'query': {'match_all': {}},
-                 'facets': {
-                     'installs': {
-                         'statistical': {'field': 'app_installs'},
-                         'facet_filter': {'term': appid}}},
-                 'size': 0}
-        try:
-            resp = client.raw(query)
-            total = resp.get('facets', {}).get('installs', {}).get('total', 0)
-        except Exception as e:
-            task_log.info('Call to ES failed: {0}'.format(e))
-            total = 0
-
-        # Update Webapp object, if needed.
-        update = False
-        signal = False
+        # Since we only index `weekly_downloads`, we can skip reindexing if
+        # this hasn't changed.
         if weekly != app.weekly_downloads:
-            update = True
-            signal = True
-        if total != app.total_downloads:
-            update = True
-
-        if update:
-            # Note: Calling `update` will trigger a reindex on the app if
-            # `_signal` is True. Since we only index `weekly_downloads`, we
-            # can skip reindexing if this hasn't changed.
+            reindex.append(app.id)
+        if weekly != app.weekly_downloads or total != app.total_downloads:
             count += 1
             app.update(weekly_downloads=weekly, total_downloads=total,
-                       _signal=signal)
+                       _signal=False)
+
+    # Reindex all the apps that need it together.
+    if reindex:
+        WebappIndexer.index_ids(reindex)
 
     task_log.info('App downloads updated for %s out of %s apps.'
                   % (count, len(ids)))
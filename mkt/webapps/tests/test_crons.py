@@ -1,14 +1,14 @@
 # -*- coding: utf-8 -*-
 import os
 import time
-from datetime import date, datetime, timedelta
+from datetime import datetime, timedelta
 
 from django.conf import settings
 from django.core.files.storage import default_storage as storage
 from django.core.management import call_command
 
 import mock
-from nose.tools import eq_
+from nose.tools import eq_, ok_
 
 import amo
 import amo.tests
@@ -46,6 +46,37 @@ class TestLastUpdated(amo.tests.TestCase):
         for addon in Addon.objects.filter(status=amo.STATUS_PUBLIC):
             eq_(addon.last_updated, addon.created)
 
+    def test_file_status(self):
+        app = amo.tests.app_factory()
+        last_updated = Webapp.objects.no_cache().get(pk=app.pk).last_updated
+        version = amo.tests.version_factory(
+            addon=app, created=datetime(2030, 1, 1),
+            file_kw={'status': amo.STATUS_PENDING})
+        eq_(Webapp.objects.no_cache().get(pk=app.pk).last_updated,
+            last_updated)
+        version.all_files[0].update(status=amo.STATUS_PUBLIC)
+        eq_(Webapp.objects.no_cache().get(pk=app.pk).last_updated,
+            version.created)
+
+    @mock.patch('mkt.webapps.tasks.statsd')
+    def test_drift(self, statsd):
+        app = amo.tests.app_factory()
+        last_updated = Webapp.objects.no_cache().get(pk=app.pk).last_updated
+        Addon.objects.filter(pk=app.pk).update(
+            last_updated=datetime.now() - timedelta(days=10))
+        cron.addon_last_updated()
+        eq_(Webapp.objects.no_cache().get(pk=app.pk).last_updated,
+            last_updated)
+        statsd.incr.assert_any_call('webapps.last_updated.changed', 1)
+        # Apps not touched recently are not checked.
+        statsd.reset_mock()
+        Addon.objects.update(modified=datetime.now() - timedelta(days=1))
+        Version.with_deleted.update(
+            modified=datetime.now() - timedelta(days=1))
+        File.objects.update(modified=datetime.now() - timedelta(days=1))
+        cron.addon_last_updated()
+        assert not statsd.incr.called
+
 
 class TestHideDisabledFiles(amo.tests.TestCase):
     fixtures = fixture('webapp_337141')
@@ -120,6 +151,24 @@ class TestHideDisabledFiles(amo.tests.TestCase):
         assert not mv_mock.called, mv_mock.call_args
 
 
+def installs_response(apps):
+    """
+    Builds a monolith aggregations response from {app_id: {range name:
+    {region slug: installs}}}, with None as the slug across all regions.
+    """
+    buckets = []
+    for app_id, ranges in apps.items():
+        bucket = {'key': app_id}
+        for name, counts in ranges.items():
+            bucket[name] = {
+                'installs': {'value': counts.get(None, 0)},
+                'regions': {'buckets': [
+                    {'key': slug, 'installs': {'value': value}}
+                    for slug, value in counts.items() if slug]}}
+        buckets.append(bucket)
+    return {'aggregations': {'apps': {'buckets': buckets}}}
+
+
 class TestWeeklyDownloads(amo.tests.TestCase):
 
     def setUp(self):
@@ -129,55 +178,52 @@ class TestWeeklyDownloads(amo.tests.TestCase):
     def get_app(self):
         return Webapp.objects.get(pk=self.app.pk)
 
+    @mock.patch('mkt.webapps.tasks.WebappIndexer.index_ids')
     @mock.patch('mkt.webapps.tasks.get_monolith_client')
-    def test_weekly_downloads(self, _mock):
+    def test_downloads(self, _mock, index_ids):
         client = mock.Mock()
-        raw = {
-            'facets': {
-                'installs': {
-                    '_type': 'date_histogram',
-                    'entries': [
-                        {'count': 3,
-                         'time': 1390780800000,
-                         'total': 19.0},
-                        {'count': 62,
-                         'time': 1391385600000,
-                         'total': 236.0}
-                    ]
-                }
-            }
-        }
-        client.raw.return_value = raw
+        client.raw.return_value = installs_response({
+            self.app.pk: {'weekly': {None: 255.0}, 'total': {None: 6638.0}}})
         _mock.return_value = client
 
         eq_(self.app.weekly_downloads, 0)
+        eq_(self.app.total_downloads, 0)
 
         update_downloads([self.app.pk])
 
         self.app.reload()
         eq_(self.app.weekly_downloads, 255)
+        eq_(self.app.total_downloads, 6638)
+        index_ids.assert_called_once_with([self.app.pk])
 
     @mock.patch('mkt.webapps.tasks.get_monolith_client')
-    def test_total_downloads(self, _mock):
+    def test_one_query(self, _mock):
         client = mock.Mock()
-        raw = {
-            'facets': {
-                'installs': {
-                    u'_type': u'statistical',
-                    u'count': 49,
-                    u'total': 6638.0
-                }
-            }
-        }
-        client.raw.return_value = raw
+        client.raw.return_value = installs_response({})
         _mock.return_value = client
+        other = Webapp.objects.create(type=amo.ADDON_WEBAPP,
+                                      status=amo.STATUS_PUBLIC)
 
-        eq_(self.app.total_downloads, 0)
+        update_downloads([self.app.pk, other.pk])
+
+        eq_(client.raw.call_count, 1)
+        query = client.raw.call_args[0][0]
+        eq_(query['query']['filtered']['filter'],
+            {'terms': {'app-id': [self.app.pk, other.pk]}})
+        eq_(sorted(query['aggs']['apps']['aggs']), ['total', 'weekly'])
+
+    @mock.patch('mkt.webapps.tasks.WebappIndexer.index_ids')
+    @mock.patch('mkt.webapps.tasks.get_monolith_client')
+    def test_total_only_not_reindexed(self, _mock, index_ids):
+        client = mock.Mock()
+        client.raw.return_value = installs_response({
+            self.app.pk: {'weekly': {None: 0}, 'total': {None: 10.0}}})
+        _mock.return_value = client
 
         update_downloads([self.app.pk])
 
-        self.app.reload()
-        eq_(self.app.total_downloads, 6638)
+        eq_(self.get_app().total_downloads, 10)
+        assert not index_ids.called
 
     @mock.patch('mkt.webapps.tasks.get_monolith_client')
     def test_monolith_error(self, _mock):
@@ -252,55 +298,69 @@ class TestUpdateTrending(amo.tests.TestCase):
         self.app = Webapp.objects.create(type=amo.ADDON_WEBAPP,
                                          status=amo.STATUS_PUBLIC)
 
-    @mock.patch('mkt.webapps.tasks._get_trending')
+    def mock_installs(self, _mock, week, prior):
+        """Mocks the same installs in all the regions."""
+        regions = [None] + [r.slug for r in mkt.regions.REGIONS_DICT.values()]
+        client = mock.Mock()
+        client.raw.return_value = installs_response({self.app.pk: {
+            'week': dict((slug, week) for slug in regions),
+            'prior': dict((slug, prior) for slug in regions)}})
+        _mock.return_value = client
+        return client
+
+    @mock.patch('mkt.webapps.tasks.get_monolith_client')
     def test_trending_saved(self, _mock):
-        _mock.return_value = 12.0
+        # 1st week count: 255
+        # Prior 3 weeks get averaged: 255 / 3 = 85
+        # (255 - 85) / 85 = 2.0
+        client = self.mock_installs(_mock, 255.0, 255.0)
         update_app_trending()
+        eq_(client.raw.call_count, 1)
 
-        eq_(self.app.get_trending(), 12.0)
+        eq_(self.app.get_trending(), 2.0)
         for region in mkt.regions.REGIONS_DICT.values():
-            eq_(self.app.get_trending(region=region), 12.0)
+            eq_(self.app.get_trending(region=region), 2.0)
 
         # Test running again updates the values as we'd expect.
-        _mock.return_value = 2.0
+        # (400 - 100) / 100 = 3.0
+        self.mock_installs(_mock, 400.0, 100.0 * 3)
         update_app_trending()
-        eq_(self.app.get_trending(), 2.0)
+        eq_(self.app.get_trending(), 3.0)
         for region in mkt.regions.REGIONS_DICT.values():
-            eq_(self.app.get_trending(region=region), 2.0)
+            eq_(self.app.get_trending(region=region), 3.0)
 
     @mock.patch('mkt.webapps.tasks.get_monolith_client')
-    def test_get_trending(self, _mock):
+    def test_trending_regions(self, _mock):
         client = mock.Mock()
-        client.return_value = [
-            {'count': 133.0, 'date': date(2013, 8, 26)},
-            {'count': 122.0, 'date': date(2013, 9, 2)},
-        ]
+        client.raw.return_value = installs_response({self.app.pk: {
+            'week': {None: 255.0, 'br': 400.0},
+            'prior': {None: 255.0, 'br': 300.0}}})
         _mock.return_value = client
+        update_app_trending()
+        eq_(self.app.get_trending(), 2.0)
+        eq_(self.app.trending.get(region=mkt.regions.BR.id).value, 3.0)
+        ok_(not self.app.trending.filter(region=mkt.regions.US.id).exists())
 
-        # 1st week count: 133 + 122 = 255
-        # Prior 3 weeks get averaged: (133 + 122) / 3 = 85
+    def test_get_trending(self):
+        # 1st week count: 255
+        # Prior 3 weeks get averaged: 255 / 3 = 85
         # (255 - 85) / 85 = 2.0
-        eq_(_get_trending(self.app.id), 2.0)
-
-    @mock.patch('mkt.webapps.tasks.get_monolith_client')
-    def test_get_trending_threshold(self, _mock):
-        client = mock.Mock()
-        client.return_value = [
-            {'count': 49.0, 'date': date(2013, 8, 26)},
-            {'count': 50.0, 'date': date(2013, 9, 2)},
-        ]
-        _mock.return_value = client
+        eq_(_get_trending(255.0, 255.0), 2.0)
 
-        # 1st week count: 49 + 50 = 99
+    def test_get_trending_threshold(self):
         # 99 is less than 100 so we return 0.0.
-        eq_(_get_trending(self.app.id), 0.0)
+        eq_(_get_trending(99.0, 10.0), 0.0)
+
+    def test_get_trending_no_prior(self):
+        eq_(_get_trending(255.0, 3.0), 0.0)
 
     @mock.patch('mkt.webapps.tasks.get_monolith_client')
-    def test_get_trending_monolith_error(self, _mock):
+    def test_trending_monolith_error(self, _mock):
         client = mock.Mock()
-        client.side_effect = ValueError
+        client.raw.side_effect = ValueError
         _mock.return_value = client
-        eq_(_get_trending(self.app.id), 0.0)
+        update_app_trending()
+        eq_(self.app.get_trending(), 0)
 
 
 @mock.patch('os.stat')
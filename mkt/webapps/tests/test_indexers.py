@@ -1,4 +1,8 @@
 # -*- coding: utf-8 -*-
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+import mock
 from nose.tools import eq_, ok_
 
 import amo.tests
@@ -155,3 +159,44 @@ class TestWebappIndexer(amo.tests.TestCase):
             {'lang': 'en-US', 'string': release_notes['en-US']})
         eq_(doc['release_notes_translations'][1],
             {'lang': 'fr', 'string': release_notes['fr']})
+
+    def test_extract_documents(self):
+        app2 = amo.tests.app_factory()
+        EscalationQueue.objects.create(addon=app2)
+        objs = list(Webapp.objects.no_cache().filter(
+            id__in=[self.app.pk, app2.pk]).order_by('id'))
+        docs = WebappIndexer.extract_documents(objs)
+        eq_([d['id'] for d in docs], [self.app.pk, app2.pk])
+        for obj, doc in zip(objs, docs):
+            eq_(doc, WebappIndexer.extract_document(obj.pk))
+        eq_(docs[1]['is_escalated'], True)
+
+    def test_extract_documents_queries(self):
+        def num_queries(objs):
+            with CaptureQueriesContext(connection) as ctx:
+                WebappIndexer.extract_documents(objs)
+            return len(ctx)
+
+        one = num_queries(
+            list(Webapp.objects.no_cache().filter(id=self.app.pk)))
+        for i in range(3):
+            amo.tests.app_factory()
+        # The number of queries doesn't depend on the number of apps.
+        eq_(num_queries(list(Webapp.objects.no_cache().all())), one)
+
+    def test_extract_documents_failure(self):
+        objs = list(Webapp.objects.no_cache().filter(id=self.app.pk))
+        objs[0].get_manifest_url = lambda: 1 / 0
+        eq_(WebappIndexer.extract_documents(objs), [])
+
+    @mock.patch('mkt.webapps.models.Webapp.get_manifest_json')
+    def test_extract_documents_manifest_failure(self, get_manifest_json):
+        other = amo.tests.app_factory()
+        broken = amo.tests.app_factory()
+        get_manifest_json.side_effect = (
+            lambda file_obj: (1 / 0 if file_obj.version.addon_id == broken.pk
+                              else {}))
+        objs = list(Webapp.objects.no_cache().filter(
+            id__in=[self.app.pk, other.pk, broken.pk]).order_by('id'))
+        docs = WebappIndexer.extract_documents(objs)
+        eq_(sorted(doc['id'] for doc in docs), sorted([self.app.pk, other.pk]))
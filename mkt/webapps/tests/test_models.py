@@ -55,8 +55,9 @@ from mkt.versions.models import update_status, Version
 from mkt.webapps.indexers import WebappIndexer
 from mkt.webapps.models import (Addon, AddonDeviceType, AddonExcludedRegion,
                                 AddonUpsell, AppFeatures, AppManifest,
-                                BlacklistedSlug, ContentRating, Geodata,
-                                get_excluded_in, IARCInfo, Installed, Preview,
+                                BlacklistedSlug, build_exclusion_masks,
+                                ContentRating, Geodata, get_excluded_in,
+                                IARCInfo, Installed, mask_region_ids, Preview,
                                 RatingDescriptors, RatingInteractives,
                                 version_changed, Webapp)
 from mkt.webapps.signals import version_changed as version_changed_signal
@@ -1436,6 +1437,45 @@ class TestExclusions(amo.tests.TestCase):
         ok_(mkt.regions.BR.id in excluded)
         ok_(mkt.regions.DE.id in excluded)
 
+    def test_premium_no_tier(self):
+        eq_(self.app.get_excluded_region_ids(), mkt.regions.ALL_REGION_IDS)
+
+    def test_build_masks(self):
+        self.make_tier()
+        free = app_factory()
+        free._geodata.update(region_br_iarc_exclude=True)
+        with self.assertNumQueries(3):
+            masks = build_exclusion_masks([self.app.id, free.id])
+        eq_(mask_region_ids(masks[free.id]), [mkt.regions.BR.id])
+        paid = set(self.app.get_price_region_ids())
+        eq_(mask_region_ids(masks[self.app.id]),
+            sorted((set(mkt.regions.ALL_REGION_IDS) - paid) |
+                   set([mkt.regions.US.id])))
+
+    def test_cached(self):
+        self.make_tier()
+        excluded = self.app.get_excluded_region_ids()
+        with self.assertNumQueries(0):
+            eq_(self.app.get_excluded_region_ids(), excluded)
+
+    def test_cleaned(self):
+        self.make_tier()
+        ok_(mkt.regions.US.id in self.app.get_excluded_region_ids())
+        self.app.addonexcludedregion.all().delete()
+        ok_(mkt.regions.US.id not in self.app.get_excluded_region_ids())
+        self.geodata.update(region_de_usk_exclude=True)
+        ok_(mkt.regions.DE.id in self.app.get_excluded_region_ids())
+        price = self.price.pricecurrency_set.get(region=mkt.regions.PL.id)
+        price.update(paid=False)
+        ok_(mkt.regions.PL.id in self.app.get_excluded_region_ids())
+
+    def test_excluded_in_cleaned(self):
+        eq_(get_excluded_in(mkt.regions.BR.id), set())
+        aer = self.app.addonexcludedregion.create(region=mkt.regions.BR.id)
+        eq_(get_excluded_in(mkt.regions.BR.id), set([self.app.id]))
+        aer.delete()
+        eq_(get_excluded_in(mkt.regions.BR.id), set())
+
 
 class TestPackagedAppManifestUpdates(amo.tests.TestCase):
     # Note: More extensive tests for `.update_names` are above.
@@ -1,10 +1,16 @@
 # -*- coding: utf-8 -*-
+import BaseHTTPServer
 import datetime
+import gzip
 import hashlib
 import json
 import os
+import SocketServer
 import stat
 import tarfile
+import threading
+import time
+import zipfile
 from copy import deepcopy
 from tempfile import mkdtemp
 
@@ -28,9 +34,11 @@ from mkt.site.fixtures import fixture
 from mkt.users.models import UserProfile
 from mkt.versions.models import Version
 from mkt.webapps.models import Addon, AddonUser, Preview, Webapp
-from mkt.webapps.tasks import (dump_app, dump_user_installs, export_data,
+from mkt.webapps.tasks import (crawl_manifests, dump_app, dump_user_installs,
+                               export_data, get_last_export,
                                notify_developers_of_failure, pre_generate_apk,
-                               PreGenAPKError, rm_directory, update_manifests,
+                               PreGenAPKError, rm_directory,
+                               set_manifest_validators, update_manifests,
                                zip_apps)
 
 
@@ -256,6 +264,34 @@ class TestUpdateManifest(amo.tests.TestCase):
         eq_(retry.call_args[1]['max_retries'], 5)
         eq_(len(mail.outbox), 0)
 
+    def test_not_modified(self):
+        self.response_mock.headers['etag'] = '"abc"'
+        self._hash = ohash
+        self._run()
+        self.response_mock.status_code = 304
+        self._hash = 'foo'
+        self._run()
+        eq_(self.req_mock.call_args[1]['headers']['If-None-Match'], '"abc"')
+        eq_(self.addon.versions.count(), 1)
+        eq_(ActivityLog.objects.for_apps([self.addon]).count(), 0)
+
+    def test_not_modified_other_file(self):
+        self.response_mock.headers['etag'] = '"abc"'
+        self._hash = ohash
+        self._run()
+        # The manifest the validators were sent with is not the current file
+        # any more, fetch it again.
+        self.file.update(hash='foo')
+        self._run()
+        ok_('If-None-Match' not in self.req_mock.call_args[1]['headers'])
+
+    def test_not_modified_no_check_hash(self):
+        self.response_mock.headers['etag'] = '"abc"'
+        self._hash = ohash
+        self._run()
+        self._run(check_hash=False)
+        ok_('If-None-Match' not in self.req_mock.call_args[1]['headers'])
+
     def test_notify_failure_lang(self):
         user1 = UserProfile.objects.get(pk=999)
         user2 = UserProfile.objects.get(pk=2519)
@@ -504,6 +540,98 @@ class TestUpdateManifest(amo.tests.TestCase):
         ok_(_iarc.called)
 
 
+class ManifestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Serves a manifest slowly, counting the requests in flight."""
+    delay = 0.1
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+
+    def do_GET(self):
+        cls = ManifestHandler
+        with cls.lock:
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        try:
+            time.sleep(self.delay)
+            if self.headers.get('If-None-Match') == '"v1"':
+                self.send_response(304)
+                self.send_header('ETag', '"v1"')
+                self.end_headers()
+                return
+            content = json.dumps(original)
+            self.send_response(200)
+            self.send_header('Content-Type',
+                             'application/x-web-app-manifest+json')
+            self.send_header('Content-Length', str(len(content)))
+            self.send_header('ETag', '"v1"')
+            self.end_headers()
+            self.wfile.write(content)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCrawlManifests(amo.tests.TestCase):
+
+    def setUp(self):
+        ManifestHandler.max_active = 0
+        self.server = SocketServer.ThreadingTCPServer(('127.0.0.1', 0),
+                                                      ManifestHandler)
+        self.server.daemon_threads = True
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.apps = [amo.tests.app_factory(
+            manifest_url='http://127.0.0.1:%s/%s/manifest.webapp'
+                         % (self.server.server_address[1], i))
+            for i in range(8)]
+        self.ids = [app.pk for app in self.apps]
+
+    def test_crawl(self):
+        fetched = crawl_manifests(self.ids)
+        eq_(sorted(fetched), sorted(self.ids))
+        for result in fetched.values():
+            eq_(json.loads(result.content), original)
+            eq_(result.validators['etag'], '"v1"')
+
+    def test_not_modified(self):
+        for app in self.apps:
+            set_manifest_validators(app.pk, {'etag': '"v1"'}, 'hash')
+        fetched = crawl_manifests(self.ids)
+        eq_([result.content for result in fetched.values()], [None] * 8)
+
+    def test_failure(self):
+        self.apps[0].update(manifest_url='http://127.0.0.1:1/manifest.webapp')
+        fetched = crawl_manifests(self.ids)
+        assert isinstance(fetched[self.apps[0].pk], Exception)
+        eq_(json.loads(fetched[self.apps[1].pk].content), original)
+
+    def test_per_host(self):
+        with self.settings(MANIFEST_CRAWL_WORKERS=8,
+                           MANIFEST_CRAWL_PER_HOST=2):
+            crawl_manifests(self.ids)
+        eq_(ManifestHandler.max_active, 2)
+
+    def test_throughput(self):
+        start = time.time()
+        with self.settings(MANIFEST_CRAWL_WORKERS=1):
+            crawl_manifests(self.ids)
+        serial = time.time() - start
+        start = time.time()
+        with self.settings(MANIFEST_CRAWL_WORKERS=8,
+                           MANIFEST_CRAWL_PER_HOST=8):
+            crawl_manifests(self.ids)
+        concurrent = time.time() - start
+        ok_(concurrent < serial / 3,
+            'Crawling took %.2fs, %.2fs serially.' % (concurrent, serial))
+
+
 class TestDumpApps(amo.tests.TestCase):
     fixtures = fixture('webapp_337141')
 
@@ -590,6 +718,13 @@ class TestDumpUserInstalls(amo.tests.TestCase):
         installed = data['installed_apps'][0]
         eq_(installed['id'], self.app.id)
 
+    def test_dump_queries(self):
+        other = UserProfile.objects.create(email='other@example.com')
+        amo.tests.app_factory().installed.create(user=other)
+        # The users, then the installs of the whole chunk.
+        with self.assertNumQueries(2):
+            dump_user_installs([self.user.pk, other.pk])
+
 
 class TestFixMissingIcons(amo.tests.TestCase):
     fixtures = fixture('webapp_337141')
@@ -694,9 +829,9 @@ class TestExportData(amo.tests.TestCase):
     def tearDown(self):
         rm_directory(self.export_directory)
 
-    def create_export(self, name):
+    def create_export(self, name, **kw):
         with self.settings(DUMPED_APPS_PATH=self.export_directory):
-            export_data(name=name)
+            export_data(name=name, **kw)
         tarball_path = os.path.join(self.export_directory,
                                     'tarballs',
                                     name + '.tgz')
@@ -719,3 +854,37 @@ class TestExportData(amo.tests.TestCase):
         collection_file = tarball.extractfile(self.collection_path)
         collection_data = json.loads(collection_file.read())
         eq_(collection_data['apps'][0]['filepath'], self.app_path)
+
+    def test_parts_removed(self):
+        self.create_export('tarball-name')
+        ok_(not os.path.exists(os.path.join(self.export_directory, 'parts',
+                                            'tarball-name')))
+
+    def test_since(self):
+        since = datetime.datetime.now() + datetime.timedelta(days=1)
+        tarball = self.create_export('tarball-name', since=since)
+        eq_(sorted(tarball.getnames()), ['license.txt', 'readme.txt'])
+
+    def test_last_export(self):
+        with self.settings(DUMPED_APPS_PATH=self.export_directory):
+            eq_(get_last_export(), None)
+            export_data(name='tarball-name')
+            self.assertCloseToNow(get_last_export())
+
+    def test_zip(self):
+        with self.settings(DUMPED_APPS_PATH=self.export_directory):
+            export_data(name='zip-name', format='zip')
+        archive = zipfile.ZipFile(os.path.join(self.export_directory,
+                                               'tarballs', 'zip-name.zip'))
+        eq_(json.loads(archive.read(self.app_path))['id'], 337141)
+        ok_('readme.txt' in archive.namelist())
+
+    def test_ndjson(self):
+        with self.settings(DUMPED_APPS_PATH=self.export_directory):
+            export_data(name='ndjson-name', format='ndjson')
+        lines = gzip.open(os.path.join(self.export_directory, 'tarballs',
+                                       'ndjson-name.ndjson.gz')).readlines()
+        entries = dict((entry['path'], entry['data'])
+                       for entry in map(json.loads, lines))
+        eq_(sorted(entries), [self.app_path, self.collection_path])
+        eq_(entries[self.app_path]['id'], 337141)
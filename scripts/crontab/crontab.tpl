@@ -27,6 +27,7 @@ HOME=/tmp
 00 9 * * * %(z_cron)s update_app_downloads --settings=settings_local_mkt
 45 9 * * * %(z_cron)s mkt_gc --settings=settings_local_mkt
 45 9 * * * %(z_cron)s clean_old_signed --settings=settings_local_mkt
+15 10 * * * %(z_cron)s reconcile_review_aggregates_cron --settings=settings_local_mkt
 45 10 * * * %(django)s process_addons --task=update_manifests --settings=settings_local_mkt
 45 11 * * * %(django)s export_data --settings=settings_local_mkt
 
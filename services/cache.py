@@ -0,0 +1,151 @@
+"""
+Caching for the receipt verifier.
+
+Decoded receipts are kept in a small in-process LRU cache and, when
+SERVICES_RECEIPT_CACHE_LOCATION is set, in memcached. The status of a
+purchase is only ever kept in memcached, so that the marketplace can
+invalidate it when the purchase is refunded or charged back.
+
+Invalidating a purchase replaces it with a tombstone for
+SERVICES_RECEIPT_CACHE_TOMBSTONE seconds rather than deleting it, and
+purchases are only ever added, so that a verifier that read the purchase
+before it was refunded can't cache it again afterwards.
+
+This module is imported by both the verifier and the marketplace, so it
+must not import Django or the services settings itself.
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    A thread safe, bounded, least recently used cache whose entries expire
+    after `timeout` seconds. A `size` of 0 disables the cache.
+    """
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            try:
+                expires, value = self.data.pop(key)
+            except KeyError:
+                return None
+            if expires < time.time():
+                return None
+            # Re-insert to mark as most recently used.
+            self.data[key] = (expires, value)
+            return value
+
+    def set(self, key, value):
+        if not self.size:
+            return
+        with self.lock:
+            self.data.pop(key, None)
+            self.data[key] = (time.time() + self.timeout, value)
+            while len(self.data) > self.size:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+# What an invalidated purchase is replaced with.
+INVALIDATED = 'invalidated'
+
+
+def decoded_key(receipt):
+    return 'receipt:decoded:%s' % hashlib.sha256(receipt).hexdigest()
+
+
+def app_purchase_key(app_id, uuid):
+    # The uuid comes from the receipt so hash it to keep the key memcached
+    # safe.
+    return 'receipt:purchase:app:%s:%s' % (
+        app_id, hashlib.md5(unicode(uuid).encode('utf-8')).hexdigest())
+
+
+def inapp_purchase_key(contribution_id):
+    return 'receipt:purchase:inapp:%s' % contribution_id
+
+
+class ReceiptCache(object):
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._local, self._local_config = None, None
+        self._client, self._client_config = None, None
+
+    @property
+    def local(self):
+        config = (self.settings.SERVICES_RECEIPT_CACHE_SIZE,
+                  self.settings.SERVICES_RECEIPT_CACHE_TIMEOUT)
+        if config != self._local_config:
+            self._local, self._local_config = LRUCache(*config), config
+        return self._local
+
+    @property
+    def client(self):
+        """The memcached client, or None if there is no shared cache."""
+        config = tuple(self.settings.SERVICES_RECEIPT_CACHE_LOCATION)
+        if config != self._client_config:
+            self._client = None
+            if config:
+                import memcache
+                self._client = memcache.Client(list(config))
+            self._client_config = config
+        return self._client
+
+    def get_decoded(self, receipt):
+        key = decoded_key(receipt)
+        decoded = self.local.get(key)
+        if decoded is None and self.client:
+            decoded = self.client.get(key)
+            if decoded is not None:
+                self.local.set(key, decoded)
+        # The verifier changes the expiry of expired receipts, don't let
+        # that leak into the cache.
+        return copy.deepcopy(decoded)
+
+    def set_decoded(self, receipt, decoded):
+        key = decoded_key(receipt)
+        decoded = copy.deepcopy(decoded)
+        self.local.set(key, decoded)
+        if self.client:
+            self.client.set(key, decoded,
+                            time=self.settings.SERVICES_RECEIPT_CACHE_TIMEOUT)
+
+    def get_purchases(self, keys):
+        """Returns a dict of the purchase keys found in the cache."""
+        if not self.client or not keys:
+            return {}
+        return dict((key, value) for key, value
+                    in self.client.get_multi(keys).items()
+                    if value != INVALIDATED)
+
+    def set_purchases(self, purchases):
+        """Caches the purchases that are neither cached nor invalidated."""
+        if self.client:
+            for key, value in purchases.items():
+                self.client.add(
+                    key, value,
+                    time=self.settings.SERVICES_RECEIPT_CACHE_TIMEOUT)
+
+    def delete_purchases(self, keys):
+        if self.client and keys:
+            self.client.set_multi(
+                dict.fromkeys(keys, INVALIDATED),
+                time=self.settings.SERVICES_RECEIPT_CACHE_TOMBSTONE)
@@ -14,6 +14,8 @@ from lib.cef_loggers import receipt_cef
 from lib.crypto.receipt import sign
 from lib.utils import static_url
 
+from services.cache import (app_purchase_key, inapp_purchase_key,
+                            ReceiptCache)
 from services.utils import settings
 
 from utils import (CONTRIB_CHARGEBACK, CONTRIB_NO_CHARGE, CONTRIB_PURCHASE,
@@ -26,8 +28,11 @@ log_configure()
 # This has to be imported after the settings (utils).
 import receipts  # NOQA, used for patching in the tests
 
+receipt_cache = ReceiptCache(settings)
+
 status_codes = {
     200: '200 OK',
+    400: '400 Bad Request',
     405: '405 Method Not Allowed',
     500: '500 Internal Server Error',
 }
@@ -58,16 +63,39 @@ class Verify:
         # This is so the unit tests can override the connection.
         self.conn, self.cursor = None, None
 
+        # BatchVerify sets these so that decoding and purchase lookups can
+        # be shared between all the receipts in a batch.
+        self.decoder = None
+        self.purchases = None
+
     def check_full(self):
         """
         This is the default that verify will use, this will
         do the entire stack of checks.
         """
+        try:
+            self.check_receipt()
+        except InvalidReceipt, err:
+            return self.invalid(str(err))
+
+        return self.check_full_purchase()
+
+    def check_receipt(self):
+        """
+        Decodes the receipt and checks its type and url, everything in
+        `check_full` that does not need the database.
+        """
         receipt_domain = urlparse(static_url('WEBAPPS_RECEIPT_URL')).netloc
+        self.decoded = self.decode()
+        self.check_type('purchase-receipt')
+        self.check_url(receipt_domain)
+
+    def check_full_purchase(self):
+        """
+        Checks the purchase of an already decoded receipt and returns
+        the status.
+        """
         try:
-            self.decoded = self.decode()
-            self.check_type('purchase-receipt')
-            self.check_url(receipt_domain)
             self.check_purchase()
         except InvalidReceipt, err:
             return self.invalid(str(err))
@@ -114,13 +142,19 @@ class Verify:
         If its invalid, then just return invalid rather than give out any
         information.
         """
-        try:
-            receipt = decode_receipt(self.receipt)
-        except:
-            log_exception({'receipt': '%s...' % self.receipt[:10],
-                           'app': self.get_app_id(raise_exception=False)})
-            log_info('Error decoding receipt')
-            raise InvalidReceipt('ERROR_DECODING')
+        receipt = receipt_cache.get_decoded(self.receipt)
+        if receipt is not None:
+            statsd.incr('services.verify.cache.decoded.hit')
+        else:
+            statsd.incr('services.verify.cache.decoded.miss')
+            try:
+                receipt = (self.decoder or decode_receipt)(self.receipt)
+            except:
+                log_exception({'receipt': '%s...' % self.receipt[:10],
+                               'app': self.get_app_id(raise_exception=False)})
+                log_info('Error decoding receipt')
+                raise InvalidReceipt('ERROR_DECODING')
+            receipt_cache.set_decoded(self.receipt, receipt)
 
         try:
             assert receipt['user']['type'] == 'directed-identifier'
@@ -243,14 +277,11 @@ class Verify:
         """
         Verifies that the inapp has been purchased.
         """
-        self.setup_db()
+        contribution_id = self.get_contribution_id()
         sql = """SELECT inapp_product_id, type FROM stats_contributions
                  WHERE id = %(contribution_id)s LIMIT 1;"""
-        self.cursor.execute(
-            sql,
-            {'contribution_id': self.get_contribution_id()}
-        )
-        result = self.cursor.fetchone()
+        result = self.fetch_purchase(inapp_purchase_key(contribution_id),
+                                     sql, {'contribution_id': contribution_id})
         if not result:
             log_info('Invalid receipt, no purchase')
             raise InvalidReceipt('NO_PURCHASE')
@@ -268,19 +299,40 @@ class Verify:
         """
         Verifies that the app has been purchased by the user.
         """
-        self.setup_db()
+        app_id, uuid = self.get_app_id(), self.get_user()
         sql = """SELECT type FROM addon_purchase
                  WHERE addon_id = %(app_id)s
                  AND uuid = %(uuid)s LIMIT 1;"""
-        self.cursor.execute(sql, {'app_id': self.get_app_id(),
-                                  'uuid': self.get_user()})
-        result = self.cursor.fetchone()
+        result = self.fetch_purchase(app_purchase_key(app_id, uuid),
+                                     sql, {'app_id': app_id, 'uuid': uuid})
         if not result:
             log_info('Invalid receipt, no purchase')
             raise InvalidReceipt('NO_PURCHASE')
 
         self.check_purchase_type(result[0])
 
+    def fetch_purchase(self, key, sql, params):
+        """
+        Returns the purchase row for the cache `key`, looking in the
+        purchases of the batch, then the cache and finally the database.
+        Purchases that are not found are not cached.
+        """
+        if self.purchases is not None:
+            return self.purchases.get(key)
+
+        result = receipt_cache.get_purchases([key]).get(key)
+        if result is not None:
+            statsd.incr('services.verify.cache.purchase.hit')
+            return result
+
+        statsd.incr('services.verify.cache.purchase.miss')
+        self.setup_db()
+        self.cursor.execute(sql, params)
+        result = self.cursor.fetchone()
+        if result:
+            receipt_cache.set_purchases({key: tuple(result)})
+        return result
+
     def check_purchase_type(self, purchase_type):
         """
         Verifies that the purchase type is of a valid type.
@@ -358,6 +410,144 @@ class Verify:
         return {'status': 'expired'}
 
 
+class BatchVerify:
+    """
+    Verifies a list of purchase receipts in one go. Identical receipts are
+    only decoded once, the receipt verifier and key are shared and the
+    purchases are looked up with a couple of `IN` queries per table rather
+    than one query per receipt.
+    """
+
+    def __init__(self, batch, environ):
+        self.environ = environ
+        self.verifiers = [Verify(receipt, environ) for receipt in batch]
+        self.purchases = {}
+        self.decoded = {}
+        self.verifier, self.key = None, None
+
+        # This is so the unit tests can override the connection.
+        self.conn, self.cursor = None, None
+
+        for verify in self.verifiers:
+            verify.decoder = self.decode
+            verify.purchases = self.purchases
+
+    def decode(self, receipt):
+        """
+        Decodes the receipt, remembering the result (or the error) so that
+        the same receipt sent twice in a batch is only cracked once.
+        """
+        if receipt not in self.decoded:
+            if settings.SIGNING_SERVER_ACTIVE:
+                if not self.verifier:
+                    self.verifier = certs.ReceiptVerifier(
+                        valid_issuers=settings.SIGNING_VALID_ISSUERS)
+            elif not self.key:
+                self.key = jwt.rsa_load(settings.WEBAPPS_RECEIPT_KEY)
+            try:
+                self.decoded[receipt] = decode_receipt(
+                    receipt, verifier=self.verifier, key=self.key)
+            except Exception, err:
+                self.decoded[receipt] = err
+
+        result = self.decoded[receipt]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def setup_db(self):
+        if not self.cursor:
+            self.conn = mypool.connect()
+            self.cursor = self.conn.cursor()
+
+    def check_full(self):
+        """
+        Runs `Verify.check_full` on each receipt and returns the results
+        in the same order as the receipts.
+        """
+        results = [None] * len(self.verifiers)
+        pending = []
+        for k, verify in enumerate(self.verifiers):
+            try:
+                verify.check_receipt()
+            except InvalidReceipt, err:
+                results[k] = verify.invalid(str(err))
+            else:
+                pending.append(k)
+
+        self.fetch_purchases([self.verifiers[k] for k in pending])
+
+        for k in pending:
+            results[k] = self.verifiers[k].check_full_purchase()
+        return results
+
+    def fetch_purchases(self, verifiers):
+        """
+        Looks up the purchases for all the decoded receipts and stores them
+        in `self.purchases`, where `Verify.check_purchase` will find them.
+        Purchases already in the cache are not queried again.
+        """
+        apps, contributions = {}, {}
+        for verify in verifiers:
+            try:
+                if 'contrib' in verify.get_storedata():
+                    pk = verify.get_contribution_id()
+                    contributions[inapp_purchase_key(pk)] = pk
+                else:
+                    app_id, uuid = verify.get_app_id(), verify.get_user()
+                    apps[app_purchase_key(app_id, uuid)] = (app_id, uuid)
+            except InvalidReceipt:
+                # This will be reported when the purchase is checked.
+                continue
+
+        cached = receipt_cache.get_purchases(apps.keys() +
+                                             contributions.keys())
+        statsd.incr('services.verify.cache.purchase.hit', len(cached))
+        self.purchases.update(cached)
+        apps = [v for k, v in apps.items() if k not in cached]
+        contributions = [v for k, v in contributions.items()
+                         if k not in cached]
+
+        found = {}
+        size = settings.WEBAPPS_RECEIPT_BATCH_QUERY_SIZE
+        if apps:
+            self.setup_db()
+            apps = sorted(apps)
+            for chunk in chunked(apps, size):
+                app_ids = sorted(set(app_id for app_id, uuid in chunk))
+                uuids = sorted(set(uuid for app_id, uuid in chunk))
+                sql = ("""SELECT addon_id, uuid, type FROM addon_purchase
+                          WHERE addon_id IN (%s) AND uuid IN (%s);"""
+                       % (placeholders(app_ids), placeholders(uuids)))
+                self.cursor.execute(sql, app_ids + uuids)
+                for app_id, uuid, purchase_type in self.cursor.fetchall():
+                    found.setdefault(app_purchase_key(app_id, uuid),
+                                     (purchase_type,))
+
+        if contributions:
+            self.setup_db()
+            for chunk in chunked(sorted(contributions), size):
+                sql = ("""SELECT id, inapp_product_id, type
+                          FROM stats_contributions WHERE id IN (%s);"""
+                       % placeholders(chunk))
+                self.cursor.execute(sql, chunk)
+                for pk, inapp_id, purchase_type in self.cursor.fetchall():
+                    found[inapp_purchase_key(pk)] = (inapp_id, purchase_type)
+
+        receipt_cache.set_purchases(found)
+        self.purchases.update(found)
+
+
+def chunked(seq, n):
+    """Yields successive lists of `n` items from `seq`."""
+    for k in range(0, len(seq), n):
+        yield list(seq[k:k + n])
+
+
+def placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
 def get_headers(length):
     return [('Access-Control-Allow-Origin', '*'),
             ('Access-Control-Allow-Methods', 'POST'),
@@ -367,15 +557,18 @@ def get_headers(length):
             ('Last-Modified', format_date_time(time()))]
 
 
-def decode_receipt(receipt):
+def decode_receipt(receipt, verifier=None, key=None):
     """
     Cracks the receipt using the private key. This will probably change
     to using the cert at some point, especially when we get the HSM.
+
+    :param verifier: an optional `ReceiptVerifier` to reuse.
+    :param key: an optional, already loaded, private key to reuse.
     """
     with statsd.timer('services.decode'):
         if settings.SIGNING_SERVER_ACTIVE:
-            verifier = certs.ReceiptVerifier(valid_issuers=
-                                             settings.SIGNING_VALID_ISSUERS)
+            verifier = verifier or certs.ReceiptVerifier(
+                valid_issuers=settings.SIGNING_VALID_ISSUERS)
             try:
                 result = verifier.verify(receipt)
             except ExpiredSignatureError:
@@ -385,7 +578,7 @@ def decode_receipt(receipt):
                 raise VerificationError()
             return jwt.decode(receipt.split('~')[1], verify=False)
         else:
-            key = jwt.rsa_load(settings.WEBAPPS_RECEIPT_KEY)
+            key = key or jwt.rsa_load(settings.WEBAPPS_RECEIPT_KEY)
             raw = jwt.decode(receipt, key)
     return raw
 
@@ -412,6 +605,9 @@ def receipt_check(environ):
     output = ''
     with statsd.timer('services.verify'):
         data = environ['wsgi.input'].read()
+        if data.lstrip().startswith('['):
+            # A JSON array of receipts, rather than a single receipt.
+            return batch_receipt_check(environ, data)
         try:
             verify = Verify(data, environ)
             return 200, json.dumps(verify.check_full())
@@ -421,6 +617,31 @@ def receipt_check(environ):
     return output
 
 
+def batch_receipt_check(environ, data):
+    try:
+        batch = json.loads(data)
+        assert isinstance(batch, list)
+        assert all(isinstance(r, basestring) for r in batch)
+    except (ValueError, AssertionError):
+        log_info('Invalid batch of receipts')
+        return 400, ''
+
+    if len(batch) > settings.WEBAPPS_RECEIPT_BATCH_MAX:
+        log_info('Too many receipts in batch: %s' % len(batch))
+        return 400, ''
+
+    with statsd.timer('services.verify.batch'):
+        statsd.incr('services.verify.batch.receipts', len(batch))
+        try:
+            # The receipts are JWTs, so they are plain ascii.
+            verify = BatchVerify([r.encode('utf-8') for r in batch],
+                                 environ)
+            return 200, json.dumps(verify.check_full())
+        except:
+            log_exception('<batch>')
+            return 500, ''
+
+
 def application(environ, start_response):
     body = ''
     path = environ.get('PATH_INFO', '')
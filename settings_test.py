@@ -108,6 +108,23 @@ GEOIP_DEFAULT_TIMEOUT = .2
 
 ES_DEFAULT_NUM_REPLICAS = 0
 ES_DEFAULT_NUM_SHARDS = 3
+# Index right away so tests can search what they just saved.
+ES_INDEX_QUEUE = False
+
+# Record installs right away.
+INSTALLS_QUEUE = False
+
+# Update the review aggregates right away.
+REVIEW_AGGREGATES_QUEUE = False
+
+# Save monolith records right away.
+MONOLITH_BUFFER_SIZE = 0
+
+# The file viewer tests work on extracted packages.
+FILE_VIEWER_ZIP = False
+
+# Don't update the reviewer queue table after every save.
+REVIEWER_QUEUE_TABLE = False
 
 IARC_MOCK = True
 
@@ -116,6 +133,9 @@ DEBUG_PROPAGATE_EXCEPTIONS = False
 
 PAYMENT_PROVIDERS = ['bango']
 
+# Always see the price tiers the test just saved.
+PRICE_MATRIX_CHECK_INTERVAL = 0
+
 # When not testing this specific feature, make sure it's off.
 PRE_GENERATE_APKS = False
 # This is a precaution in case something isn't mocked right.